@@ -34,7 +34,7 @@ def get_incomplete_run_dir(motion_name, logs_dir="/home/nima/whole_body_tracking
     return incomplete_dirs
 
 
-def run_task(motion_name, gpu_id):
+def run_task(motion_name, gpu_id, motion_cache_dir=None, motion_shared_memory=False):
     """
     Run training for a single motion on a specific GPU.
     """
@@ -50,6 +50,10 @@ def run_task(motion_name, gpu_id):
         "--log_project_name", "ttg",
         "--run_name", motion_name
     ]
+    if motion_cache_dir is not None:
+        cmd += ["--motion_cache_dir", motion_cache_dir]
+    if motion_shared_memory:
+        cmd += ["--motion_shared_memory"]
 
     import time
     import random
@@ -66,7 +70,7 @@ def run_task(motion_name, gpu_id):
     return result.returncode
 
 
-def gpu_worker(gpu_id: int, task_queue: Queue):
+def gpu_worker(gpu_id: int, task_queue: Queue, motion_cache_dir=None, motion_shared_memory=False):
     """
     Worker process for a specific GPU.
     Repeatedly pops tasks from the queue and runs them.
@@ -79,7 +83,7 @@ def gpu_worker(gpu_id: int, task_queue: Queue):
         motion_name = task
         
         try:
-            returncode = run_task(motion_name, gpu_id)
+            returncode = run_task(motion_name, gpu_id, motion_cache_dir, motion_shared_memory)
             if returncode == 0:
                 print(f"[GPU {gpu_id}] Completed: {motion_name}")
             else:
@@ -120,7 +124,7 @@ def discover_tasks(root_dir, num_workers, worker_split, delete_incomplete=False)
     return task_slice
 
 
-def main(gpu_ids, workers_per_gpu, num_workers, worker_split):
+def main(gpu_ids, workers_per_gpu, num_workers, worker_split, motion_cache_dir=None, motion_shared_memory=False):
     """Manage training across GPUs with explicit multiprocessing."""
     
     root_dir = "/home/nima/whole_body_tracking/motions"
@@ -145,7 +149,7 @@ def main(gpu_ids, workers_per_gpu, num_workers, worker_split):
     processes = []
     for gpu in gpu_ids:
         for _ in range(workers_per_gpu):
-            p = Process(target=gpu_worker, args=(gpu, task_queue))
+            p = Process(target=gpu_worker, args=(gpu, task_queue, motion_cache_dir, motion_shared_memory))
             p.start()
             processes.append(p)
 
@@ -167,6 +171,11 @@ if __name__ == "__main__":
                         help="Total number of distributed worker machines (for splitting work)")
     parser.add_argument("--worker_split", type=int, default=0,
                         help="This worker's index (0 to num_workers-1)")
+    parser.add_argument("--motion_cache_dir", default=None,
+                        help="Preprocessed motion cache shared by all runs (see scripts/motion_cache.py)")
+    parser.add_argument("--motion_shared_memory", action="store_true",
+                        help="Share the host memory of the motions between the runs (see scripts/motion_shm.py)")
     args = parser.parse_args()
     
-    main(args.gpu_ids, args.workers_per_gpu, args.num_workers, args.worker_split)
+    main(args.gpu_ids, args.workers_per_gpu, args.num_workers, args.worker_split, args.motion_cache_dir,
+         args.motion_shared_memory)
@@ -1,10 +1,9 @@
 conda activate gmr
 
-# Pipeline: GMR .pkl -> CSV -> NPZ for BeyondMimic
+# Pipeline: GMR .pkl -> NPZ for BeyondMimic
 #
-# This script:
-# 1. Converts GMR's retargeted .pkl files to CSV format
-# 2. Runs csv_to_npz.py sequentially to create NPZ files for BeyondMimic training
+# This script runs csv_to_npz.py once over all GMR .pkl files to create NPZ files for BeyondMimic training. The
+# pickles are read directly, scripts/pkl_to_csv.py is only needed to inspect the motions as CSV.
 #
 # Usage:
 #   ./parallel_gmr_to_npz.sh [INPUT_PKL_DIR]
@@ -20,7 +19,6 @@ INPUT_FPS=30  # GMR outputs at 30 FPS
 OUTPUT_FPS=50  # BeyondMimic expects 50 FPS
 
 # Derived paths
-CSV_DIR="$HOME/whole_body_tracking/csvs/gmr_converted"
 MOTIONS_DIR="$HOME/whole_body_tracking/motions"
 SCRIPT_DIR="$HOME/whole_body_tracking/scripts"
 
@@ -28,45 +26,28 @@ echo "=========================================="
 echo "GMR -> BeyondMimic Pipeline"
 echo "=========================================="
 echo "Input PKL dir: $INPUT_PKL_DIR"
-echo "CSV output dir: $CSV_DIR"
 echo "NPZ output dir: $MOTIONS_DIR"
 echo "Input FPS: $INPUT_FPS -> Output FPS: $OUTPUT_FPS"
 echo "=========================================="
 
 # Create output directories
-mkdir -p "$CSV_DIR"
 mkdir -p "$MOTIONS_DIR"
 
-# Step 1: Convert all PKL files to CSV (fast, single-threaded is fine)
-echo ""
-echo "[Step 1/2] Converting PKL files to CSV..."
-python "$SCRIPT_DIR/pkl_to_csv.py" \
-    --input_dir "$INPUT_PKL_DIR" \
-    --output_dir "$CSV_DIR"
-
 source ~/.holosoma_deps/miniconda3/bin/activate hssim
 
 
-# Step 2: Convert CSV to NPZ sequentially using Isaac Sim
+# Convert the PKL files to NPZ using Isaac Sim
 echo ""
-echo "[Step 2/2] Converting CSV files to NPZ..."
+echo "Converting PKL files to NPZ..."
 
-for csv_file in "$CSV_DIR"/*.csv; do
-    [ -e "$csv_file" ] || continue
-    
-    # Get the motion name (filename without .csv, add _original suffix for consistency)
-    filename=$(basename "$csv_file")
-    motion_name="${filename%.csv}_original"
-    
-    echo "Processing: $motion_name"
-    
-    python "$SCRIPT_DIR/csv_to_npz.py" \
-        --input_file "$csv_file" \
-        --input_fps "$INPUT_FPS" \
-        --output_name "$motion_name" \
-        --output_fps "$OUTPUT_FPS" \
-        --headless
-done
+# All clips are replayed in one Isaac Sim process, the _original suffix is kept for consistency
+python "$SCRIPT_DIR/csv_to_npz.py" \
+    --input_file "$INPUT_PKL_DIR" \
+    --input_fps "$INPUT_FPS" \
+    --output_fps "$OUTPUT_FPS" \
+    --output_dir "$MOTIONS_DIR" \
+    --output_suffix _original \
+    --headless
 
 # Summary
 echo ""
@@ -1,10 +1,8 @@
 source ~/.holosoma_deps/miniconda3/bin/activate hssim
 
-# CUDA is required .
+# CUDA is required. The clips are replayed in Isaac Sim with the training robot; the manifest.jsonl of the motions
+# directory records the converted clips, so re-runs only convert the new and changed clips.
 
 # python scripts/parallel_npz_to_csv.py
-rm -rf /home/nima/whole_body_tracking/motions/
-mkdir -p /home/nima/whole_body_tracking/motions/
-for csv_file in /home/nima/whole_body_tracking/csvs/*.csv; do
-    python scripts/csv_to_npz.py --input_file "$csv_file" --input_fps 30 --output_name $(basename "$csv_file" .csv) --output_fps 50 --headless
-done
\ No newline at end of file
+python scripts/csv_to_npz.py --input_file /home/nima/whole_body_tracking/csvs --input_fps 30 --output_fps 50 \
+    --output_dir /home/nima/whole_body_tracking/motions --headless
\ No newline at end of file
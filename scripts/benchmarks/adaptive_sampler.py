@@ -0,0 +1,111 @@
+"""Benchmark of the adaptive bin sampler of the motion command against the dense computation.
+
+Every simulated control step records the failures of some resetting envs, draws the start bins of the resets and
+applies the EMA, once with the dense computation (the kernel smoothing of every clip padded with its last bin, and
+``multinomial`` over all bins) and once with :class:`AdaptiveSampler`. The bins are split into clips of
+``--clip_bin_count`` bins. The sampling probabilities of both are compared at the end.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/benchmarks/adaptive_sampler.py --bin_counts 10 100 1000 10000 100000 --device cuda:0
+"""
+
+import argparse
+import time
+import torch
+
+from whole_body_tracking.utils.adaptive_sampler import AdaptiveSampler
+
+parser = argparse.ArgumentParser(description="Benchmark the adaptive bin sampler.")
+parser.add_argument("--bin_counts", nargs="+", type=int, default=[10, 100, 1000, 10000, 100000], help="Bin counts.")
+parser.add_argument("--device", type=str, default="cuda:0" if torch.cuda.is_available() else "cpu")
+parser.add_argument("--num_resets", type=int, default=40, help="Number of resetting envs per step.")
+parser.add_argument("--failure_rate", type=float, default=0.5, help="Share of the resets that are failures.")
+parser.add_argument("--steps", type=int, default=500, help="Number of timed control steps.")
+parser.add_argument("--clip_bin_count", type=int, default=60, help="Number of bins of every clip.")
+parser.add_argument("--kernel_size", type=int, default=3, help="Size of the smoothing kernel.")
+parser.add_argument("--kernel_lambda", type=float, default=0.8, help="Decay of the smoothing kernel.")
+parser.add_argument("--uniform_ratio", type=float, default=0.1, help="Uniform share of the distribution.")
+parser.add_argument("--alpha", type=float, default=0.001, help="EMA factor of the failures.")
+args_cli = parser.parse_args()
+
+
+class DenseSampler:
+    """The dense computation of the motion command before the incremental sampler."""
+
+    def __init__(self, bin_count: int, kernel: torch.Tensor, clip_bin_offsets: torch.Tensor):
+        self.bin_count = bin_count
+        self.kernel = kernel
+        # the bins each bin collects with the kernel, past the end of a clip its last bin is replicated
+        bins = torch.arange(bin_count, device=args_cli.device)
+        clip_ends = torch.cat([clip_bin_offsets[1:], clip_bin_offsets.new_tensor([bin_count])]) - 1
+        bin_clip_ends = clip_ends[torch.searchsorted(clip_bin_offsets, bins, right=True) - 1]
+        offsets = torch.arange(len(kernel), device=args_cli.device)
+        self.kernel_bins = torch.minimum(bins[:, None] + offsets[None, :], bin_clip_ends[:, None])
+        self.bin_failed_count = torch.zeros(bin_count, device=args_cli.device)
+        self.current_bin_failed = torch.zeros(bin_count, device=args_cli.device)
+
+    def record_failures(self, bins: torch.Tensor):
+        self.current_bin_failed[:] = torch.bincount(bins, minlength=self.bin_count)
+
+    def probabilities(self) -> torch.Tensor:
+        probabilities = self.bin_failed_count + args_cli.uniform_ratio / float(self.bin_count)
+        probabilities = (probabilities[self.kernel_bins] * self.kernel).sum(dim=1)
+        return probabilities / probabilities.sum()
+
+    def sample(self, num_samples: int) -> torch.Tensor:
+        return torch.multinomial(self.probabilities(), num_samples, replacement=True)
+
+    def step(self):
+        self.bin_failed_count = args_cli.alpha * self.current_bin_failed + (1 - args_cli.alpha) * self.bin_failed_count
+        self.current_bin_failed.zero_()
+
+
+def synchronize():
+    if args_cli.device.startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+def seconds_per_step(sampler, failures: list[torch.Tensor]) -> float:
+    num_failures = int(args_cli.num_resets * args_cli.failure_rate)
+    synchronize()
+    start = time.perf_counter()
+    for failed_bins in failures:
+        if num_failures > 0:
+            sampler.record_failures(failed_bins)
+        sampler.sample(args_cli.num_resets)
+        sampler.step()
+    synchronize()
+    return (time.perf_counter() - start) / len(failures)
+
+
+def main():
+    kernel = torch.tensor([args_cli.kernel_lambda**i for i in range(args_cli.kernel_size)], device=args_cli.device)
+    kernel = kernel / kernel.sum()
+    num_failures = int(args_cli.num_resets * args_cli.failure_rate)
+    print(f"device={args_cli.device}, resets/step={args_cli.num_resets}, failures/step={num_failures}")
+    print(f"{'bins':>8} {'dense':>12} {'incremental':>12} {'speedup':>8} {'max prob diff':>14}")
+    for bin_count in args_cli.bin_counts:
+        failures = [torch.randint(0, bin_count, (num_failures,), device=args_cli.device) for _ in range(args_cli.steps)]
+        clip_bin_offsets = torch.arange(0, bin_count, args_cli.clip_bin_count, device=args_cli.device)
+        dense = DenseSampler(bin_count, kernel, clip_bin_offsets)
+        incremental = AdaptiveSampler(
+            bin_count,
+            kernel,
+            args_cli.uniform_ratio,
+            args_cli.alpha,
+            device=args_cli.device,
+            clip_bin_offsets=clip_bin_offsets,
+        )
+        t_dense = seconds_per_step(dense, failures)
+        t_incremental = seconds_per_step(incremental, failures)
+        error = (dense.probabilities() - incremental.probabilities()).abs().max().item()
+        print(
+            f"{bin_count:>8d} {t_dense * 1e3:>9.3f} ms {t_incremental * 1e3:>9.3f} ms"
+            f" {t_dense / t_incremental:>7.2f}x {error:>14.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
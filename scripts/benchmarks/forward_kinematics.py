@@ -0,0 +1,97 @@
+"""Parity check of the forward kinematics against a motion file written by Isaac Sim.
+
+Takes the root state and the joint states of a motion converted with ``scripts/csv_to_npz.py``, recomputes the body
+states with :class:`KinematicTree` and reports the largest difference of every field to the states read back from
+the simulator, and the time of the computation. Only the bodies of the motion file that are in the robot description
+are compared. The check fails if a difference exceeds its tolerance, or if the bodies or joints of the description are
+not the ones of the motion file in the same order.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/benchmarks/forward_kinematics.py --motion_file motions/dance1_subject2.npz
+"""
+
+import argparse
+import numpy as np
+import time
+import torch
+
+from whole_body_tracking.utils.kinematics import G1_URDF_PATH, KinematicTree
+
+parser = argparse.ArgumentParser(description="Check the forward kinematics against a motion written by Isaac Sim.")
+parser.add_argument("--motion_file", type=str, required=True, help="Motion file with body and joint names.")
+parser.add_argument("--urdf", type=str, default=G1_URDF_PATH, help="The robot description.")
+parser.add_argument("--device", type=str, default="cpu", help="Device of the kinematics.")
+parser.add_argument("--atol_pos", type=float, default=1e-4, help="Largest allowed position difference in m.")
+parser.add_argument("--atol_rot", type=float, default=1e-3, help="Largest allowed orientation difference in rad.")
+parser.add_argument("--atol_vel", type=float, default=1e-2, help="Largest allowed velocity difference.")
+args_cli = parser.parse_args()
+
+
+def main():
+    data = np.load(args_cli.motion_file)
+    if "body_names" not in data or "joint_names" not in data:
+        raise ValueError(f"{args_cli.motion_file} has no body and joint names, add them with migrate_motion_npz.py.")
+    tree = KinematicTree(args_cli.urdf, device=args_cli.device)
+    body_names = data["body_names"].tolist()
+    joint_names = data["joint_names"].tolist()
+    motion = {
+        key: torch.as_tensor(data[key], dtype=torch.float32, device=args_cli.device)
+        for key in ("joint_pos", "joint_vel", "body_pos_w", "body_quat_w", "body_lin_vel_w", "body_ang_vel_w")
+    }
+
+    root = body_names.index(tree.body_names[0])
+    joint_indexes = [joint_names.index(name) for name in tree.joint_names]
+    inputs = (
+        motion["body_pos_w"][:, root],
+        motion["body_quat_w"][:, root],
+        motion["body_lin_vel_w"][:, root],
+        motion["body_ang_vel_w"][:, root],
+        motion["joint_pos"][:, joint_indexes],
+        motion["joint_vel"][:, joint_indexes],
+    )
+    tree.compute(*inputs)
+    start = time.perf_counter()
+    body_states = tree.compute(*inputs)
+    seconds = time.perf_counter() - start
+
+    compared = [name for name in body_names if name in tree.body_names]
+    skipped = [name for name in body_names if name not in tree.body_names]
+    expected_indexes = [body_names.index(name) for name in compared]
+    tree_indexes = [tree.body_names.index(name) for name in compared]
+    num_frames = motion["joint_pos"].shape[0]
+    print(f"{args_cli.motion_file}: {num_frames} frames, {len(compared)} bodies compared, skipped {skipped}")
+    print(f"forward kinematics: {seconds * 1e3:.2f} ms ({seconds / num_frames * 1e6:.2f} us/frame)")
+
+    passed = True
+    for key, atol in (
+        ("body_pos_w", args_cli.atol_pos),
+        ("body_quat_w", args_cli.atol_rot),
+        ("body_lin_vel_w", args_cli.atol_vel),
+        ("body_ang_vel_w", args_cli.atol_vel),
+    ):
+        expected = motion[key][:, expected_indexes]
+        computed = body_states[key][:, tree_indexes]
+        if key == "body_quat_w":
+            # rotation angle between the orientations, which does not depend on the sign of the quaternions
+            chord = torch.minimum(
+                torch.linalg.vector_norm(expected - computed, dim=-1),
+                torch.linalg.vector_norm(expected + computed, dim=-1),
+            )
+            error = 4.0 * torch.asin((chord / 2.0).clamp(max=1.0))
+        else:
+            error = torch.linalg.vector_norm(expected - computed, dim=-1)
+        worst = int(error.max(dim=0).values.argmax())
+        passed &= error.max().item() <= atol
+        print(f"{key:>15}: max difference {error.max().item():.2e} ({compared[worst]}), mean {error.mean().item():.2e}")
+    # the motion command indexes the bodies of the motion file by articulation index
+    if tree.body_names != body_names or tree.joint_names != joint_names:
+        passed = False
+        print(f"body or joint order differs: {tree.body_names} / {tree.joint_names}")
+    assert passed, "the forward kinematics differs from the motion file"
+    print("forward kinematics matches the motion file")
+
+
+if __name__ == "__main__":
+    main()
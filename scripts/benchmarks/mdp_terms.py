@@ -0,0 +1,239 @@
+"""Benchmark of the motion command and the tracking MDP terms on a stub environment.
+
+Runs the motion command and the reward, termination and observation terms of the tracking task for a number of
+control steps on a stub environment, whose robot state alternates between two random values, and reports the time per
+step. No physics is simulated, so the numbers isolate the cost of the MDP terms. Every configuration of the motion
+command given by ``--variants`` is measured, e.g. ``snapshot=False`` against the default, and the outputs of all terms
+during the warm-up steps are compared with the ones of the first variant: the largest difference of the float outputs
+and the number of differing boolean (termination) outputs are reported.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/benchmarks/mdp_terms.py --headless --num_envs 1024 4096 16384 --variants snapshot=False default
+    python scripts/benchmarks/mdp_terms.py --headless --device cpu --variants default compile_step=True
+"""
+
+"""Launch Isaac Sim Simulator first."""
+
+import argparse
+
+from isaaclab.app import AppLauncher
+
+parser = argparse.ArgumentParser(description="Benchmark the tracking MDP terms on a stub environment.")
+parser.add_argument("--num_envs", nargs="+", type=int, default=[1024, 4096, 16384], help="Numbers of environments.")
+parser.add_argument("--steps", type=int, default=100, help="Number of timed control steps.")
+parser.add_argument("--frames", type=int, default=3000, help="Number of frames of the synthetic motion.")
+parser.add_argument(
+    "--variants",
+    nargs="+",
+    type=str,
+    default=["snapshot=False", "default"],
+    help="Motion command configurations to compare, as comma separated key=value overrides or 'default'.",
+)
+parser.add_argument("--termination_rate", type=float, default=0.01, help="Fraction of envs terminating each step.")
+AppLauncher.add_app_launcher_args(parser)
+args_cli = parser.parse_args()
+
+app_launcher = AppLauncher(args_cli)
+simulation_app = app_launcher.app
+
+"""Rest everything follows."""
+
+import ast
+import numpy as np
+import os
+import tempfile
+import time
+import torch
+import types
+
+from isaaclab.managers import SceneEntityCfg
+
+import whole_body_tracking.tasks.tracking.mdp as mdp
+from whole_body_tracking.tasks.tracking.config.g1.flat_env_cfg import G1FlatEnvCfg
+
+NUM_BODIES = 40
+NUM_JOINTS = 29
+BODY_STATE = ("body_pos_w", "body_quat_w", "body_lin_vel_w", "body_ang_vel_w")
+
+
+class StubArticulationData:
+    """Random robot state with the attributes read by the tracking MDP terms."""
+
+    def __init__(self, num_envs: int, device: str):
+        self.body_pos_w = torch.randn(num_envs, NUM_BODIES, 3, device=device)
+        self.body_quat_w = torch.nn.functional.normalize(torch.randn(num_envs, NUM_BODIES, 4, device=device), dim=-1)
+        self.body_lin_vel_w = torch.randn(num_envs, NUM_BODIES, 3, device=device)
+        self.body_ang_vel_w = torch.randn(num_envs, NUM_BODIES, 3, device=device)
+        self.joint_pos = torch.randn(num_envs, NUM_JOINTS, device=device)
+        self.joint_vel = torch.randn(num_envs, NUM_JOINTS, device=device)
+        self.soft_joint_pos_limits = torch.tensor([-3.0, 3.0], device=device).repeat(num_envs, NUM_JOINTS, 1)
+        self.GRAVITY_VEC_W = torch.tensor([0.0, 0.0, -1.0], device=device).repeat(num_envs, 1)
+        self._sim_timestamp = 0.0
+
+    def step(self, dt: float):
+        """Swaps the body state for a second random one, like a simulation step that writes new buffers."""
+        if not hasattr(self, "_states"):
+            self._states = [
+                {name: getattr(self, name) for name in BODY_STATE},
+                {name: getattr(self, name).flip(0).contiguous() for name in BODY_STATE},
+            ]
+        self._states.reverse()
+        for name, value in self._states[0].items():
+            setattr(self, name, value)
+        self._sim_timestamp += dt
+
+
+class StubArticulation:
+    def __init__(self, body_names: list[str], num_envs: int, device: str):
+        self.body_names = body_names
+        self.data = StubArticulationData(num_envs, device)
+        self.is_initialized = True
+
+    def find_bodies(self, names: list[str], preserve_order: bool = False):
+        return [self.body_names.index(name) for name in names], names
+
+    def write_joint_state_to_sim(self, joint_pos, joint_vel, env_ids=None):
+        pass
+
+    def write_root_state_to_sim(self, root_state, env_ids=None):
+        pass
+
+
+class StubScene(dict):
+    def __init__(self, robot: StubArticulation, num_envs: int, device: str):
+        super().__init__(robot=robot)
+        self.env_origins = torch.randn(num_envs, 3, device=device)
+
+
+class StubEnv:
+    """The attributes of :class:`ManagerBasedRLEnv` used by the motion command and the tracking MDP terms."""
+
+    def __init__(self, env_cfg, robot: StubArticulation, num_envs: int, device: str):
+        self.cfg = env_cfg
+        self.num_envs = num_envs
+        self.device = device
+        self.step_dt = env_cfg.decimation * env_cfg.sim.dt
+        self.scene = StubScene(robot, num_envs, device)
+        self.termination_manager = types.SimpleNamespace(
+            terminated=torch.zeros(num_envs, dtype=torch.bool, device=device)
+        )
+        self.command_manager = types.SimpleNamespace(get_term=lambda name: self.command)
+        self.command = None
+
+
+def write_motion(path: str, body_names: list[str]):
+    frames = args_cli.frames
+    quat = np.random.randn(frames, NUM_BODIES, 4)
+    np.savez(
+        path,
+        fps=np.array([50]),
+        joint_pos=np.random.randn(frames, NUM_JOINTS).astype(np.float32),
+        joint_vel=np.random.randn(frames, NUM_JOINTS).astype(np.float32),
+        body_pos_w=np.random.randn(frames, NUM_BODIES, 3).astype(np.float32),
+        body_quat_w=(quat / np.linalg.norm(quat, axis=-1, keepdims=True)).astype(np.float32),
+        body_lin_vel_w=np.random.randn(frames, NUM_BODIES, 3).astype(np.float32),
+        body_ang_vel_w=np.random.randn(frames, NUM_BODIES, 3).astype(np.float32),
+        body_names=np.array(body_names),
+    )
+
+
+def parse_variant(variant: str) -> dict:
+    if variant == "default":
+        return {}
+    overrides = {}
+    for item in variant.split(","):
+        key, value = item.split("=")
+        overrides[key] = ast.literal_eval(value)
+    return overrides
+
+
+def step_terms(env: StubEnv, rewards, terminations, observations) -> list[torch.Tensor]:
+    command = env.command
+    outputs = [term.func(env, **term.params) for term in rewards + terminations]
+    env.termination_manager.terminated = torch.rand(env.num_envs, device=env.device) < args_cli.termination_rate
+    env_ids = torch.where(env.termination_manager.terminated)[0]
+    command.reset(env_ids)
+    command.compute(env.step_dt)
+    outputs += [term.func(env, **term.params) for term in observations]
+    return outputs
+
+
+def compare(outputs: list[list[torch.Tensor]], reference: list[list[torch.Tensor]]) -> tuple[float, int]:
+    """Returns the largest difference of the float outputs and the number of differing boolean outputs."""
+    max_difference, mismatches = 0.0, 0
+    for step_outputs, step_reference in zip(outputs, reference):
+        for output, expected in zip(step_outputs, step_reference):
+            if output.dtype == torch.bool:
+                mismatches += int((output != expected).sum())
+            else:
+                max_difference = max(max_difference, (output - expected).abs().max().item())
+    return max_difference, mismatches
+
+
+def main():
+    device = args_cli.device
+    env_cfg = G1FlatEnvCfg()
+    tracked = env_cfg.commands.motion.body_names
+    body_names = tracked + [f"untracked_{i}" for i in range(NUM_BODIES - len(tracked))]
+    motion_file = os.path.join(tempfile.mkdtemp(), "motion.npz")
+    write_motion(motion_file, body_names)
+
+    # the terms of the task that read the motion command, plus the robot terms they are configured with
+    rewards = [term for term in vars(env_cfg.rewards).values() if term is not None and "command_name" in term.params]
+    terminations = [
+        term for term in vars(env_cfg.terminations).values() if term is not None and "command_name" in term.params
+    ]
+    observations = [
+        term
+        for group in (env_cfg.observations.policy, env_cfg.observations.critic)
+        for term in vars(group).values()
+        if hasattr(term, "func") and "command_name" in term.params and term.func is not mdp.generated_commands
+    ]
+    for term in terminations:
+        if isinstance(term.params.get("asset_cfg"), SceneEntityCfg):
+            term.params["asset_cfg"] = SceneEntityCfg("robot")
+
+    print(f"device={device}, steps={args_cli.steps}, frames={args_cli.frames}")
+    for num_envs in args_cli.num_envs:
+        reference = None
+        for variant in args_cli.variants:
+            torch.manual_seed(0)
+            robot = StubArticulation(body_names, num_envs, device)
+            env = StubEnv(env_cfg, robot, num_envs, device)
+            command_cfg = env_cfg.commands.motion.replace(
+                motion_file=motion_file, debug_vis=False, **parse_variant(variant)
+            )
+            env.command = command_cfg.class_type(command_cfg, env)
+            env.command.reset()
+
+            warmup_outputs = []
+            for i in range(args_cli.steps + 10):
+                if i == 10:
+                    if device.startswith("cuda"):
+                        torch.cuda.synchronize()
+                    start = time.perf_counter()
+                robot.data.step(env.step_dt)
+                outputs = step_terms(env, rewards, terminations, observations)
+                if i < 10:
+                    warmup_outputs.append([output.clone() for output in outputs])
+            if device.startswith("cuda"):
+                torch.cuda.synchronize()
+            seconds = (time.perf_counter() - start) / args_cli.steps
+
+            if reference is None:
+                reference, reference_seconds = warmup_outputs, seconds
+                parity = "reference"
+            else:
+                max_difference, mismatches = compare(warmup_outputs, reference)
+                parity = f"max difference {max_difference:.2e}, {mismatches} termination mismatches"
+            print(
+                f"num_envs={num_envs:>6d}  {variant:>24}: {seconds * 1e3:9.3f} ms/step"
+                f" ({reference_seconds / seconds:.2f}x)  {parity}"
+            )
+
+
+if __name__ == "__main__":
+    main()
+    simulation_app.close()
@@ -0,0 +1,107 @@
+"""Benchmark of the compressed motion archives.
+
+For every motion file, reports the size of the archive against the npz file and ``np.savez_compressed``, the
+largest round-trip error of every field, and the encode and decode throughput in frames per second. Without
+``--motion_file``, a smooth synthetic motion is measured instead.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/benchmarks/motion_archive.py --motion_file "motions/*.npz"
+"""
+
+import argparse
+import glob
+import io
+import numpy as np
+import os
+import tempfile
+import time
+
+from whole_body_tracking.utils.motion_archive import (
+    ARCHIVE_SUFFIX,
+    FIELD_CODECS,
+    read_archive,
+    round_trip_error,
+    write_archive,
+)
+
+parser = argparse.ArgumentParser(description="Benchmark compressed motion archives.")
+parser.add_argument("--motion_file", type=str, default=None, help="A motion file or a glob pattern of motion files.")
+parser.add_argument("--frames", type=int, default=3000, help="Number of frames of the synthetic motion.")
+parser.add_argument("--num_bodies", type=int, default=30, help="Number of bodies of the synthetic motion.")
+parser.add_argument("--num_joints", type=int, default=29, help="Number of joints of the synthetic motion.")
+parser.add_argument("--repeats", type=int, default=5, help="Number of timed decodes.")
+args_cli = parser.parse_args()
+
+
+def synthetic_motion() -> dict[str, np.ndarray]:
+    """A smooth random motion, with quaternions that cross hemispheres."""
+    rng = np.random.default_rng(0)
+    t = np.arange(args_cli.frames)[:, None] / 50.0
+    frequencies = rng.uniform(0.2, 2.0, (1, args_cli.num_joints))
+    joint_pos = np.sin(t * frequencies * 2 * np.pi + rng.uniform(0, 6, frequencies.shape))
+    body_t = t[:, :, None]
+    body_pos = np.sin(body_t * rng.uniform(0.2, 2.0, (1, args_cli.num_bodies, 3)))
+    angles = body_t * rng.uniform(0.5, 3.0, (1, args_cli.num_bodies, 1))
+    axes = rng.standard_normal((1, args_cli.num_bodies, 3))
+    axes /= np.linalg.norm(axes, axis=-1, keepdims=True)
+    body_quat = np.concatenate([np.cos(angles / 2), np.sin(angles / 2) * axes], axis=-1)
+    # random signs, as written by simulators that do not keep the quaternions continuous
+    body_quat *= rng.choice([-1.0, 1.0], (args_cli.frames, args_cli.num_bodies, 1))
+    motion = {
+        "fps": np.array([50]),
+        "joint_pos": joint_pos,
+        "joint_vel": np.gradient(joint_pos, 1 / 50.0, axis=0),
+        "body_pos_w": body_pos,
+        "body_quat_w": body_quat,
+        "body_lin_vel_w": np.gradient(body_pos, 1 / 50.0, axis=0),
+        "body_ang_vel_w": rng.standard_normal(body_pos.shape),
+    }
+    return {key: value.astype(np.float32) if key in FIELD_CODECS else value for key, value in motion.items()}
+
+
+def compressed_size(motion: dict[str, np.ndarray]) -> int:
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **motion)
+    return buffer.tell()
+
+
+def measure(name: str, motion: dict[str, np.ndarray], tmp_dir: str):
+    frames = motion["joint_pos"].shape[0]
+    npz = io.BytesIO()
+    np.savez(npz, **motion)
+    path = os.path.join(tmp_dir, name + ARCHIVE_SUFFIX)
+    start = time.perf_counter()
+    write_archive(path, motion)
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(args_cli.repeats):
+        decoded = read_archive(path)
+    decode_time = (time.perf_counter() - start) / args_cli.repeats
+
+    size = os.path.getsize(path)
+    print(
+        f"{name}: {frames} frames, npz {npz.tell() / 2**20:.2f} MiB, savez_compressed"
+        f" {npz.tell() / compressed_size(motion):.1f}x, archive {size / 2**20:.2f} MiB ({npz.tell() / size:.1f}x)"
+    )
+    print(f"  encode {frames / encode_time:,.0f} frames/s, decode {frames / decode_time:,.0f} frames/s")
+    for field, error in round_trip_error(motion, decoded).items():
+        print(f"  {field:<16} max error {error:.3g}{' rad' if field == 'body_quat_w' else ''}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args_cli.motion_file is None:
+            measure("synthetic", synthetic_motion(), tmp_dir)
+            return
+        motion_files = sorted(glob.glob(args_cli.motion_file))
+        assert len(motion_files) > 0, f"No motion files found for: {args_cli.motion_file}"
+        for motion_file in motion_files:
+            with np.load(motion_file) as data:
+                motion = {key: data[key] for key in data.files}
+            measure(os.path.splitext(os.path.basename(motion_file))[0], motion, tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
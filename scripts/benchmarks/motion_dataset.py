@@ -0,0 +1,90 @@
+"""Benchmark of opening a dataset of many motion clips.
+
+Writes ``--num_clips`` synthetic motion files and the equivalent sharded motion dataset, then compares reading the
+tracked bodies of every clip from the npz files against opening the dataset, which memory-maps one shard per field,
+and gathering the tracked bodies from the shards. Both must give the same packed tensors.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/benchmarks/motion_dataset.py --num_clips 10000 --frames 100
+"""
+
+import argparse
+import numpy as np
+import os
+import tempfile
+import time
+
+from whole_body_tracking.utils.motion_dataset import FIELDS, MotionDataset, write_dataset
+
+parser = argparse.ArgumentParser(description="Benchmark opening per-clip motion files against a motion dataset.")
+parser.add_argument("--num_clips", type=int, default=2000, help="Number of motion clips.")
+parser.add_argument("--frames", type=int, default=100, help="Number of frames of every clip.")
+parser.add_argument("--num_bodies", type=int, default=30, help="Number of bodies stored in the motion files.")
+parser.add_argument("--num_joints", type=int, default=29, help="Number of joints stored in the motion files.")
+parser.add_argument("--num_tracked", type=int, default=14, help="Number of tracked bodies.")
+args_cli = parser.parse_args()
+
+
+def write_clips(motion_dir: str) -> list[str]:
+    rng = np.random.default_rng(0)
+    dims = {"joint_pos": 0, "joint_vel": 0, "body_pos_w": 3, "body_quat_w": 4, "body_lin_vel_w": 3, "body_ang_vel_w": 3}
+    paths = []
+    for i in range(args_cli.num_clips):
+        motion = {
+            field: rng.standard_normal(
+                (args_cli.frames, args_cli.num_joints) if dim == 0 else (args_cli.frames, args_cli.num_bodies, dim)
+            ).astype(np.float32)
+            for field, dim in dims.items()
+        }
+        path = os.path.join(motion_dir, f"clip_{i:06d}.npz")
+        np.savez(
+            path,
+            fps=np.array([50]),
+            body_names=np.array([f"body_{b}" for b in range(args_cli.num_bodies)]),
+            joint_names=np.array([f"joint_{j}" for j in range(args_cli.num_joints)]),
+            **motion,
+        )
+        paths.append(path)
+    return paths
+
+
+def main():
+    body_indexes = np.arange(0, args_cli.num_bodies, args_cli.num_bodies // args_cli.num_tracked)[
+        : args_cli.num_tracked
+    ].tolist()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = write_clips(tmp_dir)
+        start = time.perf_counter()
+        write_dataset(paths, os.path.join(tmp_dir, "dataset"))
+        pack_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        clips = {field: [] for field in FIELDS}
+        for path in paths:
+            with np.load(path) as data:
+                for field in FIELDS:
+                    clips[field].append(data[field][:, body_indexes] if field.startswith("body_") else data[field])
+        packed = {field: np.concatenate(values) for field, values in clips.items()}
+        npz_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dataset = MotionDataset(os.path.join(tmp_dir, "dataset"))
+        open_time = time.perf_counter() - start
+        sharded = {
+            field: shard[:, body_indexes] if field.startswith("body_") else np.array(shard)
+            for field, shard in dataset.shards.items()
+        }
+        dataset_time = time.perf_counter() - start
+
+        assert all(np.array_equal(packed[field], sharded[field]) for field in FIELDS), "the packed tensors differ"
+    print(f"{args_cli.num_clips} clips of {args_cli.frames} frames, {args_cli.num_tracked} tracked bodies")
+    print(f"pack:            {pack_time:8.3f} s")
+    print(f"npz files:       {npz_time:8.3f} s")
+    print(f"dataset (open):  {open_time:8.3f} s")
+    print(f"dataset (load):  {dataset_time:8.3f} s  ({npz_time / dataset_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
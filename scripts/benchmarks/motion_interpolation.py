@@ -0,0 +1,74 @@
+"""Micro-benchmark of the reference reads of one control step, with and without sub-frame interpolation.
+
+The integer path gathers one frame per env and field. The interpolated path gathers the two neighboring frames,
+linearly interpolates positions and velocities and spherically interpolates quaternions.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/benchmarks/motion_interpolation.py --num_envs 4096 --device cuda:0
+"""
+
+import argparse
+import time
+import torch
+
+from whole_body_tracking.utils.quaternion import quat_slerp
+
+parser = argparse.ArgumentParser(description="Benchmark interpolated reference queries.")
+parser.add_argument("--num_envs", type=int, default=4096, help="Number of environments.")
+parser.add_argument("--device", type=str, default="cuda:0" if torch.cuda.is_available() else "cpu")
+parser.add_argument("--frames", type=int, default=15000, help="Number of motion frames.")
+parser.add_argument("--num_joints", type=int, default=29, help="Number of joints.")
+parser.add_argument("--num_tracked", type=int, default=14, help="Number of tracked bodies.")
+parser.add_argument("--steps", type=int, default=200, help="Number of timed control steps.")
+args_cli = parser.parse_args()
+
+
+def synchronize():
+    if args_cli.device.startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+def seconds_per_step(fn) -> float:
+    for _ in range(10):
+        fn()
+    synchronize()
+    start = time.perf_counter()
+    for _ in range(args_cli.steps):
+        fn()
+    synchronize()
+    return (time.perf_counter() - start) / args_cli.steps
+
+
+def main():
+    device, frames, n_b = args_cli.device, args_cli.frames, args_cli.num_tracked
+    joints = [torch.randn(frames, args_cli.num_joints, device=device) for _ in range(2)]
+    bodies = [torch.randn(frames, n_b, 3, device=device) for _ in range(3)]
+    quats = torch.nn.functional.normalize(torch.randn(frames, n_b, 4, device=device), dim=-1)
+    phase = torch.rand(args_cli.num_envs, device=device) * (frames - 1)
+
+    def integer():
+        index = phase.long()
+        for field in joints + bodies + [quats]:
+            field[index]
+
+    def interpolated():
+        index0 = phase.long()
+        index1 = torch.clamp(index0 + 1, max=frames - 1)
+        blend = phase - index0
+        for field in joints:
+            torch.lerp(field[index0], field[index1], blend[:, None])
+        for field in bodies:
+            torch.lerp(field[index0], field[index1], blend[:, None, None])
+        quat_slerp(quats[index0], quats[index1], blend[:, None, None])
+
+    t_integer = seconds_per_step(integer)
+    t_interpolated = seconds_per_step(interpolated)
+    print(f"num_envs={args_cli.num_envs}, device={device}, frames={frames}")
+    print(f"integer gather     : {t_integer * 1e3:.3f} ms/step")
+    print(f"interpolated query : {t_interpolated * 1e3:.3f} ms/step ({t_interpolated / t_integer:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
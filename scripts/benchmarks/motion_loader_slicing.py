@@ -0,0 +1,69 @@
+"""Micro-benchmark of the reference gathers done by the motion command every control step.
+
+Compares indexing the tracked bodies out of the full clip on every access (``clip[:, body_indexes][time_steps]``)
+against indexing tensors that were sliced once at load time (``clip_tracked[time_steps]``).
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/benchmarks/motion_loader_slicing.py --num_envs 4096 --device cuda:0
+"""
+
+import argparse
+import time
+import torch
+
+parser = argparse.ArgumentParser(description="Benchmark tracked-body slicing of the reference motion.")
+parser.add_argument("--num_envs", type=int, default=4096, help="Number of environments.")
+parser.add_argument("--device", type=str, default="cuda:0" if torch.cuda.is_available() else "cpu")
+parser.add_argument("--fps", type=int, default=50, help="Motion fps.")
+parser.add_argument("--durations", nargs="+", type=float, default=[10.0, 300.0], help="Clip durations in seconds.")
+parser.add_argument("--num_bodies", type=int, default=40, help="Number of bodies stored in the motion file.")
+parser.add_argument("--num_tracked", type=int, default=14, help="Number of tracked bodies.")
+parser.add_argument("--reads_per_step", type=int, default=24, help="Body property reads per control step.")
+parser.add_argument("--steps", type=int, default=200, help="Number of timed control steps.")
+args_cli = parser.parse_args()
+
+
+def synchronize():
+    if args_cli.device.startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+def seconds_per_step(fn) -> float:
+    for _ in range(10):
+        fn()
+    synchronize()
+    start = time.perf_counter()
+    for _ in range(args_cli.steps):
+        fn()
+    synchronize()
+    return (time.perf_counter() - start) / args_cli.steps
+
+
+def main():
+    device = args_cli.device
+    body_indexes = torch.randperm(args_cli.num_bodies, device=device)[: args_cli.num_tracked].sort().values
+    print(f"num_envs={args_cli.num_envs}, device={device}, reads/step={args_cli.reads_per_step}")
+    print(f"{'duration [s]':>12} {'frames':>8} {'per-access [ms]':>16} {'pre-sliced [ms]':>16} {'speedup':>8}")
+    for duration in args_cli.durations:
+        frames = int(duration * args_cli.fps)
+        fields = [torch.randn(frames, args_cli.num_bodies, dim, device=device) for dim in (3, 4, 3, 3)]
+        tracked = [field[:, body_indexes].contiguous() for field in fields]
+        time_steps = torch.randint(0, frames, (args_cli.num_envs,), device=device)
+
+        def per_access():
+            for i in range(args_cli.reads_per_step):
+                fields[i % 4][:, body_indexes][time_steps]
+
+        def pre_sliced():
+            for i in range(args_cli.reads_per_step):
+                tracked[i % 4][time_steps]
+
+        t_old = seconds_per_step(per_access)
+        t_new = seconds_per_step(pre_sliced)
+        print(f"{duration:>12.1f} {frames:>8d} {t_old * 1e3:>16.3f} {t_new * 1e3:>16.3f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Benchmark of the quantized reference motion storage.
+
+For every quantization mode, reports the error of the dequantized reference against float32, the memory used by the
+reference tensors and the time of the per-step reference gathers, at several clip lengths. Synthetic motions are
+smooth random trajectories; pass ``--motion_file`` to measure the error on a real clip instead.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/benchmarks/motion_quantization.py --num_envs 4096 --device cuda:0
+"""
+
+import argparse
+import math
+import numpy as np
+import time
+import torch
+
+from whole_body_tracking.utils.motion_quantization import QUANTIZATION_MODES, quantize_motion
+
+parser = argparse.ArgumentParser(description="Benchmark quantized reference motion storage.")
+parser.add_argument("--num_envs", type=int, default=4096, help="Number of environments.")
+parser.add_argument("--device", type=str, default="cuda:0" if torch.cuda.is_available() else "cpu")
+parser.add_argument("--fps", type=int, default=50, help="Motion fps of the synthetic clips.")
+parser.add_argument("--durations", nargs="+", type=float, default=[10.0, 60.0, 300.0], help="Clip durations in s.")
+parser.add_argument("--num_clips", type=int, default=1, help="Number of clips of every duration.")
+parser.add_argument("--num_joints", type=int, default=29, help="Number of joints.")
+parser.add_argument("--num_tracked", type=int, default=14, help="Number of tracked bodies.")
+parser.add_argument("--motion_file", type=str, default=None, help="Measure on a motion file instead.")
+parser.add_argument("--steps", type=int, default=200, help="Number of timed control steps.")
+args_cli = parser.parse_args()
+
+FIELDS = ("joint_pos", "joint_vel", "body_pos_w", "body_quat_w", "body_lin_vel_w", "body_ang_vel_w")
+
+
+class Motion:
+    """Minimal stand-in for the packed layout of :class:`MotionLibrary`."""
+
+    def __init__(self, fields: dict[str, torch.Tensor], clip_lengths: torch.Tensor):
+        for name in FIELDS:
+            setattr(self, name, fields[name])
+        self.num_clips = len(clip_lengths)
+        self.clip_frames = clip_lengths
+        self.clip_lengths = clip_lengths
+        self.clip_offsets = torch.cumsum(clip_lengths, 0) - clip_lengths
+
+
+def synthetic_fields(frames: int, device: str) -> dict[str, torch.Tensor]:
+    t = torch.arange(frames, device=device, dtype=torch.float32)[:, None] / args_cli.fps
+    n_j, n_b = args_cli.num_joints, args_cli.num_tracked
+    freq = torch.rand(1, 3 * n_b + n_j, device=device) * 2.0 + 0.1
+    waves = torch.sin(t * freq * 2 * math.pi)
+    drift = torch.cumsum(torch.randn(frames, 2, device=device) * 0.02, 0)
+    body_pos = waves[:, : 3 * n_b].view(frames, n_b, 3) * 0.3
+    body_pos[..., :2] += drift[:, None]
+    body_pos[..., 2] += 0.8
+    quat = torch.randn(frames, n_b, 4, device=device).cumsum(0) * 0.05 + torch.randn(1, n_b, 4, device=device)
+    return {
+        "joint_pos": waves[:, 3 * n_b :] * 1.5,
+        "joint_vel": torch.randn(frames, n_j, device=device) * 3.0,
+        "body_pos_w": body_pos,
+        "body_quat_w": torch.nn.functional.normalize(quat, dim=-1),
+        "body_lin_vel_w": torch.randn(frames, n_b, 3, device=device),
+        "body_ang_vel_w": torch.randn(frames, n_b, 3, device=device) * 4.0,
+    }
+
+
+def make_motion(device: str, duration: float) -> Motion:
+    if args_cli.motion_file is not None:
+        data = np.load(args_cli.motion_file)
+        fields = {name: torch.tensor(data[name], dtype=torch.float32, device=device) for name in FIELDS}
+        return Motion(fields, torch.tensor([fields["joint_pos"].shape[0]], device=device))
+    frames = int(duration * args_cli.fps)
+    clips = [synthetic_fields(frames, device) for _ in range(args_cli.num_clips)]
+    fields = {name: torch.cat([clip[name] for clip in clips]) for name in FIELDS}
+    return Motion(fields, torch.full((args_cli.num_clips,), frames, device=device))
+
+
+def nbytes(motion: Motion) -> int:
+    total = 0
+    for name in FIELDS:
+        field = getattr(motion, name)
+        total += field.nbytes if not isinstance(field, torch.Tensor) else field.numel() * field.element_size()
+    return total
+
+
+def synchronize():
+    if args_cli.device.startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+def seconds_per_step(motion: Motion, frame_indexes: torch.Tensor) -> float:
+    def step():
+        # the reads done by the command, rewards and observations in one control step
+        for name in FIELDS:
+            getattr(motion, name)[frame_indexes]
+        motion.body_pos_w[frame_indexes, 0]
+        motion.body_quat_w[frame_indexes, 0]
+
+    for _ in range(10):
+        step()
+    synchronize()
+    start = time.perf_counter()
+    for _ in range(args_cli.steps):
+        step()
+    synchronize()
+    return (time.perf_counter() - start) / args_cli.steps
+
+
+def main():
+    device = args_cli.device
+    durations = [None] if args_cli.motion_file is not None else args_cli.durations
+    print(f"num_envs={args_cli.num_envs}, device={device}, num_clips={args_cli.num_clips}")
+    for duration in durations:
+        torch.manual_seed(0)
+        reference = make_motion(device, duration)
+        frames = reference.joint_pos.shape[0]
+        frame_indexes = torch.randint(0, frames, (args_cli.num_envs,), device=device)
+        base_bytes = nbytes(reference)
+        base_time = seconds_per_step(reference, frame_indexes)
+        label = args_cli.motion_file if duration is None else f"{duration:.0f} s x {args_cli.num_clips}"
+        print(f"\n{label}: {frames} frames, float32 {base_bytes / 2**20:.2f} MiB, {base_time * 1e3:.3f} ms/step")
+        print(f"{'mode':>8} {'memory':>8} {'step [ms]':>10} " + " ".join(f"{name:>15}" for name in FIELDS))
+        for mode in QUANTIZATION_MODES:
+            torch.manual_seed(0)
+            motion = make_motion(device, duration)
+            quantize_motion(motion, mode)
+            errors = []
+            for name in FIELDS:
+                error = (getattr(motion, name).dequantize() - getattr(reference, name)).abs().max().item()
+                errors.append(f"{error:>15.2e}")
+            step_time = seconds_per_step(motion, frame_indexes)
+            memory = f"{nbytes(motion) / base_bytes:.0%}"
+            print(f"{mode:>8} {memory:>8} {step_time * 1e3:>10.3f} " + " ".join(errors))
+    print("\nerrors are the max absolute difference to float32 per field")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Equivalence check and benchmark of the relative body pose update of the motion command.
+
+Compares :func:`relative_body_pose` (eager and compiled) with the previous implementation, which repeated the anchor
+tensors over the bodies, on random inputs, and reports the largest difference and the time per update. The check
+fails if a difference exceeds ``--atol``.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/benchmarks/relative_pose.py --headless --num_envs 4096 --device cuda:0
+"""
+
+"""Launch Isaac Sim Simulator first."""
+
+import argparse
+
+from isaaclab.app import AppLauncher
+
+parser = argparse.ArgumentParser(description="Check and benchmark the relative body pose update.")
+parser.add_argument("--num_envs", type=int, default=4096, help="Number of environments.")
+parser.add_argument("--num_bodies", type=int, default=14, help="Number of tracked bodies.")
+parser.add_argument("--steps", type=int, default=200, help="Number of timed updates.")
+parser.add_argument("--atol", type=float, default=1e-5, help="Largest allowed difference to the previous update.")
+parser.add_argument("--no_compile", action="store_true", default=False, help="Skip the compiled update.")
+AppLauncher.add_app_launcher_args(parser)
+args_cli = parser.parse_args()
+
+app_launcher = AppLauncher(args_cli)
+simulation_app = app_launcher.app
+
+"""Rest everything follows."""
+
+import time
+import torch
+
+from isaaclab.utils.math import quat_apply, quat_inv, quat_mul, yaw_quat
+
+from whole_body_tracking.tasks.tracking.mdp.commands import relative_body_pose
+
+
+def reference_relative_body_pose(
+    anchor_pos_w, anchor_quat_w, robot_anchor_pos_w, robot_anchor_quat_w, body_pos_w, body_quat_w
+):
+    """The previous update, which repeated the anchor tensors over the bodies."""
+    num_bodies = body_pos_w.shape[1]
+    anchor_pos_w_repeat = anchor_pos_w[:, None, :].repeat(1, num_bodies, 1)
+    anchor_quat_w_repeat = anchor_quat_w[:, None, :].repeat(1, num_bodies, 1)
+    robot_anchor_pos_w_repeat = robot_anchor_pos_w[:, None, :].repeat(1, num_bodies, 1)
+    robot_anchor_quat_w_repeat = robot_anchor_quat_w[:, None, :].repeat(1, num_bodies, 1)
+
+    delta_pos_w = robot_anchor_pos_w_repeat
+    delta_pos_w[..., 2] = anchor_pos_w_repeat[..., 2]
+    delta_ori_w = yaw_quat(quat_mul(robot_anchor_quat_w_repeat, quat_inv(anchor_quat_w_repeat)))
+
+    body_quat_relative_w = quat_mul(delta_ori_w, body_quat_w)
+    body_pos_relative_w = delta_pos_w + quat_apply(delta_ori_w, body_pos_w - anchor_pos_w_repeat)
+    return body_pos_relative_w, body_quat_relative_w
+
+
+def synchronize():
+    if args_cli.device.startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+def seconds_per_update(fn) -> float:
+    for _ in range(10):
+        fn()
+    synchronize()
+    start = time.perf_counter()
+    for _ in range(args_cli.steps):
+        fn()
+    synchronize()
+    return (time.perf_counter() - start) / args_cli.steps
+
+
+def main():
+    device, n, b = args_cli.device, args_cli.num_envs, args_cli.num_bodies
+    generator = torch.Generator(device=device).manual_seed(0)
+
+    def random_quat(*shape):
+        return torch.nn.functional.normalize(torch.randn(*shape, 4, device=device, generator=generator), dim=-1)
+
+    inputs = (
+        torch.randn(n, 3, device=device, generator=generator),
+        random_quat(n),
+        torch.randn(n, 3, device=device, generator=generator),
+        random_quat(n),
+        torch.randn(n, b, 3, device=device, generator=generator),
+        random_quat(n, b),
+    )
+    out_pos = torch.zeros(n, b, 3, device=device)
+    out_quat = torch.zeros(n, b, 4, device=device)
+    expected_pos, expected_quat = reference_relative_body_pose(*inputs)
+
+    variants = {"eager": relative_body_pose}
+    if not args_cli.no_compile:
+        variants["compiled"] = torch.compile(relative_body_pose, dynamic=False)
+
+    print(f"num_envs={n}, num_bodies={b}, device={device}")
+    t_reference = seconds_per_update(lambda: reference_relative_body_pose(*inputs))
+    print(f"{'previous':>10}: {t_reference * 1e3:.3f} ms/update")
+    passed = True
+    for name, fn in variants.items():
+        fn(*inputs, out_pos, out_quat)
+        error = max((out_pos - expected_pos).abs().max().item(), (out_quat - expected_quat).abs().max().item())
+        passed &= error <= args_cli.atol
+        t = seconds_per_update(lambda: fn(*inputs, out_pos, out_quat))
+        print(f"{name:>10}: {t * 1e3:.3f} ms/update ({t_reference / t:.2f}x), max difference {error:.2e}")
+    assert passed, f"relative body pose differs from the previous update by more than {args_cli.atol}"
+    print("relative body pose matches the previous update")
+
+
+if __name__ == "__main__":
+    main()
+    simulation_app.close()
@@ -1,23 +1,45 @@
-"""This script replay a motion from a csv file and output it to a npz file
+"""This script replay motions from csv files and output them to npz files
+
+The input is a motion file, a directory of motion files or a manifest (``.txt``) listing one motion file per line. The
+motion files are retargeted CSV files, GMR pickles (``.pkl``) or holosoma ``qpos`` npz files, which are read directly
+(see :mod:`whole_body_tracking.utils.motion_readers`) without converting them to CSV first. All clips are
+converted in one simulator process: every env of the scene replays one clip, and when a clip ends its npz file is
+written and the env continues with the next clip. Files are written atomically and recorded in the manifest of the
+output directory (see :mod:`whole_body_tracking.utils.motion_manifest`) with the content hash of their source and the
+conversion parameters. The clips whose record matches are skipped, so an interrupted batch resumes where it left off
+and a re-run only converts the new and changed clips.
 
 .. code-block:: bash
 
     # Usage
     python csv_to_npz.py --input_file LAFAN/dance1_subject2.csv --input_fps 30 --frame_range 122 722 \
-    --output_file ./motions/dance1_subject2.npz --output_fps 50
+    --output_name dance1_subject2 --output_fps 50 --headless
+    python csv_to_npz.py --input_file LAFAN/ --output_dir ./motions --num_envs 32 --headless
+    python csv_to_npz.py --input_file ~/GMR/retargeted_demo_data/ --output_suffix _original --headless
 """
 
 """Launch Isaac Sim Simulator first."""
 
 import argparse
 import numpy as np
+import os
 
 from isaaclab.app import AppLauncher
 
 # add argparse arguments
 parser = argparse.ArgumentParser(description="Replay motion from csv file and output to npz file.")
-parser.add_argument("--input_file", type=str, required=True, help="The path to the input motion csv file.")
-parser.add_argument("--input_fps", type=int, default=30, help="The fps of the input motion.")
+parser.add_argument(
+    "--input_file",
+    type=str,
+    required=True,
+    help="The path to the input motion file, a directory of motion files or a manifest (.txt) of motion files.",
+)
+parser.add_argument(
+    "--input_fps",
+    type=int,
+    default=None,
+    help="The fps of the input motion. Defaults to the fps stored in the motion file, or 30 for csv files.",
+)
 parser.add_argument(
     "--frame_range",
     nargs=2,
@@ -25,11 +47,22 @@ parser.add_argument(
     metavar=("START", "END"),
     help=(
         "frame range: START END (both inclusive). The frame index starts from 1. If not provided, all frames will be"
-        " loaded."
+        " loaded. Applies to every clip."
     ),
 )
-parser.add_argument("--output_name", type=str, required=True, help="The name of the motion npz file.")
+parser.add_argument(
+    "--output_name", type=str, default=None, help="The name of the motion npz file. Defaults to the motion file name."
+)
+parser.add_argument(
+    "--output_dir",
+    type=str,
+    default=os.path.expanduser("~/whole_body_tracking/motions"),
+    help="The directory of the motion npz files.",
+)
+parser.add_argument("--output_suffix", type=str, default="", help="Suffix appended to the motion file names.")
 parser.add_argument("--output_fps", type=int, default=50, help="The fps of the output motion.")
+parser.add_argument("--num_envs", type=int, default=16, help="Number of clips replayed at the same time.")
+parser.add_argument("--overwrite", action="store_true", default=False, help="Convert the up-to-date clips as well.")
 
 # append AppLauncher cli args
 AppLauncher.add_app_launcher_args(parser)
@@ -50,12 +83,22 @@ from isaaclab.scene import InteractiveScene, InteractiveSceneCfg
 from isaaclab.sim import SimulationContext
 from isaaclab.utils import configclass
 from isaaclab.utils.assets import ISAAC_NUCLEUS_DIR
-from isaaclab.utils.math import axis_angle_from_quat, quat_conjugate, quat_mul, quat_slerp
 
 ##
 # Pre-defined configs
 ##
 from whole_body_tracking.robots.g1 import G1_CYLINDER_CFG
+from whole_body_tracking.utils.motion_cache import file_digest
+from whole_body_tracking.utils.motion_conversion import (
+    CSV_JOINT_NAMES,
+    DEFAULT_PAD_FRAMES,
+    finite_difference_velocities,
+    padding_fields,
+    resample,
+    save_motion,
+)
+from whole_body_tracking.utils.motion_manifest import ConversionManifest, source_stamp
+from whole_body_tracking.utils.motion_readers import DEFAULT_INPUT_FPS, find_motion_files, read_motion
 
 
 @configclass
@@ -82,7 +125,7 @@ class MotionLoader:
     def __init__(
         self,
         motion_file: str,
-        input_fps: int,
+        input_fps: int | None,
         output_fps: int,
         device: torch.device,
         frame_range: tuple[int, int] | None,
@@ -90,9 +133,7 @@ class MotionLoader:
         self.motion_file = motion_file
         self.input_fps = input_fps
         self.output_fps = output_fps
-        self.input_dt = 1.0 / self.input_fps
         self.output_dt = 1.0 / self.output_fps
-        self.current_idx = 0
         self.device = device
         self.frame_range = frame_range
         self._load_motion()
@@ -100,244 +141,307 @@ class MotionLoader:
         self._compute_velocities()
 
     def _load_motion(self):
-        """Loads the motion from the csv file."""
-        if self.frame_range is None:
-            motion = torch.from_numpy(np.loadtxt(self.motion_file, delimiter=","))
-        else:
-            motion = torch.from_numpy(
-                np.loadtxt(
-                    self.motion_file,
-                    delimiter=",",
-                    skiprows=self.frame_range[0] - 1,
-                    max_rows=self.frame_range[1] - self.frame_range[0] + 1,
-                )
-            )
-        motion = motion.to(torch.float32).to(self.device)
-        self.motion_base_poss_input = motion[:, :3]
-        self.motion_base_rots_input = motion[:, 3:7]
-        # self.motion_base_rots_input = self.motion_base_rots_input[:, [3, 0, 1, 2]]  # convert to wxyz
-        self.motion_dof_poss_input = motion[:, 7:]
+        """Loads the motion from the motion file."""
+        root_pos, root_quat, joint_pos, fps = read_motion(self.motion_file, self.frame_range)
+        self.motion_base_poss_input = root_pos.to(self.device)
+        self.motion_base_rots_input = root_quat.to(self.device)
+        self.motion_dof_poss_input = joint_pos.to(self.device)
+        self.input_fps = self.input_fps or fps or DEFAULT_INPUT_FPS
+        self.input_dt = 1.0 / self.input_fps
 
-        self.input_frames = motion.shape[0]
+        self.input_frames = self.motion_base_poss_input.shape[0]
         self.duration = (self.input_frames - 1) * self.input_dt
         print(f"Motion loaded ({self.motion_file}), duration: {self.duration} sec, frames: {self.input_frames}")
 
     def _interpolate_motion(self):
         """Interpolates the motion to the output fps."""
-        times = torch.arange(0, self.duration, self.output_dt, device=self.device, dtype=torch.float32)
-        self.output_frames = times.shape[0]
-        index_0, index_1, blend = self._compute_frame_blend(times)
-        self.motion_base_poss = self._lerp(
-            self.motion_base_poss_input[index_0],
-            self.motion_base_poss_input[index_1],
-            blend.unsqueeze(1),
-        )
-        self.motion_base_rots = self._slerp(
-            self.motion_base_rots_input[index_0],
-            self.motion_base_rots_input[index_1],
-            blend,
-        )
-        self.motion_dof_poss = self._lerp(
-            self.motion_dof_poss_input[index_0],
-            self.motion_dof_poss_input[index_1],
-            blend.unsqueeze(1),
+        self.motion_base_poss, self.motion_base_rots, self.motion_dof_poss = resample(
+            self.motion_base_poss_input,
+            self.motion_base_rots_input,
+            self.motion_dof_poss_input,
+            self.input_fps,
+            self.output_fps,
         )
+        self.output_frames = self.motion_base_poss.shape[0]
         print(
             f"Motion interpolated, input frames: {self.input_frames}, input fps: {self.input_fps}, output frames:"
             f" {self.output_frames}, output fps: {self.output_fps}"
         )
 
-    def _lerp(self, a: torch.Tensor, b: torch.Tensor, blend: torch.Tensor) -> torch.Tensor:
-        """Linear interpolation between two tensors."""
-        return a * (1 - blend) + b * blend
-
-    def _slerp(self, a: torch.Tensor, b: torch.Tensor, blend: torch.Tensor) -> torch.Tensor:
-        """Spherical linear interpolation between two quaternions."""
-        slerped_quats = torch.zeros_like(a)
-        for i in range(a.shape[0]):
-            slerped_quats[i] = quat_slerp(a[i], b[i], blend[i])
-        return slerped_quats
-
-    def _compute_frame_blend(self, times: torch.Tensor) -> torch.Tensor:
-        """Computes the frame blend for the motion."""
-        phase = times / self.duration
-        index_0 = (phase * (self.input_frames - 1)).floor().long()
-        index_1 = torch.minimum(index_0 + 1, torch.tensor(self.input_frames - 1))
-        blend = phase * (self.input_frames - 1) - index_0
-        return index_0, index_1, blend
-
     def _compute_velocities(self):
         """Computes the velocities of the motion."""
-        self.motion_base_lin_vels = torch.gradient(self.motion_base_poss, spacing=self.output_dt, dim=0)[0]
-        self.motion_dof_vels = torch.gradient(self.motion_dof_poss, spacing=self.output_dt, dim=0)[0]
-        self.motion_base_ang_vels = self._so3_derivative(self.motion_base_rots, self.output_dt)
+        self.motion_base_lin_vels, self.motion_base_ang_vels, self.motion_dof_vels = finite_difference_velocities(
+            self.motion_base_poss, self.motion_base_rots, self.motion_dof_poss, self.output_fps
+        )
 
-    def _so3_derivative(self, rotations: torch.Tensor, dt: float) -> torch.Tensor:
-        """Computes the derivative of a sequence of SO3 rotations.
+    def state(self) -> dict[str, torch.Tensor]:
+        """Returns the root and joint states of all output frames."""
+        return {
+            "base_pos": self.motion_base_poss,
+            "base_rot": self.motion_base_rots,
+            "base_lin_vel": self.motion_base_lin_vels,
+            "base_ang_vel": self.motion_base_ang_vels,
+            "dof_pos": self.motion_dof_poss,
+            "dof_vel": self.motion_dof_vels,
+        }
 
-        Args:
-            rotations: shape (B, 4).
-            dt: time step.
-        Returns:
-            shape (B, 3).
-        """
-        q_prev, q_next = rotations[:-2], rotations[2:]
-        q_rel = quat_mul(q_next, quat_conjugate(q_prev))  # shape (B−2, 4)
 
-        omega = axis_angle_from_quat(q_rel) / (2.0 * dt)  # shape (B−2, 3)
-        omega = torch.cat([omega[:1], omega, omega[-1:]], dim=0)  # repeat first and last sample
-        return omega
+class ClipBatch:
+    """Root and joint states of the clips replayed by the envs, padded to the longest clip.
 
-    def get_next_state(
-        self,
-    ) -> tuple[
-        torch.Tensor,
-        torch.Tensor,
-        torch.Tensor,
-        torch.Tensor,
-        torch.Tensor,
-        torch.Tensor,
-    ]:
-        """Gets the next state of the motion."""
-        state = (
-            self.motion_base_poss[self.current_idx : self.current_idx + 1],
-            self.motion_base_rots[self.current_idx : self.current_idx + 1],
-            self.motion_base_lin_vels[self.current_idx : self.current_idx + 1],
-            self.motion_base_ang_vels[self.current_idx : self.current_idx + 1],
-            self.motion_dof_poss[self.current_idx : self.current_idx + 1],
-            self.motion_dof_vels[self.current_idx : self.current_idx + 1],
-        )
-        self.current_idx += 1
-        reset_flag = False
-        if self.current_idx >= self.output_frames:
-            self.current_idx = 0
-            reset_flag = True
-        return state, reset_flag
-
-
-def run_simulator(sim: sim_utils.SimulationContext, scene: InteractiveScene, joint_names: list[str]):
-    """Runs the simulation loop."""
-    # Load motion
-    motion = MotionLoader(
-        motion_file=args_cli.input_file,
-        input_fps=args_cli.input_fps,
-        output_fps=args_cli.output_fps,
-        device=sim.device,
-        frame_range=args_cli.frame_range,
-    )
+    The frame of every env is kept on the host as well, so that finding the finished clips needs no device sync.
 
+    Args:
+        num_envs: Number of envs.
+        device: Device of the state buffers.
+    """
+
+    def __init__(self, num_envs: int, device: str):
+        self.num_envs = num_envs
+        self.device = device
+        self.buffers: dict[str, torch.Tensor] = {}
+        self.lengths = [0] * num_envs
+        self.frames = [0] * num_envs
+        self._env_ids = torch.arange(num_envs, device=device)
+        self._frames = torch.zeros(num_envs, dtype=torch.long, device=device)
+        self._lengths = torch.zeros(num_envs, dtype=torch.long, device=device)
+
+    def assign(self, env_id: int, motion: MotionLoader):
+        """Starts replaying a clip in an env."""
+        state = motion.state()
+        capacity = next(iter(self.buffers.values())).shape[1] if self.buffers else 0
+        if motion.output_frames > capacity:
+            for key, value in state.items():
+                buffer = torch.zeros(self.num_envs, motion.output_frames, value.shape[1], device=self.device)
+                if key in self.buffers:
+                    buffer[:, :capacity] = self.buffers[key]
+                self.buffers[key] = buffer
+        for key, value in state.items():
+            self.buffers[key][env_id, : motion.output_frames] = value
+        self.lengths[env_id] = motion.output_frames
+        self.frames[env_id] = 0
+        self._lengths[env_id] = motion.output_frames
+        self._frames[env_id] = 0
+
+    def current(self) -> dict[str, torch.Tensor]:
+        """Returns the states of the current frames. Envs past the end of their clip hold its last frame."""
+        frames = torch.minimum(self._frames, (self._lengths - 1).clamp(min=0))
+        return {key: buffer[self._env_ids, frames] for key, buffer in self.buffers.items()}
+
+    def advance(self, env_ids: list[int]):
+        """Moves the envs to their next frame."""
+        for env_id in env_ids:
+            self.frames[env_id] += 1
+        self._frames[env_ids] += 1
+
+    def finished(self, env_ids: list[int]) -> list[int]:
+        """Returns the envs that replayed all frames of their clip."""
+        return [env_id for env_id in env_ids if self.frames[env_id] >= self.lengths[env_id]]
+
+
+class TrajectoryRecorder:
+    """Records the robot state of every env into one preallocated device buffer, indexed by env and frame.
+
+    The fields of a frame are packed next to each other, so the trajectory of a clip is copied to the host in one
+    transfer once the clip is finished, instead of one copy per field and frame.
+
+    Args:
+        fields: Shape of one frame of every recorded field.
+        num_envs: Number of envs.
+        capacity: Number of frames, grown by :meth:`reserve` for longer clips.
+        device: Device of the buffer.
+    """
+
+    def __init__(self, fields: dict[str, tuple[int, ...]], num_envs: int, capacity: int, device: str):
+        self.fields = fields
+        self.num_envs = num_envs
+        self.device = device
+        self._slices = {}
+        offset = 0
+        for key, shape in fields.items():
+            size = int(np.prod(shape))
+            self._slices[key] = slice(offset, offset + size)
+            offset += size
+        self._frame_size = offset
+        self._buffer = torch.empty(num_envs, 0, self._frame_size, device=device)
+        self._views: dict[str, torch.Tensor] = {}
+        self.reserve(capacity)
+
+    def reserve(self, capacity: int):
+        """Grows the buffer to hold at least ``capacity`` frames, keeping the recorded frames."""
+        if capacity <= self._buffer.shape[1]:
+            return
+        buffer = torch.empty(self.num_envs, capacity, self._frame_size, device=self.device)
+        buffer[:, : self._buffer.shape[1]] = self._buffer
+        self._buffer = buffer
+        self._views = {key: buffer[..., self._slices[key]].unflatten(-1, shape) for key, shape in self.fields.items()}
+
+    def record(self, env_ids: torch.Tensor, frames: torch.Tensor, values: dict[str, torch.Tensor]):
+        """Writes the values of the envs at their frames.
+
+        Args:
+            env_ids: The recorded envs. Shape is (N,).
+            frames: The frame of every recorded env. Shape is (N,).
+            values: The value of every field for the recorded envs. Shapes are (N, *shape).
+        """
+        for key, view in self._views.items():
+            view[env_ids, frames] = values[key]
+
+    def trajectory(self, env_id: int, num_frames: int) -> dict[str, np.ndarray]:
+        """Copies the first frames of an env to the host and returns them per field."""
+        frames = self._buffer[env_id, :num_frames].cpu().numpy()
+        return {key: frames[:, self._slices[key]].reshape(num_frames, *shape) for key, shape in self.fields.items()}
+
+
+def output_file(motion_file: str, num_files: int) -> str:
+    """Returns the npz file of a motion file."""
+    if args_cli.output_name is not None and num_files == 1:
+        name = args_cli.output_name
+    else:
+        name = os.path.splitext(os.path.basename(motion_file))[0] + args_cli.output_suffix
+    path = os.path.join(args_cli.output_dir, f"{name}.npz")
+    if os.path.abspath(path) == os.path.abspath(motion_file):
+        raise ValueError(f"The npz file of {motion_file} would overwrite it, set --output_dir or --output_suffix.")
+    return path
+
+
+def run_simulator(
+    sim: sim_utils.SimulationContext,
+    scene: InteractiveScene,
+    joint_names: list[str],
+    pending: list[str],
+    outputs: dict[str, str],
+    manifest: ConversionManifest,
+    params: dict,
+):
+    """Runs the simulation loop until the pending clips are converted, and records them in the manifest."""
     # Extract scene entities
     robot = scene["robot"]
     robot_joint_indexes = robot.find_joints(joint_names, preserve_order=True)[0]
+    batch = ClipBatch(scene.num_envs, sim.device)
+    clips: list[str | None] = [None] * scene.num_envs
+    # content hash and stamp of the source of every clip, taken before it is read
+    sources: list[tuple[str, list[int]] | None] = [None] * scene.num_envs
+    recorder = TrajectoryRecorder(
+        {
+            "joint_pos": (robot.num_joints,),
+            "joint_vel": (robot.num_joints,),
+            "body_pos_w": (robot.num_bodies, 3),
+            "body_quat_w": (robot.num_bodies, 4),
+            "body_lin_vel_w": (robot.num_bodies, 3),
+            "body_ang_vel_w": (robot.num_bodies, 3),
+        },
+        num_envs=scene.num_envs,
+        capacity=0,
+        device=sim.device,
+    )
+    # rendering is only needed to look at the replay, the body states are updated by the kinematic forward pass
+    visual = sim.has_gui()
+
+    def start_next_clip(env_id: int):
+        clips[env_id] = None
+        if pending:
+            clips[env_id] = pending.pop(0)
+            sources[env_id] = (file_digest(clips[env_id]), source_stamp(clips[env_id]))
+            motion = MotionLoader(
+                motion_file=clips[env_id],
+                input_fps=args_cli.input_fps,
+                output_fps=args_cli.output_fps,
+                device=sim.device,
+                frame_range=args_cli.frame_range,
+            )
+            batch.assign(env_id, motion)
+            recorder.reserve(motion.output_frames)
 
-    # ------- data logger -------------------------------------------------------
-    log = {
-        "fps": [args_cli.output_fps],
-        "joint_pos": [],
-        "joint_vel": [],
-        "body_pos_w": [],
-        "body_quat_w": [],
-        "body_lin_vel_w": [],
-        "body_ang_vel_w": [],
-        # Store names for cross-simulator compatibility (e.g., Isaac Lab -> MuJoCo)
-        "body_names": list(robot.body_names),
-        "joint_names": list(robot.joint_names),
-    }
-    file_saved = False
-    # --------------------------------------------------------------------------
+    for env_id in range(scene.num_envs):
+        start_next_clip(env_id)
 
     # Simulation loop
-    while simulation_app.is_running():
-        (
-            (
-                motion_base_pos,
-                motion_base_rot,
-                motion_base_lin_vel,
-                motion_base_ang_vel,
-                motion_dof_pos,
-                motion_dof_vel,
-            ),
-            reset_flag,
-        ) = motion.get_next_state()
+    while simulation_app.is_running() and any(clip is not None for clip in clips):
+        state = batch.current()
 
         # set root state
         root_states = robot.data.default_root_state.clone()
-        root_states[:, :3] = motion_base_pos
+        root_states[:, :3] = state["base_pos"]
         root_states[:, :2] += scene.env_origins[:, :2]
-        root_states[:, 3:7] = motion_base_rot
-        root_states[:, 7:10] = motion_base_lin_vel
-        root_states[:, 10:] = motion_base_ang_vel
+        root_states[:, 3:7] = state["base_rot"]
+        root_states[:, 7:10] = state["base_lin_vel"]
+        root_states[:, 10:] = state["base_ang_vel"]
         robot.write_root_state_to_sim(root_states)
 
         # set joint state
         joint_pos = robot.data.default_joint_pos.clone()
         joint_vel = robot.data.default_joint_vel.clone()
-        joint_pos[:, robot_joint_indexes] = motion_dof_pos
-        joint_vel[:, robot_joint_indexes] = motion_dof_vel
+        joint_pos[:, robot_joint_indexes] = state["dof_pos"]
+        joint_vel[:, robot_joint_indexes] = state["dof_vel"]
         robot.write_joint_state_to_sim(joint_pos, joint_vel)
-        sim.render()  # We don't want physic (sim.step())
+        # We don't want physic (sim.step()), render() also runs the kinematic forward pass
+        if visual:
+            sim.render()
+        else:
+            sim.forward()
         scene.update(sim.get_physics_dt())
 
-        pos_lookat = root_states[0, :3].cpu().numpy()
-        sim.set_camera_view(pos_lookat + np.array([2.0, 2.0, 0.5]), pos_lookat)
-
-        if not file_saved:
-            log["joint_pos"].append(robot.data.joint_pos[0, :].cpu().numpy().copy())
-            log["joint_vel"].append(robot.data.joint_vel[0, :].cpu().numpy().copy())
-            log["body_pos_w"].append(robot.data.body_pos_w[0, :].cpu().numpy().copy())
-            log["body_quat_w"].append(robot.data.body_quat_w[0, :].cpu().numpy().copy())
-            log["body_lin_vel_w"].append(robot.data.body_lin_vel_w[0, :].cpu().numpy().copy())
-            log["body_ang_vel_w"].append(robot.data.body_ang_vel_w[0, :].cpu().numpy().copy())
-
-        if reset_flag and not file_saved:
-            file_saved = True
-            for k in (
-                "joint_pos",
-                "joint_vel",
-                "body_pos_w",
-                "body_quat_w",
-                "body_lin_vel_w",
-                "body_ang_vel_w",
-            ):
-                log[k] = np.stack(log[k], axis=0)
-
-                # extend the start and end of the motion by repeating the frames
-                N_repeat = int(1 * 50) # 1s at 50hz
-                start_pad = np.repeat(log[k][:1], N_repeat, axis=0)
-                end_pad = np.repeat(log[k][-1:], N_repeat, axis=0)
-
-                log[k] = np.concatenate([
-                    start_pad,
-                    log[k],
-                    end_pad
-                    ], axis=0)
-
-            np.savez("/tmp/motion.npz", **log)
-            np.savez(f"/home/nima/whole_body_tracking/motions/{args_cli.output_name}.npz", **log)
-
-            print("Goodbye")
-            import sys
-            sys.exit(0)
-
-            # import wandb
-
-            # COLLECTION = args_cli.output_name
-            # run = wandb.init(project="csv_to_npz", name=COLLECTION)
-            # print(f"[INFO]: Logging motion to wandb: {COLLECTION}")
-            # REGISTRY = "motions"
-            # logged_artifact = run.log_artifact(artifact_or_path="/tmp/motion.npz", name=COLLECTION, type=REGISTRY)
-            # run.link_artifact(artifact=logged_artifact, target_path=f"wandb-registry-{REGISTRY}/{COLLECTION}")
-            # print(f"[INFO]: Motion saved to wandb registry: {REGISTRY}/{COLLECTION}")
+        if visual:
+            pos_lookat = root_states[0, :3].cpu().numpy()
+            sim.set_camera_view(pos_lookat + np.array([2.0, 2.0, 0.5]), pos_lookat)
+
+        # record the envs that replay a clip, the body positions relative to their env origin
+        active = [env_id for env_id, clip in enumerate(clips) if clip is not None]
+        env_ids = torch.tensor(active, device=sim.device)
+        frames = torch.tensor([batch.frames[env_id] for env_id in active], device=sim.device)
+        values = {key: getattr(robot.data, key)[env_ids] for key in recorder.fields}
+        values["body_pos_w"] = values["body_pos_w"] - scene.env_origins[env_ids, None, :]
+        recorder.record(env_ids, frames, values)
+        batch.advance(active)
+
+        for env_id in batch.finished(active):
+            log = {
+                "fps": np.array([args_cli.output_fps]),
+                **recorder.trajectory(env_id, batch.lengths[env_id]),
+                # Store names for cross-simulator compatibility (e.g., Isaac Lab -> MuJoCo)
+                "body_names": np.array(robot.body_names),
+                "joint_names": np.array(robot.joint_names),
+                # extend the start and end of the motion by repeating the frames when it is played
+                **padding_fields(DEFAULT_PAD_FRAMES, DEFAULT_PAD_FRAMES),
+            }
+            save_motion(outputs[clips[env_id]], log)
+            digest, stamp = sources[env_id]
+            manifest.record(os.path.basename(outputs[clips[env_id]]), clips[env_id], digest, params, stamp=stamp)
+            print(f"[INFO]: Saved {outputs[clips[env_id]]}, {len(pending)} clips left")
+            start_next_clip(env_id)
+
+    print("Goodbye")
 
 
 def main():
     """Main function."""
+    # Resolve the clips that are not converted yet, the others were converted by an earlier run
+    motion_files = find_motion_files(args_cli.input_file)
+    outputs = {motion_file: output_file(motion_file, len(motion_files)) for motion_file in motion_files}
+    manifest = ConversionManifest(args_cli.output_dir)
+    params = {
+        "input_fps": args_cli.input_fps,
+        "output_fps": args_cli.output_fps,
+        "frame_range": args_cli.frame_range,
+        "pad_frames": DEFAULT_PAD_FRAMES,
+        "robot": file_digest(G1_CYLINDER_CFG.spawn.usd_path),
+    }
+    pending = [
+        path
+        for path in motion_files
+        if args_cli.overwrite or not manifest.is_current(os.path.basename(outputs[path]), path, params)
+    ]
+    print(f"[INFO]: {len(pending)} of {len(motion_files)} clips to convert, the others are up to date")
+    if not pending:
+        return
+
     # Load kit helper
     sim_cfg = sim_utils.SimulationCfg(device=args_cli.device)
     sim_cfg.dt = 1.0 / args_cli.output_fps
     sim = SimulationContext(sim_cfg)
     # Design scene
-    scene_cfg = ReplayMotionsSceneCfg(num_envs=1, env_spacing=2.0)
+    scene_cfg = ReplayMotionsSceneCfg(num_envs=min(args_cli.num_envs, len(pending)), env_spacing=2.0)
     scene = InteractiveScene(scene_cfg)
     # Play the simulator
     sim.reset()
@@ -366,40 +470,9 @@ def main():
 
     # Run the simulator
     run_simulator(
-        sim,
-        scene,
-        joint_names=[
-            "left_hip_pitch_joint",
-            "left_hip_roll_joint",
-            "left_hip_yaw_joint",
-            "left_knee_joint",
-            "left_ankle_pitch_joint",
-            "left_ankle_roll_joint",
-            "right_hip_pitch_joint",
-            "right_hip_roll_joint",
-            "right_hip_yaw_joint",
-            "right_knee_joint",
-            "right_ankle_pitch_joint",
-            "right_ankle_roll_joint",
-            "waist_yaw_joint",
-            "waist_roll_joint",
-            "waist_pitch_joint",
-            "left_shoulder_pitch_joint",
-            "left_shoulder_roll_joint",
-            "left_shoulder_yaw_joint",
-            "left_elbow_joint",
-            "left_wrist_roll_joint",
-            "left_wrist_pitch_joint",
-            "left_wrist_yaw_joint",
-            "right_shoulder_pitch_joint",
-            "right_shoulder_roll_joint",
-            "right_shoulder_yaw_joint",
-            "right_elbow_joint",
-            "right_wrist_roll_joint",
-            "right_wrist_pitch_joint",
-            "right_wrist_yaw_joint",
-        ],
+        sim, scene, joint_names=CSV_JOINT_NAMES, pending=pending, outputs=outputs, manifest=manifest, params=params
     )
+    manifest.compact()
 
 
 if __name__ == "__main__":
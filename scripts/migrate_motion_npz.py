@@ -4,180 +4,148 @@
 This script adds the required metadata to motion files created with older versions
 of csv_to_npz.py, enabling cross-simulator compatibility (Isaac Lab -> MuJoCo).
 
+The metadata is appended to the zip archive of every file, after its arrays, which are neither read nor rewritten:
+the files are checked from the zip directory and the array headers only, so migrating a large motion store only costs
+metadata I/O. Before appending, the zip directory at the end of the file is saved to a journal next to it (written
+and renamed atomically); a migration interrupted before it completes is rolled back from the journal on the next run,
+so a file is either migrated or left unchanged. Files are processed on a pool of worker processes.
+
 Usage:
     python migrate_motion_npz.py --input_dir /path/to/motions
     python migrate_motion_npz.py --input_file /path/to/motion.npz
+    python migrate_motion_npz.py --input_dir /path/to/motions --dry_run
 """
 
 import argparse
 import glob
 import numpy as np
 import os
+import struct
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from whole_body_tracking.utils.motion_conversion import ISAAC_LAB_BODY_NAMES, ISAAC_LAB_JOINT_NAMES, npz_shape
+
+JOURNAL_SUFFIX = ".migrate"
+"""Suffix of the journal of a file being migrated, with the offset and the bytes of its original zip directory."""
+
+
+def _fsync(path: str):
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+def write_journal(filepath: str):
+    """Saves the zip directory at the end of a file, which appending members overwrites."""
+    with zipfile.ZipFile(filepath) as archive:
+        start_dir = archive.start_dir
+    with open(filepath, "rb") as f:
+        f.seek(start_dir)
+        tail = f.read()
+    journal = filepath + JOURNAL_SUFFIX
+    with open(journal + ".tmp", "wb") as f:
+        f.write(struct.pack("<Q", start_dir) + tail)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(journal + ".tmp", journal)
 
-# Isaac Lab body names for G1 robot (40 bodies in order)
-ISAAC_LAB_BODY_NAMES = [
-    "pelvis",
-    "imu_in_pelvis",
-    "left_hip_pitch_link",
-    "pelvis_contour_link",
-    "right_hip_pitch_link",
-    "waist_yaw_link",
-    "left_hip_roll_link",
-    "right_hip_roll_link",
-    "waist_roll_link",
-    "left_hip_yaw_link",
-    "right_hip_yaw_link",
-    "torso_link",
-    "left_knee_link",
-    "right_knee_link",
-    "head_link",
-    "imu_in_torso",
-    "left_shoulder_pitch_link",
-    "logo_link",
-    "mid360_link",
-    "right_shoulder_pitch_link",
-    "left_ankle_pitch_link",
-    "right_ankle_pitch_link",
-    "left_shoulder_roll_link",
-    "right_shoulder_roll_link",
-    "left_ankle_roll_link",
-    "right_ankle_roll_link",
-    "left_shoulder_yaw_link",
-    "right_shoulder_yaw_link",
-    "LL_FOOT",
-    "LR_FOOT",
-    "left_elbow_link",
-    "right_elbow_link",
-    "left_wrist_roll_link",
-    "right_wrist_roll_link",
-    "left_wrist_pitch_link",
-    "right_wrist_pitch_link",
-    "left_wrist_yaw_link",
-    "right_wrist_yaw_link",
-    "left_rubber_hand",
-    "right_racket",
-]
-
-# Isaac Lab joint names for G1 robot (29 joints in order)
-ISAAC_LAB_JOINT_NAMES = [
-    "left_hip_pitch_joint",
-    "left_hip_roll_joint",
-    "left_hip_yaw_joint",
-    "left_knee_joint",
-    "left_ankle_pitch_joint",
-    "left_ankle_roll_joint",
-    "right_hip_pitch_joint",
-    "right_hip_roll_joint",
-    "right_hip_yaw_joint",
-    "right_knee_joint",
-    "right_ankle_pitch_joint",
-    "right_ankle_roll_joint",
-    "waist_yaw_joint",
-    "waist_roll_joint",
-    "waist_pitch_joint",
-    "left_shoulder_pitch_joint",
-    "left_shoulder_roll_joint",
-    "left_shoulder_yaw_joint",
-    "left_elbow_joint",
-    "left_wrist_roll_joint",
-    "left_wrist_pitch_joint",
-    "left_wrist_yaw_joint",
-    "right_shoulder_pitch_joint",
-    "right_shoulder_roll_joint",
-    "right_shoulder_yaw_joint",
-    "right_elbow_joint",
-    "right_wrist_roll_joint",
-    "right_wrist_pitch_joint",
-    "right_wrist_yaw_joint",
-]
-
-
-def migrate_file(filepath: str, dry_run: bool = False) -> bool:
+
+def roll_back(filepath: str):
+    """Restores a file whose migration was interrupted to its original content, from its journal."""
+    journal = filepath + JOURNAL_SUFFIX
+    with open(journal, "rb") as f:
+        start_dir = struct.unpack("<Q", f.read(8))[0]
+        tail = f.read()
+    with open(filepath, "rb+") as f:
+        f.truncate(start_dir)
+        f.seek(start_dir)
+        f.write(tail)
+        f.flush()
+        os.fsync(f.fileno())
+    os.remove(journal)
+
+
+def append_members(filepath: str, members: dict[str, np.ndarray]):
+    """Appends arrays to a ``.npz`` file without rewriting its other members."""
+    write_journal(filepath)
+    with zipfile.ZipFile(filepath, mode="a", allowZip64=True) as archive:
+        for key, value in members.items():
+            with archive.open(f"{key}.npy", mode="w", force_zip64=True) as f:
+                np.lib.format.write_array(f, np.asanyarray(value), allow_pickle=False)
+    _fsync(filepath)
+    os.remove(filepath + JOURNAL_SUFFIX)
+
+
+def migrate_file(filepath: str, dry_run: bool = False) -> tuple[str, str]:
     """Add body_names and joint_names to a motion file if missing.
-    
-    Returns True if the file was modified.
+
+    Returns the outcome ("migrated", "would migrate", "interrupted", "up to date", "skipped" or "failed") and a message.
     """
-    data = dict(np.load(filepath))
-    modified = False
-    
-    # Check current state
-    has_body_names = "body_names" in data
-    has_joint_names = "joint_names" in data
-    
-    if has_body_names and has_joint_names:
-        print(f"  [SKIP] {filepath} - already has body_names and joint_names")
-        return False
-    
-    # Validate shapes match expected Isaac Lab format
-    body_count = data["body_pos_w"].shape[1]
-    joint_count = data["joint_pos"].shape[1]
-    
-    if body_count != len(ISAAC_LAB_BODY_NAMES):
-        print(f"  [WARN] {filepath} - unexpected body count {body_count} "
-              f"(expected {len(ISAAC_LAB_BODY_NAMES)})")
-        return False
-        
-    if joint_count != len(ISAAC_LAB_JOINT_NAMES):
-        print(f"  [WARN] {filepath} - unexpected joint count {joint_count} "
-              f"(expected {len(ISAAC_LAB_JOINT_NAMES)})")
-        return False
-    
-    # Add missing metadata
-    if not has_body_names:
-        data["body_names"] = np.array(ISAAC_LAB_BODY_NAMES)
-        modified = True
-        
-    if not has_joint_names:
-        data["joint_names"] = np.array(ISAAC_LAB_JOINT_NAMES)
-        modified = True
-    
-    if modified and not dry_run:
-        np.savez(filepath, **data)
-        print(f"  [OK] {filepath} - added metadata")
-    elif modified and dry_run:
-        print(f"  [DRY-RUN] {filepath} - would add metadata")
-        
-    return modified
+    try:
+        interrupted = os.path.isfile(filepath + JOURNAL_SUFFIX)
+        if interrupted and dry_run:
+            return "interrupted", "interrupted migration, would be rolled back and migrated"
+        if interrupted:
+            roll_back(filepath)
+
+        with zipfile.ZipFile(filepath) as archive:
+            keys = {name[: -len(".npy")] for name in archive.namelist() if name.endswith(".npy")}
+            missing = [key for key in ("body_names", "joint_names") if key not in keys]
+            if not missing:
+                return "up to date", "already has body_names and joint_names"
+            # validate shapes match expected Isaac Lab format, from the array headers only
+            body_count = npz_shape(archive, "body_pos_w")[1]
+            joint_count = npz_shape(archive, "joint_pos")[1]
+        if body_count != len(ISAAC_LAB_BODY_NAMES):
+            return "skipped", f"unexpected body count {body_count} (expected {len(ISAAC_LAB_BODY_NAMES)})"
+        if joint_count != len(ISAAC_LAB_JOINT_NAMES):
+            return "skipped", f"unexpected joint count {joint_count} (expected {len(ISAAC_LAB_JOINT_NAMES)})"
+
+        names = {"body_names": ISAAC_LAB_BODY_NAMES, "joint_names": ISAAC_LAB_JOINT_NAMES}
+        if dry_run:
+            return "would migrate", f"would add {', '.join(missing)}"
+        append_members(filepath, {key: np.array(names[key]) for key in missing})
+        return "migrated", f"added {', '.join(missing)}" + (" after rolling back" if interrupted else "")
+    except Exception as error:
+        return "failed", str(error)
 
 
 def main():
-    parser = argparse.ArgumentParser(
-        description="Migrate motion .npz files to include body_names and joint_names"
-    )
-    parser.add_argument(
-        "--input_dir",
-        type=str,
-        help="Directory containing motion .npz files to migrate"
-    )
-    parser.add_argument(
-        "--input_file",
-        type=str,
-        help="Single motion .npz file to migrate"
-    )
+    parser = argparse.ArgumentParser(description="Migrate motion .npz files to include body_names and joint_names")
+    parser.add_argument("--input_dir", type=str, help="Directory containing motion .npz files to migrate")
+    parser.add_argument("--input_file", type=str, help="Single motion .npz file to migrate")
     parser.add_argument(
-        "--dry_run",
-        action="store_true",
-        help="Don't actually modify files, just print what would be done"
+        "--dry_run", action="store_true", help="Don't actually modify files, just print what would be done"
     )
+    parser.add_argument("--num_workers", type=int, default=os.cpu_count(), help="Number of worker processes")
     args = parser.parse_args()
-    
+
     if not args.input_dir and not args.input_file:
         parser.error("Must specify either --input_dir or --input_file")
-    
+
     files = []
     if args.input_file:
         files.append(args.input_file)
     if args.input_dir:
         files.extend(glob.glob(os.path.join(args.input_dir, "*.npz")))
-    
+    # the same file given twice (e.g. --input_file inside --input_dir) would race on its journal in two workers
+    files = sorted({os.path.realpath(f) for f in files})
+
     print(f"Found {len(files)} .npz files to process")
-    
-    modified_count = 0
-    for filepath in sorted(files):
-        if migrate_file(filepath, dry_run=args.dry_run):
-            modified_count += 1
-    
-    print(f"\nDone! Modified {modified_count}/{len(files)} files")
+
+    outcomes = Counter()
+    num_workers = max(1, min(args.num_workers, len(files)))
+    with ProcessPoolExecutor(num_workers) as pool:
+        results = pool.map(migrate_file, files, [args.dry_run] * len(files), chunksize=64)
+        for filepath, (outcome, message) in zip(files, results):
+            outcomes[outcome] += 1
+            if outcome != "up to date":
+                print(f"  [{outcome.upper()}] {filepath} - {message}")
+
+    print(f"\n{'Dry run' if args.dry_run else 'Done'}! " + ", ".join(f"{n} {o}" for o, n in sorted(outcomes.items())))
+    if outcomes["failed"]:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,76 @@
+"""Compress motion files into archives for storage and transfer, and decode them back.
+
+``encode`` reads every archive back and reports the largest round-trip error of every field, see
+:mod:`whole_body_tracking.utils.motion_archive`.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/motion_archive.py encode --input motions --output_dir motions_archive
+    python scripts/motion_archive.py decode --input motions_archive --output_dir motions
+"""
+
+import argparse
+import glob
+import numpy as np
+import os
+import time
+
+from whole_body_tracking.utils.motion_archive import (
+    ARCHIVE_SUFFIX,
+    decode_archive,
+    encode_motion_file,
+    read_archive,
+    round_trip_error,
+)
+
+parser = argparse.ArgumentParser(description="Encode motion files into compressed archives, or decode archives.")
+parser.add_argument("command", choices=["encode", "decode"], help="Archive operation.")
+parser.add_argument("--input", type=str, required=True, help="A file, a directory or a glob pattern of input files.")
+parser.add_argument("--output_dir", type=str, required=True, help="The directory of the output files.")
+parser.add_argument(
+    "--position_resolution", type=float, default=None, help="Quantization step of the positions. Defaults to 1e-5."
+)
+args_cli = parser.parse_args()
+
+
+def input_files(suffix: str) -> list[str]:
+    pattern = os.path.join(args_cli.input, f"*{suffix}") if os.path.isdir(args_cli.input) else args_cli.input
+    files = sorted(glob.glob(pattern))
+    assert len(files) > 0, f"No input files found for: {args_cli.input}"
+    return files
+
+
+def main():
+    start = time.perf_counter()
+    if args_cli.command == "encode":
+        resolutions = None
+        if args_cli.position_resolution is not None:
+            resolutions = {"joint_pos": args_cli.position_resolution, "body_pos_w": args_cli.position_resolution}
+        input_size = output_size = 0
+        worst = {}
+        for motion_file in input_files(".npz"):
+            name = os.path.splitext(os.path.basename(motion_file))[0]
+            path = os.path.join(args_cli.output_dir, name + ARCHIVE_SUFFIX)
+            encode_motion_file(motion_file, path, resolutions)
+            with np.load(motion_file) as data:
+                errors = round_trip_error({key: data[key] for key in data.files}, read_archive(path))
+            for field, error in errors.items():
+                worst[field] = max(worst.get(field, 0.0), error)
+            input_size += os.path.getsize(motion_file)
+            output_size += os.path.getsize(path)
+            print(f"{os.path.getsize(motion_file) / os.path.getsize(path):>6.1f}x  {path}")
+        print(f"{input_size / 2**20:.1f} MiB -> {output_size / 2**20:.1f} MiB ({input_size / output_size:.1f}x)")
+        print("largest round-trip errors:")
+        for field, error in worst.items():
+            print(f"  {field:<16} {error:.3g}{' rad' if field == 'body_quat_w' else ''}")
+    else:
+        for path in input_files(ARCHIVE_SUFFIX):
+            name = os.path.basename(path)[: -len(ARCHIVE_SUFFIX)]
+            decode_archive(path, os.path.join(args_cli.output_dir, f"{name}.npz"))
+        print(f"Decoded the archives into {args_cli.output_dir}")
+    print(f"[INFO]: Done in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Inspect and prune the preprocessed motion cache.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/motion_cache.py info
+    python scripts/motion_cache.py prune --max_gb 5
+    python scripts/motion_cache.py clear --cache_dir /tmp/motion_cache
+"""
+
+import argparse
+import time
+
+from whole_body_tracking.utils.motion_cache import (
+    DEFAULT_MAX_BYTES,
+    clear,
+    default_cache_dir,
+    list_shards,
+    prune,
+)
+
+parser = argparse.ArgumentParser(description="Inspect and prune the preprocessed motion cache.")
+parser.add_argument("command", choices=["info", "prune", "clear"], help="Cache operation.")
+parser.add_argument("--cache_dir", type=str, default=None, help="Cache directory. Defaults to the default cache.")
+parser.add_argument("--max_gb", type=float, default=DEFAULT_MAX_BYTES / 2**30, help="Size limit in GiB.")
+args_cli = parser.parse_args()
+
+
+def main():
+    cache_dir = default_cache_dir() if args_cli.cache_dir is None else args_cli.cache_dir
+    max_bytes = int(args_cli.max_gb * 2**30)
+    if args_cli.command == "info":
+        shards = list_shards(cache_dir)
+        now = time.time()
+        for shard in shards:
+            age_h = (now - shard["last_used"]) / 3600.0
+            print(f"{shard['size'] / 2**20:>10.2f} MiB  {age_h:>8.1f} h ago  {shard['path']}")
+        total = sum(shard["size"] for shard in shards)
+        print(f"{cache_dir}: {len(shards)} shards, {total / 2**30:.3f} GiB (limit {args_cli.max_gb:.1f} GiB)")
+    elif args_cli.command == "prune":
+        removed = prune(cache_dir, max_bytes)
+        print(f"Removed {len(removed)} shards from {cache_dir}")
+    else:
+        print(f"Removed {clear(cache_dir)} shards from {cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
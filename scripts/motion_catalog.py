@@ -0,0 +1,82 @@
+"""Build and query the SQLite catalog of a motion directory.
+
+``update`` scans the new and changed motion files on all CPU cores, see :mod:`whole_body_tracking.utils.motion_catalog`.
+``query`` filters and sorts the clips, and ``--output`` writes the matching files as a manifest (``.txt``), which is a
+valid ``motion_file`` of the motion command.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/motion_catalog.py update --input motions
+    python scripts/motion_catalog.py query --input motions --order_by duration --descending --limit 20
+    python scripts/motion_catalog.py query --input motions --max_joint_vel 20 --output motions/slow.txt
+"""
+
+import argparse
+import glob
+import os
+import time
+
+from whole_body_tracking.utils.motion_catalog import CATALOG_NAME, CLIP_COLUMNS, MotionCatalog
+
+parser = argparse.ArgumentParser(description="Build and query the catalog of a motion directory.")
+parser.add_argument("command", choices=["update", "query"], help="Catalog operation.")
+parser.add_argument("--input", type=str, required=True, help="The directory of the motion npz files.")
+parser.add_argument("--catalog", type=str, default=None, help=f"The catalog. Defaults to {CATALOG_NAME} in --input.")
+parser.add_argument("--num_workers", type=int, default=os.cpu_count(), help="Number of worker processes.")
+parser.add_argument("--prune", action="store_true", default=False, help="Remove the clips whose file was deleted.")
+parser.add_argument("--min_duration", type=float, default=None, help="Shortest stored duration in seconds.")
+parser.add_argument("--max_duration", type=float, default=None, help="Longest stored duration in seconds.")
+parser.add_argument("--max_joint_vel", type=float, default=None, help="Largest peak joint velocity.")
+parser.add_argument("--max_root_speed", type=float, default=None, help="Largest peak root speed.")
+parser.add_argument("--fps", type=float, default=None, help="The fps of the clips.")
+parser.add_argument("--name", type=str, default=None, help="SQL LIKE pattern of the clip names, e.g. 'walk%%'.")
+parser.add_argument("--order_by", type=str, default="name", choices=CLIP_COLUMNS, help="The column to sort by.")
+parser.add_argument("--descending", action="store_true", default=False, help="Sort in descending order.")
+parser.add_argument("--limit", type=int, default=None, help="Largest number of clips.")
+parser.add_argument("--output", type=str, default=None, help="Write the matching files to a manifest (.txt).")
+args_cli = parser.parse_args()
+
+
+def main():
+    start = time.perf_counter()
+    catalog = MotionCatalog(args_cli.catalog or os.path.join(args_cli.input, CATALOG_NAME))
+    if args_cli.command == "update":
+        motion_files = sorted(glob.glob(os.path.join(args_cli.input, "*.npz")))
+        counts = catalog.update(motion_files, num_workers=args_cli.num_workers, prune=args_cli.prune)
+        print(
+            f"{len(catalog)} clips: {counts['scanned']} scanned, {counts['touched']} touched, {counts['unchanged']}"
+            f" unchanged, {counts['failed']} failed, {counts['removed']} removed"
+        )
+    else:
+        clips = catalog.query(
+            min_duration=args_cli.min_duration,
+            max_duration=args_cli.max_duration,
+            max_joint_vel=args_cli.max_joint_vel,
+            max_root_speed=args_cli.max_root_speed,
+            fps=args_cli.fps,
+            name_like=args_cli.name,
+            order_by=args_cli.order_by,
+            descending=args_cli.descending,
+            limit=args_cli.limit,
+        )
+        header = f"{'duration [s]':>12} {'frames':>7} {'played':>7} {'fps':>6} {'travel [m]':>10} {'root [m/s]':>10}"
+        print(f"{header} {'joint vel':>9}  name")
+        for clip in clips:
+            print(
+                f"{clip['duration']:>12.2f} {clip['frames']:>7} {clip['played_frames']:>7} {clip['fps']:>6.1f}"
+                f" {clip['root_travel']:>10.2f} {clip['peak_root_speed']:>10.2f} {clip['peak_joint_vel']:>9.2f}"
+                f"  {clip['name']}"
+            )
+        print(f"{len(clips)} of {len(catalog)} clips, {sum(clip['duration'] for clip in clips) / 60:.1f} min")
+        if args_cli.output is not None:
+            root = os.path.dirname(os.path.abspath(args_cli.output))
+            with open(args_cli.output, "w") as f:
+                f.writelines(os.path.relpath(clip["path"], root) + "\n" for clip in clips)
+            print(f"Wrote {args_cli.output}")
+    catalog.close()
+    print(f"[INFO]: Done in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
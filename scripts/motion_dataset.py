@@ -0,0 +1,58 @@
+"""Pack motion files into a sharded motion dataset, unpack it, or inspect it.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/motion_dataset.py pack --input "motions/*.npz" --dataset motions_dataset
+    python scripts/motion_dataset.py unpack --dataset motions_dataset --output_dir motions
+    python scripts/motion_dataset.py info --dataset motions_dataset
+"""
+
+import argparse
+import glob
+import os
+import time
+
+from whole_body_tracking.utils.motion_dataset import FIELDS, MotionDataset, export_clips, write_dataset
+
+parser = argparse.ArgumentParser(description="Pack, unpack or inspect a sharded motion dataset.")
+parser.add_argument("command", choices=["pack", "unpack", "info"], help="Dataset operation.")
+parser.add_argument("--dataset", type=str, required=True, help="The dataset directory.")
+parser.add_argument("--input", type=str, help="The motion files to pack: a directory of npz files or a glob pattern.")
+parser.add_argument("--output_dir", type=str, help="The directory of the unpacked npz files.")
+parser.add_argument("--clips", nargs="+", type=str, default=None, help="Names of the clips to unpack. Defaults to all.")
+args_cli = parser.parse_args()
+
+
+def main():
+    start = time.perf_counter()
+    if args_cli.command == "pack":
+        if args_cli.input is None:
+            parser.error("pack requires --input")
+        pattern = os.path.join(args_cli.input, "*.npz") if os.path.isdir(args_cli.input) else args_cli.input
+        motion_files = sorted(glob.glob(pattern))
+        assert len(motion_files) > 0, f"No motion files found for: {args_cli.input}"
+        index = write_dataset(motion_files, args_cli.dataset)
+        print(f"Packed {len(index['clips'])} clips, {index['num_frames']} frames into {args_cli.dataset}")
+    elif args_cli.command == "unpack":
+        if args_cli.output_dir is None:
+            parser.error("unpack requires --output_dir")
+        paths = export_clips(args_cli.dataset, args_cli.output_dir, args_cli.clips)
+        print(f"Unpacked {len(paths)} clips into {args_cli.output_dir}")
+    else:
+        dataset = MotionDataset(args_cli.dataset)
+        for clip in dataset.clips:
+            print(
+                f"{clip['length']:>8} frames  {clip['fps']:>6.1f} fps  pad {clip['pad_start']:>3}/{clip['pad_end']:<3} "
+                f" {clip['name']}"
+            )
+        size = sum(os.path.getsize(os.path.join(args_cli.dataset, f"{field}.npy")) for field in FIELDS)
+        print(
+            f"{args_cli.dataset}: {len(dataset)} clips, {dataset.index['num_frames']} frames,"
+            f" {len(dataset.body_names or [])} bodies, {len(dataset.joint_names or [])} joints, {size / 2**20:.1f} MiB"
+        )
+    print(f"[INFO]: Done in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Inspect, clear and test the node-local shared-memory motion store.
+
+The ``selftest`` command starts several local processes that load the same motion files through the store, checks
+that exactly one of them decoded every motion while the others attached to it, and compares the attached arrays with
+a private decode of the files. It only needs the cpu.
+
+.. code-block:: bash
+
+    # Usage
+    python scripts/motion_shm.py list
+    python scripts/motion_shm.py clear
+    python scripts/motion_shm.py selftest --motion_file "motions/*.npz" --num_processes 8
+"""
+
+import argparse
+import glob
+import multiprocessing as mp
+import numpy as np
+import time
+
+from whole_body_tracking.utils.motion_shm import BODY_FIELDS, JOINT_FIELDS, clear, list_segments, load_motion_shared
+
+parser = argparse.ArgumentParser(description="Inspect, clear and test the shared-memory motion store.")
+parser.add_argument("command", choices=["list", "clear", "selftest"], help="Store operation.")
+parser.add_argument("--motion_file", type=str, default=None, help="Motion file or glob pattern for the self test.")
+parser.add_argument("--body_indexes", nargs="+", type=int, default=None, help="Tracked body indexes.")
+parser.add_argument("--num_processes", type=int, default=4, help="Number of processes of the self test.")
+args_cli = parser.parse_args()
+
+
+def worker(motion_files: list[str], body_indexes: list[int] | None, queue: mp.Queue):
+    published, checked, seconds = 0, 0, 0.0
+    for motion_file in motion_files:
+        start = time.perf_counter()
+        data, attached = load_motion_shared(motion_file, body_indexes)
+        seconds += time.perf_counter() - start
+        published += not attached
+        reference = np.load(motion_file)
+        index = slice(None) if body_indexes is None else body_indexes
+        for name in JOINT_FIELDS:
+            checked += np.array_equal(data[name], reference[name].astype(np.float32))
+        for name in BODY_FIELDS:
+            checked += np.array_equal(data[name], reference[name][:, index].astype(np.float32))
+    queue.put((published, checked, seconds))
+
+
+def selftest():
+    assert args_cli.motion_file is not None, "--motion_file is required for the self test"
+    motion_files = sorted(glob.glob(args_cli.motion_file))
+    assert len(motion_files) > 0, f"No motion files found for: {args_cli.motion_file}"
+    clear()
+
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(motion_files, args_cli.body_indexes, queue))
+        for _ in range(args_cli.num_processes)
+    ]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    published = sum(result[0] for result in results)
+    checked = sum(result[1] for result in results)
+    expected = args_cli.num_processes * len(motion_files) * (len(JOINT_FIELDS) + len(BODY_FIELDS))
+    for i, (p, _, seconds) in enumerate(sorted(results, key=lambda result: -result[0])):
+        print(f"process {i}: published {p} motions, loaded in {seconds * 1e3:.1f} ms")
+    print(f"published {published} / {len(motion_files)} motions, {checked} / {expected} arrays match the files")
+    start = time.perf_counter()
+    for motion_file in motion_files:
+        load_motion_shared(motion_file, args_cli.body_indexes)
+    print(f"attach to the published motions: {(time.perf_counter() - start) * 1e3:.1f} ms")
+    print(f"{len(list_segments())} segments, {sum(s['size'] for s in list_segments()) / 2**20:.2f} MiB shared")
+    clear()
+    assert published == len(motion_files) and checked == expected, "shared-memory self test failed"
+    print("shared-memory self test passed")
+
+
+def main():
+    if args_cli.command == "list":
+        segments = list_segments()
+        for segment in segments:
+            print(f"{segment['size'] / 2**20:>10.2f} MiB  {segment['name']}")
+        print(f"{len(segments)} segments, {sum(s['size'] for s in segments) / 2**20:.2f} MiB")
+    elif args_cli.command == "clear":
+        print(f"Unlinked {clear()} segments")
+    else:
+        selftest()
+
+
+if __name__ == "__main__":
+    main()
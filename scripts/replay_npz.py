@@ -17,6 +17,12 @@ from isaaclab.app import AppLauncher
 # add argparse arguments
 parser = argparse.ArgumentParser(description="Replay converted motions.")
 parser.add_argument("--registry_name", type=str, required=True, help="The name of the wand registry.")
+parser.add_argument(
+    "--motion_cache_dir",
+    type=str,
+    default=None,
+    help="Directory of the preprocessed motion cache. Defaults to no cache.",
+)
 
 # append AppLauncher cli args
 AppLauncher.add_app_launcher_args(parser)
@@ -82,6 +88,7 @@ def run_simulator(sim: sim_utils.SimulationContext, scene: InteractiveScene):
         motion_file,
         torch.tensor([0], dtype=torch.long, device=sim.device),
         sim.device,
+        cache_dir=args_cli.motion_cache_dir,
     )
     time_steps = torch.zeros(scene.num_envs, dtype=torch.long, device=sim.device)
 
@@ -20,6 +20,12 @@ parser.add_argument(
 parser.add_argument("--num_envs", type=int, default=None, help="Number of environments to simulate.")
 parser.add_argument("--task", type=str, default=None, help="Name of the task.")
 parser.add_argument("--motion_file", type=str, default=None, help="Path to the motion file.")
+parser.add_argument(
+    "--motion_cache_dir",
+    type=str,
+    default=None,
+    help="Directory of the preprocessed motion cache. Defaults to no cache.",
+)
 parser.add_argument("--resume_path", type=str, required=True, help="Path to the model checkpoint to resume from.")
 # append RSL-RL cli arguments
 cli_args.add_rsl_rl_args(parser)
@@ -72,6 +78,7 @@ def main(env_cfg: ManagerBasedRLEnvCfg | DirectRLEnvCfg | DirectMARLEnvCfg, agen
     # get resume path and motion file from command line arguments
     resume_path = args_cli.resume_path
     env_cfg.commands.motion.motion_file = args_cli.motion_file
+    env_cfg.commands.motion.motion_cache_dir = args_cli.motion_cache_dir
 
     # create isaac environment
     env = gym.make(args_cli.task, cfg=env_cfg, render_mode="rgb_array" if args_cli.video else None)
@@ -135,7 +142,7 @@ def main(env_cfg: ManagerBasedRLEnvCfg | DirectRLEnvCfg | DirectMARLEnvCfg, agen
 
         # let's compute position and orientation error for each body (i.e. link)
         motion_command = isaac_env.command_manager.get_term("motion")
-        motion_command._update_metrics()
+        motion_command.compute_metrics()
 
         print(
             motion_command.metrics["error_anchor_pos"],
@@ -25,6 +25,24 @@ parser.add_argument("--task", type=str, default=None, help="Name of the task.")
 parser.add_argument("--seed", type=int, default=None, help="Seed used for the environment")
 parser.add_argument("--max_iterations", type=int, default=None, help="RL Policy training iterations.")
 parser.add_argument("--registry_name", type=str, required=True, help="The name of the wand registry.")
+parser.add_argument(
+    "--motion_file",
+    type=str,
+    default=None,
+    help="Motion file, glob pattern or manifest of motion files. Defaults to the motion named after the run.",
+)
+parser.add_argument(
+    "--motion_cache_dir",
+    type=str,
+    default=None,
+    help="Directory of the preprocessed motion cache. Defaults to no cache.",
+)
+parser.add_argument(
+    "--motion_shared_memory",
+    action="store_true",
+    default=False,
+    help="Share the host memory of the motions with the other training processes on the node.",
+)
 
 # append RSL-RL cli arguments
 cli_args.add_rsl_rl_args(parser)
@@ -121,7 +139,12 @@ def main(env_cfg: ManagerBasedRLEnvCfg | DirectRLEnvCfg | DirectMARLEnvCfg, agen
     # env_cfg.commands.motion.motion_file = str(pathlib.Path(artifact.download()) / "motion.npz")
 
     motions_dir = "/home/nima/whole_body_tracking/motions"
-    env_cfg.commands.motion.motion_file = str(pathlib.Path(motions_dir) / f"{agent_cfg.run_name}.npz")
+    if args_cli.motion_file is not None:
+        env_cfg.commands.motion.motion_file = args_cli.motion_file
+    else:
+        env_cfg.commands.motion.motion_file = str(pathlib.Path(motions_dir) / f"{agent_cfg.run_name}.npz")
+    env_cfg.commands.motion.motion_cache_dir = args_cli.motion_cache_dir
+    env_cfg.commands.motion.motion_shared_memory = args_cli.motion_shared_memory
 
     # specify directory for logging experiments
     log_root_path = os.path.join("logs", "rsl_rl", agent_cfg.experiment_name)
@@ -0,0 +1,126 @@
+"""Derive the kinematic URDF of a robot from its USD articulation.
+
+The forward kinematics of :mod:`whole_body_tracking.utils.kinematics` read a URDF, while the robot trained on is only
+committed as USD (``robots/g1_racket.usd``). This script writes the URDF of the bodies and joints of the articulation,
+as the physics layer of the USD defines them: the joint frames in the parent bodies, the joint axes, types and
+limits, and the mass, center of mass and inertia of every body. The URDF has no visual or collision geometry.
+
+The joint frame in the child body must be the child body frame, as in the USD files converted from a URDF by Isaac Sim.
+
+.. code-block:: bash
+
+    # Usage (needs the USD Python bindings, e.g. ``pip install usd-core``, or the Python of Isaac Sim)
+    python scripts/usd_to_urdf.py --input_file source/whole_body_tracking/whole_body_tracking/robots/g1_racket.usd \
+        --output_file source/whole_body_tracking/whole_body_tracking/assets/g1_racket/g1_racket.urdf
+"""
+
+import argparse
+import math
+import os
+import xml.etree.ElementTree as ET
+
+from pxr import Usd, UsdPhysics
+
+parser = argparse.ArgumentParser(description="Derive the kinematic URDF of a robot from its USD articulation.")
+parser.add_argument("--input_file", type=str, required=True, help="The USD file of the robot.")
+parser.add_argument("--output_file", type=str, required=True, help="The URDF file.")
+parser.add_argument("--name", type=str, default=None, help="Name of the robot. Defaults to the default prim.")
+args_cli = parser.parse_args()
+
+_AXES = {"X": (1, 0, 0), "Y": (0, 1, 0), "Z": (0, 0, 1)}
+
+
+def _format(values) -> str:
+    return " ".join(f"{value:.9g}" for value in values)
+
+
+def _rpy(quat) -> tuple[float, float, float]:
+    """URDF roll, pitch and yaw of a ``Gf.Quat``."""
+    w, (x, y, z) = quat.GetReal(), quat.GetImaginary()
+    roll = math.atan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+    pitch = math.asin(max(-1.0, min(1.0, 2 * (w * y - z * x))))
+    yaw = math.atan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+    return roll, pitch, yaw
+
+
+def _authored(attribute):
+    return attribute.Get() if attribute.HasAuthoredValue() else None
+
+
+def add_link(robot: ET.Element, prim: Usd.Prim):
+    link = ET.SubElement(robot, "link", name=prim.GetName())
+    mass_api = UsdPhysics.MassAPI(prim)
+    mass = _authored(mass_api.GetMassAttr())
+    if mass is None:
+        return
+    inertial = ET.SubElement(link, "inertial")
+    com = _authored(mass_api.GetCenterOfMassAttr()) or (0.0, 0.0, 0.0)
+    axes = _authored(mass_api.GetPrincipalAxesAttr())
+    ET.SubElement(inertial, "origin", xyz=_format(com), rpy=_format(_rpy(axes) if axes is not None else (0, 0, 0)))
+    ET.SubElement(inertial, "mass", value=f"{mass:.9g}")
+    inertia = _authored(mass_api.GetDiagonalInertiaAttr()) or (0.0, 0.0, 0.0)
+    principal = dict(zip(("ixx", "iyy", "izz"), (f"{value:.9g}" for value in inertia)))
+    ET.SubElement(inertial, "inertia", ixy="0", ixz="0", iyz="0", **principal)
+
+
+def add_joint(robot: ET.Element, prim: Usd.Prim):
+    joint = UsdPhysics.Joint(prim)
+    name = prim.GetName()
+    pos1, rot1 = joint.GetLocalPos1Attr().Get(), joint.GetLocalRot1Attr().Get()
+    if max(abs(value) for value in pos1) > 1e-6 or abs(abs(rot1.GetReal()) - 1.0) > 1e-6:
+        raise ValueError(f"The frame of the joint '{name}' in its child body is not the child body frame.")
+    if prim.IsA(UsdPhysics.RevoluteJoint):
+        joint_type, typed = "revolute", UsdPhysics.RevoluteJoint(prim)
+    elif prim.IsA(UsdPhysics.PrismaticJoint):
+        joint_type, typed = "prismatic", UsdPhysics.PrismaticJoint(prim)
+    elif prim.IsA(UsdPhysics.FixedJoint):
+        joint_type, typed = "fixed", None
+    else:
+        raise ValueError(f"Unsupported type '{prim.GetTypeName()}' of the joint '{name}'.")
+
+    element = ET.SubElement(robot, "joint", name=name, type=joint_type)
+    rot0 = joint.GetLocalRot0Attr().Get()
+    ET.SubElement(element, "origin", xyz=_format(joint.GetLocalPos0Attr().Get()), rpy=_format(_rpy(rot0)))
+    ET.SubElement(element, "parent", link=joint.GetBody0Rel().GetTargets()[0].name)
+    ET.SubElement(element, "child", link=joint.GetBody1Rel().GetTargets()[0].name)
+    if typed is None:
+        return
+    ET.SubElement(element, "axis", xyz=_format(_AXES[typed.GetAxisAttr().Get()]))
+    # revolute limits are stored in degrees
+    scale = math.pi / 180.0 if joint_type == "revolute" else 1.0
+    limit = {
+        "lower": f"{typed.GetLowerLimitAttr().Get() * scale:.9g}",
+        "upper": f"{typed.GetUpperLimitAttr().Get() * scale:.9g}",
+    }
+    drive_type = "angular" if joint_type == "revolute" else "linear"
+    max_force = prim.GetAttribute(f"drive:{drive_type}:physics:maxForce")
+    if max_force.HasAuthoredValue():
+        limit["effort"] = f"{max_force.Get():.9g}"
+    max_velocity = prim.GetAttribute("physxJoint:maxJointVelocity")
+    if max_velocity.HasAuthoredValue():
+        limit["velocity"] = f"{max_velocity.Get() * scale:.9g}"
+    ET.SubElement(element, "limit", **limit)
+
+
+def main():
+    stage = Usd.Stage.Open(args_cli.input_file)
+    # the overs of the physics layer are enough, whether or not the geometry layer resolves
+    prims = list(stage.TraverseAll())
+    bodies = [prim for prim in prims if prim.HasAPI(UsdPhysics.RigidBodyAPI)]
+    joints = [prim for prim in prims if prim.IsA(UsdPhysics.Joint)]
+    if not bodies:
+        raise ValueError(f"No rigid bodies in {args_cli.input_file}.")
+
+    robot = ET.Element("robot", name=args_cli.name or stage.GetDefaultPrim().GetName())
+    for prim in bodies:
+        add_link(robot, prim)
+    for prim in joints:
+        add_joint(robot, prim)
+    ET.indent(robot)
+    os.makedirs(os.path.dirname(os.path.abspath(args_cli.output_file)), exist_ok=True)
+    ET.ElementTree(robot).write(args_cli.output_file, encoding="unicode", xml_declaration=True)
+    print(f"[INFO]: Wrote {len(bodies)} bodies and {len(joints)} joints to {args_cli.output_file}")
+
+
+if __name__ == "__main__":
+    main()
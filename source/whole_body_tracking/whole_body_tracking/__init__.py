@@ -1,6 +1,7 @@
 """
 Python module serving as a project/extension template.
-"""
 
-# Register Gym environments.
-from .tasks import *
+The Gym environments are registered by importing :mod:`whole_body_tracking.tasks`, which needs the simulation app to
+be running. The package itself does not import it, so that the simulator-free modules (e.g. ``utils``) can be used
+without Isaac Sim.
+"""
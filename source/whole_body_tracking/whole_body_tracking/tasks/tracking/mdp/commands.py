@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import glob
 import math
 import numpy as np
 import os
@@ -14,7 +15,6 @@ from isaaclab.markers import VisualizationMarkers, VisualizationMarkersCfg
 from isaaclab.markers.config import FRAME_MARKER_CFG
 from isaaclab.utils import configclass
 from isaaclab.utils.math import (
-    quat_apply,
     quat_error_magnitude,
     quat_from_euler_xyz,
     quat_inv,
@@ -23,39 +23,451 @@ from isaaclab.utils.math import (
     yaw_quat,
 )
 
+from whole_body_tracking.utils.adaptive_sampler import AdaptiveSampler
+from whole_body_tracking.utils.motion_cache import DEFAULT_MAX_BYTES, load_cached_motion
+from whole_body_tracking.utils.motion_dataset import MotionDataset, is_dataset
+from whole_body_tracking.utils.motion_mmap import load_motion_mmap
+from whole_body_tracking.utils.motion_quantization import quantize_motion
+from whole_body_tracking.utils.motion_shm import load_motion_shared
+from whole_body_tracking.utils.quaternion import (
+    quat_apply_broadcast,
+    quat_mul_broadcast,
+    quat_slerp,
+    rotation_6d_from_quat,
+)
+from whole_body_tracking.utils.torch_compile import compile_or_eager
+
 if TYPE_CHECKING:
     from isaaclab.envs import ManagerBasedRLEnv
 
 
-class MotionLoader:
-    def __init__(self, motion_file: str, body_indexes: Sequence[int], device: str = "cpu"):
+def _to_tensor(value: np.ndarray | torch.Tensor, device: str) -> torch.Tensor:
+    """Converts a numpy array or a tensor to a float32 tensor on the device.
+
+    Writable float32 arrays on the cpu are shared instead of copied, which keeps arrays attached from the shared-memory
+    store zero-copy. Read-only arrays (memory maps) are always copied.
+    """
+    if isinstance(value, torch.Tensor) or value.flags.writeable:
+        return torch.as_tensor(value, dtype=torch.float32, device=device)
+    return torch.tensor(value, dtype=torch.float32, device=device)
+
+
+class MotionClips:
+    """Continuous-time queries on reference clips stored frame by frame.
+
+    Subclasses store the frames of one or several clips along the first dimension of the reference tensors and
+    describe the layout with ``fps``, ``num_clips``, ``clip_frames`` (stored frames), ``clip_offsets``,
+    ``clip_pad_start`` and ``clip_lengths``. A clip is played for ``clip_lengths`` time steps: ``clip_pad_start``
+    virtual copies of its first frame, its stored frames and virtual copies of its last frame. The padding is only
+    applied when indexing, see :meth:`frame_indexes`. A query at a fractional frame (phase) blends the two neighboring
+    frames: positions and velocities are linearly interpolated and quaternions are spherically interpolated.
+    """
+
+    FIELDS = ("joint_pos", "joint_vel", "body_pos_w", "body_quat_w", "body_lin_vel_w", "body_ang_vel_w")
+    """The reference tensors, indexed by frame."""
+
+    def frame_indexes(self, clip_ids: torch.Tensor, time_steps: torch.Tensor) -> torch.Tensor:
+        """Returns the indexes in the reference tensors of time steps of clips.
+
+        Args:
+            clip_ids: Clip of every query. Shape is (N,).
+            time_steps: Time step inside the clip of every query, including the padding. Shape is (N,).
+
+        Returns:
+            The indexes of the stored frames, the padding before and after a clip maps to its first and last frame.
+        """
+        frames = (time_steps - self.clip_pad_start[clip_ids]).clamp(min=0)
+        return self.clip_offsets[clip_ids] + torch.minimum(frames, self.clip_frames[clip_ids] - 1)
+
+    def frame_blend(
+        self, clip_ids: torch.Tensor, phases: torch.Tensor
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Returns the neighboring frames and the blend factor of fractional frames.
+
+        Args:
+            clip_ids: Clip of every query. Shape is (N,).
+            phases: Fractional frame inside the clip of every query, clamped to the clip. Shape is (N,).
+
+        Returns:
+            The indexes of the frames before and after every query in the reference tensors, and the blend factor
+            between them in [0, 1].
+        """
+        last_frames = self.clip_lengths[clip_ids] - 1
+        phases = torch.minimum(phases.clamp(min=0.0), last_frames.to(phases.dtype))
+        frames = phases.long()
+        next_frames = torch.minimum(frames + 1, last_frames)
+        return self.frame_indexes(clip_ids, frames), self.frame_indexes(clip_ids, next_frames), phases - frames
+
+    @staticmethod
+    def interpolate(
+        field: torch.Tensor, frames0: tuple, frames1: tuple, blend: torch.Tensor, rotation: bool = False
+    ) -> torch.Tensor:
+        """Blends a reference tensor between two frames.
+
+        Args:
+            field: The reference tensor.
+            frames0: Index of the frames before the queries, the first element selects the frames.
+            frames1: Index of the frames after the queries, the first element selects the frames.
+            blend: The blend factor of every query. Shape is (N,).
+            rotation: Whether the field holds quaternions, which are spherically interpolated.
+
+        Returns:
+            The blended values.
+        """
+        value0, value1 = field[frames0], field[frames1]
+        blend = blend.view(-1, *([1] * (value0.dim() - 1)))
+        if rotation:
+            return quat_slerp(value0, value1, blend)
+        return torch.lerp(value0, value1, blend)
+
+    def query(self, clip_ids: torch.Tensor, times: torch.Tensor) -> dict[str, torch.Tensor]:
+        """Returns the reference at arbitrary times.
+
+        Args:
+            clip_ids: Clip of every query. Shape is (N,).
+            times: Time inside the clip of every query in seconds, clamped to the clip. Shape is (N,).
+
+        Returns:
+            The interpolated reference tensors, keyed by field name.
+        """
+        fps = float(np.ravel(self.fps)[0])
+        frames0, frames1, blend = self.frame_blend(clip_ids, times * fps)
+        return {
+            name: self.interpolate(getattr(self, name), (frames0,), (frames1,), blend, rotation=name == "body_quat_w")
+            for name in self.FIELDS
+        }
+
+
+class MotionLoader(MotionClips):
+    """Reference motion loaded from a ``.npz`` file.
+
+    The tracked bodies are sliced out once at load time into contiguous tensors, so that indexing the reference
+    at the current time steps only touches the rows it needs instead of copying the whole clip first. The untracked
+    bodies are never moved to the device.
+
+    The ``pad_start`` and ``pad_end`` entries of the file give the number of virtual copies of the first and last
+    frame played before and after the stored frames. Files without them (older files, whose padding is stored as
+    repeated frames) have no virtual padding.
+
+    Args:
+        motion_file: Path to the motion ``.npz`` file.
+        body_indexes: Indexes of the tracked bodies in the motion file.
+        device: Device on which the reference tensors are stored.
+        mmap: Whether to read the motion through its memory-mapped sidecar, which only reads the tracked bodies.
+        cache_dir: Directory of the preprocessed motion cache. When set, the tracked bodies are loaded from (or
+            stored to) the cache. Defaults to None (no cache).
+        cache_max_bytes: Size limit of the preprocessed motion cache.
+        shared_memory: Whether to load the motion through the node-local shared-memory store, which shares the host
+            memory of the tracked bodies with the other processes on the node. Takes precedence over ``cache_dir``
+            and ``mmap``.
+        padding: Number of virtual copies of the first and last frame, overriding the ``pad_start`` and ``pad_end``
+            of the file. Defaults to None (the padding of the file).
+    """
+
+    def __init__(
+        self,
+        motion_file: str,
+        body_indexes: Sequence[int],
+        device: str = "cpu",
+        mmap: bool = False,
+        cache_dir: str | None = None,
+        cache_max_bytes: int = DEFAULT_MAX_BYTES,
+        shared_memory: bool = False,
+        padding: tuple[int, int] | None = None,
+    ):
         assert os.path.isfile(motion_file), f"Invalid file path: {motion_file}"
-        data = np.load(motion_file)
+        self._body_indexes = torch.as_tensor(body_indexes, dtype=torch.long, device=device)
+        if shared_memory:
+            data, _ = load_motion_shared(motion_file, self._body_indexes.tolist())
+        elif cache_dir is not None:
+            data = load_cached_motion(
+                motion_file, self._body_indexes.tolist(), cache_dir=cache_dir, max_bytes=cache_max_bytes
+            )
+        elif mmap:
+            data = load_motion_mmap(motion_file, self._body_indexes.tolist())
+        else:
+            data = np.load(motion_file)
         self.fps = data["fps"]
-        self.joint_pos = torch.tensor(data["joint_pos"], dtype=torch.float32, device=device)
-        self.joint_vel = torch.tensor(data["joint_vel"], dtype=torch.float32, device=device)
-        self._body_pos_w = torch.tensor(data["body_pos_w"], dtype=torch.float32, device=device)
-        self._body_quat_w = torch.tensor(data["body_quat_w"], dtype=torch.float32, device=device)
-        self._body_lin_vel_w = torch.tensor(data["body_lin_vel_w"], dtype=torch.float32, device=device)
-        self._body_ang_vel_w = torch.tensor(data["body_ang_vel_w"], dtype=torch.float32, device=device)
-        self._body_indexes = body_indexes
+        self.joint_pos = _to_tensor(data["joint_pos"], device)
+        self.joint_vel = _to_tensor(data["joint_vel"], device)
         self.time_step_total = self.joint_pos.shape[0]
+        if padding is None:
+            padding = [int(np.ravel(data[key])[0]) if key in data else 0 for key in ("pad_start", "pad_end")]
+        self.pad_start, self.pad_end = padding
+
+        # the shared-memory store, the cache and the sidecar only hold the tracked bodies
+        bodies = slice(None) if shared_memory or cache_dir is not None or mmap else self._body_indexes.tolist()
+        # slice the tracked bodies once, the gathers in the command then index contiguous memory
+        self.body_pos_w = _to_tensor(data["body_pos_w"][:, bodies], device)
+        self.body_quat_w = _to_tensor(data["body_quat_w"][:, bodies], device)
+        self.body_lin_vel_w = _to_tensor(data["body_lin_vel_w"][:, bodies], device)
+        self.body_ang_vel_w = _to_tensor(data["body_ang_vel_w"][:, bodies], device)
+
+        # a single clip exposes the same clip layout as :class:`MotionLibrary`
+        self.num_clips = 1
+        self.clip_frames = torch.tensor([self.time_step_total], dtype=torch.long, device=device)
+        self.clip_offsets = torch.zeros(1, dtype=torch.long, device=device)
+        self.clip_pad_start = torch.tensor([self.pad_start], dtype=torch.long, device=device)
+        self.clip_lengths = self.clip_frames + self.pad_start + self.pad_end
+
+    def clip_slice(self, clip_id: int) -> slice:
+        """Returns the slice of the tensors covered by the stored frames of the clip."""
+        return slice(0, self.time_step_total)
+
+
+def resolve_motion_files(motion_file: str) -> list[str]:
+    """Resolves a motion file specification into a sorted list of motion files.
+
+    Args:
+        motion_file: Path to a single ``.npz`` file, a motion dataset directory (see
+            :mod:`whole_body_tracking.utils.motion_dataset`), a glob pattern of ``.npz`` files, or a manifest
+            (``.txt``) listing one motion file per line. Relative paths in a manifest are relative to the manifest.
+
+    Returns:
+        The list of motion files.
+    """
+    if motion_file.endswith(".txt"):
+        assert os.path.isfile(motion_file), f"Invalid manifest path: {motion_file}"
+        root = os.path.dirname(os.path.abspath(motion_file))
+        with open(motion_file) as f:
+            lines = [line.strip() for line in f]
+        files = [os.path.join(root, line) for line in lines if line and not line.startswith("#")]
+    elif glob.has_magic(motion_file):
+        files = sorted(glob.glob(motion_file))
+    else:
+        files = [motion_file]
+    assert len(files) > 0, f"No motion files found for: {motion_file}"
+    return files
+
+
+class MotionLibrary(MotionClips):
+    """Several reference motions packed into flat tensors.
+
+    The clips are concatenated along the time axis. A frame of a clip is addressed by ``clip_offsets[clip_id] +
+    time_step``, so a batch of ``(clip_id, time_step)`` pairs is gathered with one vectorized index per field. A
+    library with a single clip holds the same tensors as :class:`MotionLoader`.
+
+    A motion dataset directory (see :mod:`whole_body_tracking.utils.motion_dataset`) is loaded from its memory-mapped
+    shards, which already hold the clips packed along the time axis: the tracked bodies are gathered once per field,
+    whatever the number of clips, and ``mmap``, ``cache_dir`` and ``shared_memory`` do not apply.
+
+    Args:
+        motion_files: Paths to the motion ``.npz`` files, or a single motion dataset directory. All clips must share
+            the same fps and body layout.
+        body_indexes: Indexes of the tracked bodies in the motion files.
+        device: Device on which the packed tensors are stored.
+        mmap: Whether to read the clips through their memory-mapped sidecars.
+        cache_dir: Directory of the preprocessed motion cache. Defaults to None (no cache).
+        cache_max_bytes: Size limit of the preprocessed motion cache.
+        shared_memory: Whether to load the clips through the node-local shared-memory store.
+        padding: Number of virtual copies of the first and last frame of every clip, overriding the padding of the
+            files. Defaults to None (the padding of every file).
+    """
+
+    def __init__(
+        self,
+        motion_files: Sequence[str],
+        body_indexes: Sequence[int],
+        device: str = "cpu",
+        mmap: bool = False,
+        cache_dir: str | None = None,
+        cache_max_bytes: int = DEFAULT_MAX_BYTES,
+        shared_memory: bool = False,
+        padding: tuple[int, int] | None = None,
+    ):
+        self.motion_files = list(motion_files)
+        if len(motion_files) == 1 and is_dataset(motion_files[0]):
+            self._load_dataset(motion_files[0], body_indexes, device, padding)
+            return
 
-    @property
-    def body_pos_w(self) -> torch.Tensor:
-        return self._body_pos_w[:, self._body_indexes]
+        # load the clips on the cpu, so that only the packed tensors are allocated on the device
+        motions = [
+            MotionLoader(
+                f,
+                body_indexes,
+                device="cpu",
+                mmap=mmap,
+                cache_dir=cache_dir,
+                cache_max_bytes=cache_max_bytes,
+                shared_memory=shared_memory,
+                padding=padding,
+            )
+            for f in motion_files
+        ]
+        fps = {float(np.ravel(motion.fps)[0]) for motion in motions}
+        assert len(fps) == 1, f"All motion clips must have the same fps, got: {sorted(fps)}"
+
+        self.fps = motions[0].fps
+        self.num_clips = len(motions)
+        self.clip_frames = torch.tensor([m.time_step_total for m in motions], dtype=torch.long, device=device)
+        self.clip_offsets = torch.cumsum(self.clip_frames, dim=0) - self.clip_frames
+        self.clip_pad_start = torch.tensor([m.pad_start for m in motions], dtype=torch.long, device=device)
+        self.clip_lengths = self.clip_frames + torch.tensor(
+            [m.pad_start + m.pad_end for m in motions], dtype=torch.long, device=device
+        )
+        self.joint_pos = torch.cat([m.joint_pos for m in motions]).to(device)
+        self.joint_vel = torch.cat([m.joint_vel for m in motions]).to(device)
+        self.body_pos_w = torch.cat([m.body_pos_w for m in motions]).to(device)
+        self.body_quat_w = torch.cat([m.body_quat_w for m in motions]).to(device)
+        self.body_lin_vel_w = torch.cat([m.body_lin_vel_w for m in motions]).to(device)
+        self.body_ang_vel_w = torch.cat([m.body_ang_vel_w for m in motions]).to(device)
+        self.time_step_total = self.joint_pos.shape[0]
 
-    @property
-    def body_quat_w(self) -> torch.Tensor:
-        return self._body_quat_w[:, self._body_indexes]
+    def _load_dataset(
+        self, dataset_dir: str, body_indexes: Sequence[int], device: str, padding: tuple[int, int] | None
+    ):
+        """Loads the clips of a motion dataset, whose shards are laid out as the packed tensors."""
+        dataset = MotionDataset(dataset_dir)
+        assert len(dataset) > 0, f"No motion clips in the dataset: {dataset_dir}"
+        fps = {clip["fps"] for clip in dataset.clips}
+        assert len(fps) == 1, f"All motion clips must have the same fps, got: {sorted(fps)}"
+        if padding is None:
+            pad_start = [clip["pad_start"] for clip in dataset.clips]
+            pad_end = [clip["pad_end"] for clip in dataset.clips]
+        else:
+            pad_start, pad_end = [padding[0]] * len(dataset), [padding[1]] * len(dataset)
+
+        self.fps = np.array([dataset.clips[0]["fps"]])
+        self.num_clips = len(dataset)
+        self.clip_frames = torch.tensor([clip["length"] for clip in dataset.clips], dtype=torch.long, device=device)
+        self.clip_offsets = torch.tensor([clip["offset"] for clip in dataset.clips], dtype=torch.long, device=device)
+        self.clip_pad_start = torch.tensor(pad_start, dtype=torch.long, device=device)
+        self.clip_lengths = self.clip_frames + torch.tensor(pad_start, dtype=torch.long, device=device)
+        self.clip_lengths += torch.tensor(pad_end, dtype=torch.long, device=device)
+        body_indexes = torch.as_tensor(body_indexes, dtype=torch.long).tolist()
+        for name in self.FIELDS:
+            shard = dataset.shards[name]
+            # the gather of the tracked bodies copies out of the memory map
+            value = shard[:, body_indexes] if name.startswith("body_") else shard
+            setattr(self, name, _to_tensor(value, device))
+        self.time_step_total = self.joint_pos.shape[0]
 
-    @property
-    def body_lin_vel_w(self) -> torch.Tensor:
-        return self._body_lin_vel_w[:, self._body_indexes]
-
-    @property
-    def body_ang_vel_w(self) -> torch.Tensor:
-        return self._body_ang_vel_w[:, self._body_indexes]
+    def clip_slice(self, clip_id: int) -> slice:
+        """Returns the slice of the packed tensors covered by the stored frames of a clip."""
+        start = int(self.clip_offsets[clip_id])
+        return slice(start, start + int(self.clip_frames[clip_id]))
+
+
+def relative_body_pose(
+    anchor_pos_w: torch.Tensor,
+    anchor_quat_w: torch.Tensor,
+    robot_anchor_pos_w: torch.Tensor,
+    robot_anchor_quat_w: torch.Tensor,
+    body_pos_w: torch.Tensor,
+    body_quat_w: torch.Tensor,
+    out_pos: torch.Tensor,
+    out_quat: torch.Tensor,
+):
+    """Moves the reference bodies to the robot's anchor, keeping the reference height and the heading offset only.
+
+    The anchor offset is computed once per env and broadcast over the bodies. The results are written into the
+    output buffers.
+
+    Args:
+        anchor_pos_w: The reference anchor positions. Shape is (N, 3).
+        anchor_quat_w: The reference anchor orientations in (w, x, y, z). Shape is (N, 4).
+        robot_anchor_pos_w: The robot anchor positions. Shape is (N, 3).
+        robot_anchor_quat_w: The robot anchor orientations in (w, x, y, z). Shape is (N, 4).
+        body_pos_w: The reference body positions. Shape is (N, B, 3).
+        body_quat_w: The reference body orientations in (w, x, y, z). Shape is (N, B, 4).
+        out_pos: The output relative body positions. Shape is (N, B, 3).
+        out_quat: The output relative body orientations in (w, x, y, z). Shape is (N, B, 4).
+    """
+    delta_pos_w = torch.cat([robot_anchor_pos_w[:, :2], anchor_pos_w[:, 2:]], dim=-1)[:, None, :]
+    delta_ori_w = yaw_quat(quat_mul(robot_anchor_quat_w, quat_inv(anchor_quat_w)))[:, None, :]
+    out_quat.copy_(quat_mul_broadcast(delta_ori_w, body_quat_w))
+    out_pos.copy_(delta_pos_w + quat_apply_broadcast(delta_ori_w, body_pos_w - anchor_pos_w[:, None, :]))
+
+
+def compute_tracking_error(
+    anchor_pos_w: torch.Tensor,
+    anchor_quat_w: torch.Tensor,
+    anchor_lin_vel_w: torch.Tensor,
+    anchor_ang_vel_w: torch.Tensor,
+    robot_anchor_pos_w: torch.Tensor,
+    robot_anchor_quat_w: torch.Tensor,
+    robot_anchor_lin_vel_w: torch.Tensor,
+    robot_anchor_ang_vel_w: torch.Tensor,
+    body_pos_w: torch.Tensor,
+    body_quat_w: torch.Tensor,
+    body_lin_vel_w: torch.Tensor,
+    body_ang_vel_w: torch.Tensor,
+    robot_body_pos_w: torch.Tensor,
+    robot_body_quat_w: torch.Tensor,
+    robot_body_lin_vel_w: torch.Tensor,
+    robot_body_ang_vel_w: torch.Tensor,
+) -> dict[str, torch.Tensor]:
+    """Computes the errors between the reference and the robot anchors and bodies in one pass.
+
+    The reference anchor tensors have shape (N, 3) or (N, 4), the reference body tensors (N, B, 3) or (N, B, 4), and
+    the robot tensors the shape of their reference counterpart. See :attr:`MotionCommand.tracking_error` for the keys.
+    """
+    anchor_diff = torch.stack(
+        [
+            anchor_pos_w - robot_anchor_pos_w,
+            anchor_lin_vel_w - robot_anchor_lin_vel_w,
+            anchor_ang_vel_w - robot_anchor_ang_vel_w,
+        ]
+    )
+    anchor_norm = torch.linalg.vector_norm(anchor_diff, dim=-1)
+    body_diff = torch.stack(
+        [
+            body_pos_w - robot_body_pos_w,
+            body_lin_vel_w - robot_body_lin_vel_w,
+            body_ang_vel_w - robot_body_ang_vel_w,
+        ]
+    )
+    body_sq = body_diff.square().sum(dim=-1)
+    return {
+        "anchor_pos": anchor_diff[0],
+        "anchor_pos_norm": anchor_norm[0],
+        "anchor_lin_vel_norm": anchor_norm[1],
+        "anchor_ang_vel_norm": anchor_norm[2],
+        "anchor_rot": quat_error_magnitude(anchor_quat_w, robot_anchor_quat_w),
+        "body_pos": body_diff[0],
+        "body_pos_sq": body_sq[0],
+        "body_lin_vel_sq": body_sq[1],
+        "body_ang_vel_sq": body_sq[2],
+        "body_rot": quat_error_magnitude(body_quat_w, robot_body_quat_w),
+    }
+
+
+def anchor_frame_observations(
+    anchor_pos_w: torch.Tensor,
+    anchor_quat_w: torch.Tensor,
+    robot_anchor_pos_w: torch.Tensor,
+    robot_anchor_quat_w: torch.Tensor,
+    robot_body_pos_w: torch.Tensor,
+    robot_body_quat_w: torch.Tensor,
+    out: torch.Tensor,
+):
+    """Computes the observations expressed in the robot's anchor frame in one pass.
+
+    The inverse of the robot anchor pose is computed once per env and broadcast over the bodies, and the orientations
+    are written as 6D features (the first two columns of the rotation matrices) straight from the quaternions. The
+    features are written into ``out`` side by side: the reference anchor position (3) and orientation (6) in the
+    anchor frame, the robot anchor orientation in the world frame (6), and the robot body positions (3 * B) and
+    orientations (6 * B) in the anchor frame.
+
+    Args:
+        anchor_pos_w: The reference anchor positions. Shape is (N, 3).
+        anchor_quat_w: The reference anchor orientations in (w, x, y, z). Shape is (N, 4).
+        robot_anchor_pos_w: The robot anchor positions. Shape is (N, 3).
+        robot_anchor_quat_w: The robot anchor orientations in (w, x, y, z). Shape is (N, 4).
+        robot_body_pos_w: The robot body positions. Shape is (N, B, 3).
+        robot_body_quat_w: The robot body orientations in (w, x, y, z). Shape is (N, B, 4).
+        out: The output features. Shape is (N, 15 + 9 * B).
+    """
+    num_envs, num_bodies = robot_body_pos_w.shape[:2]
+    body_pos_end = 15 + 3 * num_bodies
+    anchor_quat_inv = quat_inv(robot_anchor_quat_w)
+    out[:, 0:3].copy_(quat_apply_broadcast(anchor_quat_inv, anchor_pos_w - robot_anchor_pos_w))
+    out[:, 3:9].copy_(rotation_6d_from_quat(quat_mul(anchor_quat_inv, anchor_quat_w)))
+    out[:, 9:15].copy_(rotation_6d_from_quat(robot_anchor_quat_w))
+    body_pos_b = quat_apply_broadcast(anchor_quat_inv[:, None, :], robot_body_pos_w - robot_anchor_pos_w[:, None, :])
+    out[:, 15:body_pos_end].copy_(body_pos_b.reshape(num_envs, -1))
+    body_quat_b = quat_mul_broadcast(anchor_quat_inv[:, None, :], robot_body_quat_w)
+    out[:, body_pos_end:].copy_(rotation_6d_from_quat(body_quat_b).reshape(num_envs, -1))
 
 
 class MotionCommand(CommandTerm):
@@ -71,19 +483,80 @@ class MotionCommand(CommandTerm):
             self.robot.find_bodies(self.cfg.body_names, preserve_order=True)[0], dtype=torch.long, device=self.device
         )
 
-        self.motion = MotionLoader(self.cfg.motion_file, self.body_indexes, device=self.device)
+        motion_files = resolve_motion_files(self.cfg.motion_file)
+        if len(motion_files) == 1 and not is_dataset(motion_files[0]):
+            self.motion = MotionLoader(
+                motion_files[0],
+                self.body_indexes,
+                device=self.device,
+                mmap=self.cfg.motion_mmap,
+                cache_dir=self.cfg.motion_cache_dir,
+                cache_max_bytes=self.cfg.motion_cache_max_bytes,
+                shared_memory=self.cfg.motion_shared_memory,
+                padding=self.cfg.motion_padding,
+            )
+        else:
+            self.motion = MotionLibrary(
+                motion_files,
+                self.body_indexes,
+                device=self.device,
+                mmap=self.cfg.motion_mmap,
+                cache_dir=self.cfg.motion_cache_dir,
+                cache_max_bytes=self.cfg.motion_cache_max_bytes,
+                shared_memory=self.cfg.motion_shared_memory,
+                padding=self.cfg.motion_padding,
+            )
+        if self.cfg.motion_quantization is not None:
+            quantize_motion(self.motion, self.cfg.motion_quantization)
+        self.motion_fps = float(np.ravel(self.motion.fps)[0])
+        self.clip_ids = torch.zeros(self.num_envs, dtype=torch.long, device=self.device)
         self.time_steps = torch.zeros(self.num_envs, dtype=torch.long, device=self.device)
+        # fractional frame of every env, only used when interpolating
+        self.motion_phase = torch.zeros(self.num_envs, device=self.device)
+        self._phase_step = env.cfg.decimation * env.cfg.sim.dt * self.motion_fps * self.cfg.playback_rate
         self.body_pos_relative_w = torch.zeros(self.num_envs, len(cfg.body_names), 3, device=self.device)
         self.body_quat_relative_w = torch.zeros(self.num_envs, len(cfg.body_names), 4, device=self.device)
         self.body_quat_relative_w[:, :, 0] = 1.0
+        # the tensor stages of the step, compiled into static-shape graphs if enabled
+        self._relative_body_pose = compile_or_eager(relative_body_pose, cfg.compile_step)
+        self._tracking_error = compile_or_eager(compute_tracking_error, cfg.compile_step)
+        self._anchor_frame_observations = compile_or_eager(anchor_frame_observations, cfg.compile_step)
+        # the anchor frame observations of all groups are views of one buffer, filled once per step
+        num_bodies = len(cfg.body_names)
+        self._observation_buffer = torch.zeros(self.num_envs, 15 + 9 * num_bodies, device=self.device)
+        observation_sizes = {
+            "motion_anchor_pos_b": 3,
+            "motion_anchor_ori_b": 6,
+            "robot_anchor_ori_w": 6,
+            "robot_body_pos_b": 3 * num_bodies,
+            "robot_body_ori_b": 6 * num_bodies,
+        }
+        self._observation_views = dict(
+            zip(observation_sizes, self._observation_buffer.split(list(observation_sizes.values()), dim=1))
+        )
 
-        self.bin_count = int(self.motion.time_step_total // (1 / (env.cfg.decimation * env.cfg.sim.dt))) + 1
-        self.bin_failed_count = torch.zeros(self.bin_count, dtype=torch.float, device=self.device)
-        self._current_bin_failed = torch.zeros(self.bin_count, dtype=torch.float, device=self.device)
-        self.kernel = torch.tensor(
-            [self.cfg.adaptive_lambda**i for i in range(self.cfg.adaptive_kernel_size)], device=self.device
+        # each clip is split into bins of one second, the bins of all clips are sampled from one distribution in which
+        # the failures are smoothed within their clip
+        control_fps = 1 / (env.cfg.decimation * env.cfg.sim.dt)
+        bin_fps = self.motion_fps if self.cfg.interpolate else control_fps
+        self.clip_bin_counts = torch.div(self.motion.clip_lengths, bin_fps, rounding_mode="floor").long() + 1
+        self.clip_bin_offsets = torch.cumsum(self.clip_bin_counts, dim=0) - self.clip_bin_counts
+        self.bin_count = int(self.clip_bin_counts.sum())
+        self.sampler = AdaptiveSampler(
+            self.bin_count,
+            [self.cfg.adaptive_lambda**i for i in range(self.cfg.adaptive_kernel_size)],
+            self.cfg.adaptive_uniform_ratio,
+            self.cfg.adaptive_alpha,
+            device=self.device,
+            clip_bin_offsets=self.clip_bin_offsets,
+        )
+
+        # ranges of the reset perturbations, one row per axis
+        axes = ["x", "y", "z", "roll", "pitch", "yaw"]
+        self._pose_ranges = torch.tensor([self.cfg.pose_range.get(key, (0.0, 0.0)) for key in axes], device=self.device)
+        self._velocity_ranges = torch.tensor(
+            [self.cfg.velocity_range.get(key, (0.0, 0.0)) for key in axes], device=self.device
         )
-        self.kernel = self.kernel / self.kernel.sum()
 
         self.metrics["error_anchor_pos"] = torch.zeros(self.num_envs, device=self.device)
         self.metrics["error_anchor_rot"] = torch.zeros(self.num_envs, device=self.device)
@@ -91,6 +564,8 @@ class MotionCommand(CommandTerm):
         self.metrics["error_anchor_ang_vel"] = torch.zeros(self.num_envs, device=self.device)
         self.metrics["error_body_pos"] = torch.zeros(self.num_envs, device=self.device)
         self.metrics["error_body_rot"] = torch.zeros(self.num_envs, device=self.device)
+        self.metrics["error_body_lin_vel"] = torch.zeros(self.num_envs, device=self.device)
+        self.metrics["error_body_ang_vel"] = torch.zeros(self.num_envs, device=self.device)
         self.metrics["error_joint_pos"] = torch.zeros(self.num_envs, device=self.device)
         self.metrics["error_joint_vel"] = torch.zeros(self.num_envs, device=self.device)
         self.metrics["sampling_entropy"] = torch.zeros(self.num_envs, device=self.device)
@@ -99,49 +574,131 @@ class MotionCommand(CommandTerm):
 
         self.evaluation = self.cfg.evaluation
 
+        # the error metrics are computed every metrics_interval steps and at the first step of every episode, the
+        # sampling metrics when they are logged
+        self._metrics_step = 0
+        self._new_episode_env_ids: list[Sequence[int] | slice] = []
+        self._sampling_metrics_stale = True
+
+        # reference and robot state of the current control step, shared by all MDP terms
+        self._state_version = 0
+        self._snapshot: dict[str, torch.Tensor] = {}
+        self._snapshot_key = None
+        self._body_subset_indexes: dict[tuple[str, ...], torch.Tensor] = {}
+        if self.cfg.interpolate:
+            self._update_frame_blend()
+
+    def invalidate_snapshot(self):
+        """Drops the cached state of the current control step.
+
+        The snapshot is rebuilt whenever the reference frames change or the simulation steps. Call this after writing
+        the robot state to the simulation outside of the command, if MDP terms read it again in the same step.
+        """
+        self._state_version += 1
+
+    def _cached(self, name: str, compute):
+        """Returns a tensor of the per-step snapshot, computing it on the first read of the step.
+
+        The returned tensors are shared by all readers and must not be modified in place.
+        """
+        if not self.cfg.snapshot:
+            return compute()
+        # the robot state changes when the environment steps, the reference when the command updates or resamples
+        key = (self._state_version, self._env.common_step_counter)
+        if key != self._snapshot_key:
+            self._snapshot.clear()
+            self._snapshot_key = key
+        value = self._snapshot.get(name)
+        if value is None:
+            value = self._snapshot[name] = compute()
+        return value
+
     @property
     def command(self) -> torch.Tensor:  # TODO Consider again if this is the best observation
-        return torch.cat([self.joint_pos, self.joint_vel], dim=1)
+        return self._cached("command", lambda: torch.cat([self.joint_pos, self.joint_vel], dim=1))
+
+    @property
+    def frame_indexes(self) -> torch.Tensor:
+        """Indexes of the current reference frames in the packed motion tensors."""
+        return self.motion.frame_indexes(self.clip_ids, self.time_steps)
+
+    def _reference(
+        self,
+        field: torch.Tensor,
+        body_index: int | None = None,
+        rotation: bool = False,
+        env_ids: Sequence[int] | None = None,
+    ) -> torch.Tensor:
+        """Gathers a reference tensor at the current frames, blending the neighboring frames when interpolating.
+
+        Only the rows of ``env_ids`` are gathered if given.
+        """
+        index = () if body_index is None else (body_index,)
+        if env_ids is None:
+            frame_indexes = self.frame_indexes
+        else:
+            frame_indexes = self.motion.frame_indexes(self.clip_ids[env_ids], self.time_steps[env_ids])
+        if not self.cfg.interpolate:
+            return field[(frame_indexes, *index)]
+        next_frame_indexes, frame_blend = self._next_frame_indexes, self._frame_blend
+        if env_ids is not None:
+            next_frame_indexes, frame_blend = next_frame_indexes[env_ids], frame_blend[env_ids]
+        return self.motion.interpolate(
+            field, (frame_indexes, *index), (next_frame_indexes, *index), frame_blend, rotation
+        )
 
     @property
     def joint_pos(self) -> torch.Tensor:
-        return self.motion.joint_pos[self.time_steps]
+        return self._cached("joint_pos", lambda: self._reference(self.motion.joint_pos))
 
     @property
     def joint_vel(self) -> torch.Tensor:
-        return self.motion.joint_vel[self.time_steps]
+        return self._cached("joint_vel", lambda: self._reference(self.motion.joint_vel))
 
     @property
     def body_pos_w(self) -> torch.Tensor:
-        return self.motion.body_pos_w[self.time_steps] + self._env.scene.env_origins[:, None, :]
+        return self._cached(
+            "body_pos_w", lambda: self._reference(self.motion.body_pos_w) + self._env.scene.env_origins[:, None, :]
+        )
 
     @property
     def body_quat_w(self) -> torch.Tensor:
-        return self.motion.body_quat_w[self.time_steps]
+        return self._cached("body_quat_w", lambda: self._reference(self.motion.body_quat_w, rotation=True))
 
     @property
     def body_lin_vel_w(self) -> torch.Tensor:
-        return self.motion.body_lin_vel_w[self.time_steps]
+        return self._cached("body_lin_vel_w", lambda: self._reference(self.motion.body_lin_vel_w))
 
     @property
     def body_ang_vel_w(self) -> torch.Tensor:
-        return self.motion.body_ang_vel_w[self.time_steps]
+        return self._cached("body_ang_vel_w", lambda: self._reference(self.motion.body_ang_vel_w))
 
     @property
     def anchor_pos_w(self) -> torch.Tensor:
-        return self.motion.body_pos_w[self.time_steps, self.motion_anchor_body_index] + self._env.scene.env_origins
+        return self._cached(
+            "anchor_pos_w",
+            lambda: self._reference(self.motion.body_pos_w, self.motion_anchor_body_index)
+            + self._env.scene.env_origins,
+        )
 
     @property
     def anchor_quat_w(self) -> torch.Tensor:
-        return self.motion.body_quat_w[self.time_steps, self.motion_anchor_body_index]
+        return self._cached(
+            "anchor_quat_w",
+            lambda: self._reference(self.motion.body_quat_w, self.motion_anchor_body_index, rotation=True),
+        )
 
     @property
     def anchor_lin_vel_w(self) -> torch.Tensor:
-        return self.motion.body_lin_vel_w[self.time_steps, self.motion_anchor_body_index]
+        return self._cached(
+            "anchor_lin_vel_w", lambda: self._reference(self.motion.body_lin_vel_w, self.motion_anchor_body_index)
+        )
 
     @property
     def anchor_ang_vel_w(self) -> torch.Tensor:
-        return self.motion.body_ang_vel_w[self.time_steps, self.motion_anchor_body_index]
+        return self._cached(
+            "anchor_ang_vel_w", lambda: self._reference(self.motion.body_ang_vel_w, self.motion_anchor_body_index)
+        )
 
     @property
     def robot_joint_pos(self) -> torch.Tensor:
@@ -153,19 +710,19 @@ class MotionCommand(CommandTerm):
 
     @property
     def robot_body_pos_w(self) -> torch.Tensor:
-        return self.robot.data.body_pos_w[:, self.body_indexes]
+        return self._cached("robot_body_pos_w", lambda: self.robot.data.body_pos_w[:, self.body_indexes])
 
     @property
     def robot_body_quat_w(self) -> torch.Tensor:
-        return self.robot.data.body_quat_w[:, self.body_indexes]
+        return self._cached("robot_body_quat_w", lambda: self.robot.data.body_quat_w[:, self.body_indexes])
 
     @property
     def robot_body_lin_vel_w(self) -> torch.Tensor:
-        return self.robot.data.body_lin_vel_w[:, self.body_indexes]
+        return self._cached("robot_body_lin_vel_w", lambda: self.robot.data.body_lin_vel_w[:, self.body_indexes])
 
     @property
     def robot_body_ang_vel_w(self) -> torch.Tensor:
-        return self.robot.data.body_ang_vel_w[:, self.body_indexes]
+        return self._cached("robot_body_ang_vel_w", lambda: self.robot.data.body_ang_vel_w[:, self.body_indexes])
 
     @property
     def robot_anchor_pos_w(self) -> torch.Tensor:
@@ -183,126 +740,243 @@ class MotionCommand(CommandTerm):
     def robot_anchor_ang_vel_w(self) -> torch.Tensor:
         return self.robot.data.body_ang_vel_w[:, self.robot_anchor_body_index]
 
-    def _update_metrics(self):
-        self.metrics["error_anchor_pos"] = torch.norm(self.anchor_pos_w - self.robot_anchor_pos_w, dim=-1)
-        self.metrics["error_anchor_rot"] = quat_error_magnitude(self.anchor_quat_w, self.robot_anchor_quat_w)
-        self.metrics["error_anchor_lin_vel"] = torch.norm(self.anchor_lin_vel_w - self.robot_anchor_lin_vel_w, dim=-1)
-        self.metrics["error_anchor_ang_vel"] = torch.norm(self.anchor_ang_vel_w - self.robot_anchor_ang_vel_w, dim=-1)
+    def body_subset_indexes(self, body_names: list[str] | None) -> torch.Tensor | slice:
+        """Indexes of a subset of the tracked bodies, built once per subset as a device tensor.
+
+        Args:
+            body_names: Names of the bodies to select. Defaults to None (all tracked bodies).
+
+        Returns:
+            The indexes of the selected bodies in :attr:`MotionCommandCfg.body_names`, or a full slice if
+            ``body_names`` is None.
+        """
+        if body_names is None:
+            return slice(None)
+        key = tuple(body_names)
+        if key not in self._body_subset_indexes:
+            self._body_subset_indexes[key] = torch.tensor(
+                [i for i, name in enumerate(self.cfg.body_names) if name in body_names],
+                dtype=torch.long,
+                device=self.device,
+            )
+        return self._body_subset_indexes[key]
 
-        self.metrics["error_body_pos"] = torch.norm(self.body_pos_relative_w - self.robot_body_pos_w, dim=-1).mean(
-            dim=-1
+    @property
+    def tracking_error(self) -> dict[str, torch.Tensor]:
+        """Errors between the reference and the robot, computed once per step for the rewards, terminations and
+        metrics.
+
+        The anchor errors are ``anchor_pos`` (position difference, shape (N, 3)), ``anchor_pos_norm``, ``anchor_rot``
+        (rotation angle), ``anchor_lin_vel_norm`` and ``anchor_ang_vel_norm`` (shape (N,)). The body errors are taken
+        against the relative body poses: ``body_pos`` (position difference, shape (N, B, 3)), ``body_pos_sq``,
+        ``body_lin_vel_sq`` and ``body_ang_vel_sq`` (squared norms, shape (N, B)) and ``body_rot`` (rotation angle,
+        shape (N, B)).
+        """
+        return self._cached("tracking_error", self._compute_tracking_error)
+
+    def _compute_tracking_error(self) -> dict[str, torch.Tensor]:
+        return self._tracking_error(
+            self.anchor_pos_w,
+            self.anchor_quat_w,
+            self.anchor_lin_vel_w,
+            self.anchor_ang_vel_w,
+            self.robot_anchor_pos_w,
+            self.robot_anchor_quat_w,
+            self.robot_anchor_lin_vel_w,
+            self.robot_anchor_ang_vel_w,
+            self.body_pos_relative_w,
+            self.body_quat_relative_w,
+            self.body_lin_vel_w,
+            self.body_ang_vel_w,
+            self.robot_body_pos_w,
+            self.robot_body_quat_w,
+            self.robot_body_lin_vel_w,
+            self.robot_body_ang_vel_w,
         )
-        self.metrics["error_body_rot"] = quat_error_magnitude(self.body_quat_relative_w, self.robot_body_quat_w).mean(
-            dim=-1
+
+    @property
+    def anchor_frame_observations(self) -> dict[str, torch.Tensor]:
+        """Observations in the robot's anchor frame, computed once per step for the policy and critic groups.
+
+        The keys are ``motion_anchor_pos_b`` (shape (N, 3)), ``motion_anchor_ori_b`` and ``robot_anchor_ori_w`` (6D
+        orientation features, shape (N, 6)), ``robot_body_pos_b`` (shape (N, 3 * B)) and ``robot_body_ori_b`` (shape
+        (N, 6 * B)). The values are views of one buffer that is overwritten every step and must not be modified.
+        """
+        return self._cached("anchor_frame_observations", self._compute_anchor_frame_observations)
+
+    def _compute_anchor_frame_observations(self) -> dict[str, torch.Tensor]:
+        self._anchor_frame_observations(
+            self.anchor_pos_w,
+            self.anchor_quat_w,
+            self.robot_anchor_pos_w,
+            self.robot_anchor_quat_w,
+            self.robot_body_pos_w,
+            self.robot_body_quat_w,
+            self._observation_buffer,
         )
+        return self._observation_views
+
+    def reset(self, env_ids: Sequence[int] | None = None) -> dict[str, float]:
+        # the reset logs the last error metrics computed in the episode, as with metrics_interval=1
+        if self._sampling_metrics_stale:
+            self._compute_sampling_metrics()
+        extras = super().reset(env_ids)
+        if self.cfg.metrics_interval > 1:
+            self._new_episode_env_ids.append(slice(None) if env_ids is None else env_ids)
+        return extras
+
+    def compute_metrics(self):
+        """Computes all metrics of all envs for the current step, regardless of ``metrics_interval``."""
+        self._compute_error_metrics(slice(None))
+        self._compute_sampling_metrics()
 
-        self.metrics["error_body_lin_vel"] = torch.norm(self.body_lin_vel_w - self.robot_body_lin_vel_w, dim=-1).mean(
-            dim=-1
+    def _update_metrics(self):
+        if self._metrics_step % self.cfg.metrics_interval == 0:
+            self._compute_error_metrics(slice(None))
+        else:
+            # the new episodes get their first metrics at once, so that every episode logs a value of its own
+            for env_ids in self._new_episode_env_ids:
+                self._compute_error_metrics(env_ids)
+        self._new_episode_env_ids.clear()
+        self._metrics_step += 1
+
+    def _compute_error_metrics(self, env_ids: Sequence[int] | slice):
+        error = self.tracking_error
+        self.metrics["error_anchor_pos"][env_ids] = error["anchor_pos_norm"][env_ids]
+        self.metrics["error_anchor_rot"][env_ids] = error["anchor_rot"][env_ids]
+        self.metrics["error_anchor_lin_vel"][env_ids] = error["anchor_lin_vel_norm"][env_ids]
+        self.metrics["error_anchor_ang_vel"][env_ids] = error["anchor_ang_vel_norm"][env_ids]
+
+        self.metrics["error_body_pos"][env_ids] = error["body_pos_sq"][env_ids].sqrt().mean(dim=-1)
+        self.metrics["error_body_rot"][env_ids] = error["body_rot"][env_ids].mean(dim=-1)
+
+        self.metrics["error_body_lin_vel"][env_ids] = error["body_lin_vel_sq"][env_ids].sqrt().mean(dim=-1)
+        self.metrics["error_body_ang_vel"][env_ids] = error["body_ang_vel_sq"][env_ids].sqrt().mean(dim=-1)
+
+        self.metrics["error_joint_pos"][env_ids] = torch.norm(
+            self.joint_pos[env_ids] - self.robot_joint_pos[env_ids], dim=-1
         )
-        self.metrics["error_body_ang_vel"] = torch.norm(self.body_ang_vel_w - self.robot_body_ang_vel_w, dim=-1).mean(
-            dim=-1
+        self.metrics["error_joint_vel"][env_ids] = torch.norm(
+            self.joint_vel[env_ids] - self.robot_joint_vel[env_ids], dim=-1
         )
 
-        self.metrics["error_joint_pos"] = torch.norm(self.joint_pos - self.robot_joint_pos, dim=-1)
-        self.metrics["error_joint_vel"] = torch.norm(self.joint_vel - self.robot_joint_vel, dim=-1)
+    def _compute_sampling_metrics(self):
+        sampling_probabilities = self.sampler.probabilities()
+        H = -(sampling_probabilities * (sampling_probabilities + 1e-12).log()).sum()
+        H_norm = H / math.log(self.bin_count)
+        pmax, imax = sampling_probabilities.max(dim=0)
+        self.metrics["sampling_entropy"][:] = H_norm
+        self.metrics["sampling_top1_prob"][:] = pmax
+        self.metrics["sampling_top1_bin"][:] = imax.float() / self.bin_count
+        self._sampling_metrics_stale = False
 
     def _adaptive_sampling(self, env_ids: Sequence[int]):
         episode_failed = self._env.termination_manager.terminated[env_ids]
         if torch.any(episode_failed):
-            current_bin_index = torch.clamp(
-                (self.time_steps * self.bin_count) // max(self.motion.time_step_total, 1), 0, self.bin_count - 1
+            clip_bin_counts = self.clip_bin_counts[self.clip_ids]
+            current_bin_index = self.clip_bin_offsets[self.clip_ids] + torch.clamp(
+                (self.time_steps * clip_bin_counts) // self.motion.clip_lengths[self.clip_ids].clamp(min=1),
+                torch.zeros_like(clip_bin_counts),
+                clip_bin_counts - 1,
             )
             fail_bins = current_bin_index[env_ids][episode_failed]
-            self._current_bin_failed[:] = torch.bincount(fail_bins, minlength=self.bin_count)
+            self.sampler.record_failures(fail_bins)
 
         # Sample
-        sampling_probabilities = self.bin_failed_count + self.cfg.adaptive_uniform_ratio / float(self.bin_count)
-        sampling_probabilities = torch.nn.functional.pad(
-            sampling_probabilities.unsqueeze(0).unsqueeze(0),
-            (0, self.cfg.adaptive_kernel_size - 1),  # Non-causal kernel
-            mode="replicate",
-        )
-        sampling_probabilities = torch.nn.functional.conv1d(sampling_probabilities, self.kernel.view(1, 1, -1)).view(-1)
-
-        sampling_probabilities = sampling_probabilities / sampling_probabilities.sum()
-
-        sampled_bins = torch.multinomial(sampling_probabilities, len(env_ids), replacement=True)
+        sampled_bins = self.sampler.sample(len(env_ids))
 
         if self.evaluation:
+            self.clip_ids[env_ids] = torch.as_tensor(env_ids, device=self.device) % self.motion.num_clips
             self.time_steps[env_ids] = 0
+            self.motion_phase[env_ids] = 0.0
         else:
-            self.time_steps[env_ids] = (
-                (sampled_bins + sample_uniform(0.0, 1.0, (len(env_ids),), device=self.device))
-                / self.bin_count
-                * (self.motion.time_step_total - 1)
-            ).long()
-        
-
-        # Metrics
-        H = -(sampling_probabilities * (sampling_probabilities + 1e-12).log()).sum()
-        H_norm = H / math.log(self.bin_count)
-        pmax, imax = sampling_probabilities.max(dim=0)
-        self.metrics["sampling_entropy"][:] = H_norm
-        self.metrics["sampling_top1_prob"][:] = pmax
-        self.metrics["sampling_top1_bin"][:] = imax.float() / self.bin_count
+            # map the sampled bins back to their clip and to a (fractional) frame inside that clip
+            clip_ids = torch.searchsorted(self.clip_bin_offsets, sampled_bins, right=True) - 1
+            local_bins = sampled_bins - self.clip_bin_offsets[clip_ids]
+            self.clip_ids[env_ids] = clip_ids
+            phase = (
+                (local_bins + sample_uniform(0.0, 1.0, (len(env_ids),), device=self.device))
+                / self.clip_bin_counts[clip_ids]
+                * (self.motion.clip_lengths[clip_ids] - 1)
+            )
+            if self.cfg.interpolate:
+                self.motion_phase[env_ids] = phase
+            else:
+                self.time_steps[env_ids] = phase.long()
+        if self.cfg.interpolate:
+            self._update_frame_blend()
+
+        # the sampling metrics are only needed when they are logged
+        self._sampling_metrics_stale = True
 
     def _resample_command(self, env_ids: Sequence[int]):
         if len(env_ids) == 0:
             return
         self._adaptive_sampling(env_ids)
+        self._state_version += 1
 
-        root_pos = self.body_pos_w[:, 0].clone()
-        root_ori = self.body_quat_w[:, 0].clone()
-        root_lin_vel = self.body_lin_vel_w[:, 0].clone()
-        root_ang_vel = self.body_ang_vel_w[:, 0].clone()
+        # only the rows of the resampled envs are gathered, perturbed and written
+        root_pos = self._reference(self.motion.body_pos_w, 0, env_ids=env_ids) + self._env.scene.env_origins[env_ids]
+        root_ori = self._reference(self.motion.body_quat_w, 0, rotation=True, env_ids=env_ids)
+        root_lin_vel = self._reference(self.motion.body_lin_vel_w, 0, env_ids=env_ids)
+        root_ang_vel = self._reference(self.motion.body_ang_vel_w, 0, env_ids=env_ids)
 
-        range_list = [self.cfg.pose_range.get(key, (0.0, 0.0)) for key in ["x", "y", "z", "roll", "pitch", "yaw"]]
-        ranges = torch.tensor(range_list, device=self.device)
-        rand_samples = sample_uniform(ranges[:, 0], ranges[:, 1], (len(env_ids), 6), device=self.device)
-        root_pos[env_ids] += rand_samples[:, 0:3]
+        rand_samples = sample_uniform(
+            self._pose_ranges[:, 0], self._pose_ranges[:, 1], (len(env_ids), 6), device=self.device
+        )
+        root_pos += rand_samples[:, 0:3]
         orientations_delta = quat_from_euler_xyz(rand_samples[:, 3], rand_samples[:, 4], rand_samples[:, 5])
-        root_ori[env_ids] = quat_mul(orientations_delta, root_ori[env_ids])
-        range_list = [self.cfg.velocity_range.get(key, (0.0, 0.0)) for key in ["x", "y", "z", "roll", "pitch", "yaw"]]
-        ranges = torch.tensor(range_list, device=self.device)
-        rand_samples = sample_uniform(ranges[:, 0], ranges[:, 1], (len(env_ids), 6), device=self.device)
-        root_lin_vel[env_ids] += rand_samples[:, :3]
-        root_ang_vel[env_ids] += rand_samples[:, 3:]
+        root_ori = quat_mul(orientations_delta, root_ori)
+        rand_samples = sample_uniform(
+            self._velocity_ranges[:, 0], self._velocity_ranges[:, 1], (len(env_ids), 6), device=self.device
+        )
+        root_lin_vel += rand_samples[:, :3]
+        root_ang_vel += rand_samples[:, 3:]
 
-        joint_pos = self.joint_pos.clone()
-        joint_vel = self.joint_vel.clone()
+        joint_pos = self._reference(self.motion.joint_pos, env_ids=env_ids)
+        joint_vel = self._reference(self.motion.joint_vel, env_ids=env_ids)
 
         joint_pos += sample_uniform(*self.cfg.joint_position_range, joint_pos.shape, joint_pos.device)
         soft_joint_pos_limits = self.robot.data.soft_joint_pos_limits[env_ids]
-        joint_pos[env_ids] = torch.clip(
-            joint_pos[env_ids], soft_joint_pos_limits[:, :, 0], soft_joint_pos_limits[:, :, 1]
-        )
-        self.robot.write_joint_state_to_sim(joint_pos[env_ids], joint_vel[env_ids], env_ids=env_ids)
+        joint_pos = torch.clip(joint_pos, soft_joint_pos_limits[:, :, 0], soft_joint_pos_limits[:, :, 1])
+        self.robot.write_joint_state_to_sim(joint_pos, joint_vel, env_ids=env_ids)
         self.robot.write_root_state_to_sim(
-            torch.cat([root_pos[env_ids], root_ori[env_ids], root_lin_vel[env_ids], root_ang_vel[env_ids]], dim=-1),
-            env_ids=env_ids,
+            torch.cat([root_pos, root_ori, root_lin_vel, root_ang_vel], dim=-1), env_ids=env_ids
         )
+        # the robot state of the resampled envs was overwritten
+        self._state_version += 1
+
+    def _update_frame_blend(self):
+        """Updates the frames and blend factors of the fractional motion phases."""
+        _, self._next_frame_indexes, self._frame_blend = self.motion.frame_blend(self.clip_ids, self.motion_phase)
+        last_time_steps = (self.motion.clip_lengths[self.clip_ids] - 1).to(self.motion_phase.dtype)
+        self.time_steps = torch.minimum(self.motion_phase.clamp(min=0.0), last_time_steps).long()
 
     def _update_command(self):
-        self.time_steps += 1
-        env_ids = torch.where(self.time_steps >= self.motion.time_step_total)[0]
+        if self.cfg.interpolate:
+            self.motion_phase += self._phase_step
+            env_ids = torch.where(self.motion_phase > self.motion.clip_lengths[self.clip_ids] - 1)[0]
+            self._update_frame_blend()
+        else:
+            self.time_steps += 1
+            env_ids = torch.where(self.time_steps >= self.motion.clip_lengths[self.clip_ids])[0]
+        self._state_version += 1
         self._resample_command(env_ids)
 
-        anchor_pos_w_repeat = self.anchor_pos_w[:, None, :].repeat(1, len(self.cfg.body_names), 1)
-        anchor_quat_w_repeat = self.anchor_quat_w[:, None, :].repeat(1, len(self.cfg.body_names), 1)
-        robot_anchor_pos_w_repeat = self.robot_anchor_pos_w[:, None, :].repeat(1, len(self.cfg.body_names), 1)
-        robot_anchor_quat_w_repeat = self.robot_anchor_quat_w[:, None, :].repeat(1, len(self.cfg.body_names), 1)
-
-        delta_pos_w = robot_anchor_pos_w_repeat
-        delta_pos_w[..., 2] = anchor_pos_w_repeat[..., 2]
-        delta_ori_w = yaw_quat(quat_mul(robot_anchor_quat_w_repeat, quat_inv(anchor_quat_w_repeat)))
-
-        self.body_quat_relative_w = quat_mul(delta_ori_w, self.body_quat_w)
-        self.body_pos_relative_w = delta_pos_w + quat_apply(delta_ori_w, self.body_pos_w - anchor_pos_w_repeat)
-
-        self.bin_failed_count = (
-            self.cfg.adaptive_alpha * self._current_bin_failed + (1 - self.cfg.adaptive_alpha) * self.bin_failed_count
+        self._relative_body_pose(
+            self.anchor_pos_w,
+            self.anchor_quat_w,
+            self.robot_anchor_pos_w,
+            self.robot_anchor_quat_w,
+            self.body_pos_w,
+            self.body_quat_w,
+            self.body_pos_relative_w,
+            self.body_quat_relative_w,
         )
-        self._current_bin_failed.zero_()
+        # the body errors are taken against the relative body poses
+        self._snapshot.pop("tracking_error", None)
+
+        self.sampler.step()
 
     def _set_debug_vis_impl(self, debug_vis: bool):
         if debug_vis:
@@ -363,6 +1037,41 @@ class MotionCommandCfg(CommandTermCfg):
     asset_name: str = MISSING
 
     motion_file: str = MISSING
+    """Path to the motion file, a motion dataset directory, a glob pattern of motion files, or a manifest (``.txt``)
+    listing one motion file per line. Several files and datasets are packed into one :class:`MotionLibrary`."""
+    motion_mmap: bool = False
+    """Whether to read the motion files through memory-mapped sidecars, which only reads the tracked bodies."""
+    motion_cache_dir: str | None = None
+    """Directory of the preprocessed motion cache, see :mod:`whole_body_tracking.utils.motion_cache`. Defaults to None
+    (no cache)."""
+    motion_cache_max_bytes: int = DEFAULT_MAX_BYTES
+    """Size limit of the preprocessed motion cache, the least recently used motions are evicted beyond it."""
+    motion_shared_memory: bool = False
+    """Whether to load the motion files through the node-local shared-memory store, so that the processes on a node
+    share one host copy of every motion, see :mod:`whole_body_tracking.utils.motion_shm`."""
+    motion_quantization: str | None = None
+    """Compact device storage of the reference motion: ``"float16"``, or ``"int16"`` (int16 positions with a per-clip
+    offset and scale, int16 unit quaternions and float16 velocities). Defaults to None (float32)."""
+    motion_padding: tuple[int, int] | None = None
+    """Number of virtual copies of the first and last frame played before and after every clip, overriding the
+    ``pad_start`` and ``pad_end`` stored in the motion files. Defaults to None (the padding of the files)."""
+
+    snapshot: bool = True
+    """Whether to cache the reference and robot state read by the MDP terms once per control step. The snapshot is
+    rebuilt when the reference frames change or the simulation steps. Without it, every term recomputes the full
+    :attr:`MotionCommand.tracking_error`, which is only meant for debugging."""
+
+    compile_step: bool = False
+    """Whether to compile the tensor stages of every control step (relative body poses and tracking errors) with
+    :func:`torch.compile` for static shapes. A stage that fails to compile falls back to eager execution."""
+
+    interpolate: bool = False
+    """Whether to track a fractional motion phase and blend the neighboring reference frames. The motion then plays at
+    its own fps (times :attr:`playback_rate`) whatever the control frequency. Otherwise the reference advances by one
+    frame per control step, which assumes that the motion fps matches the control frequency."""
+    playback_rate: float = 1.0
+    """Playback speed of the motion relative to its fps. Only used when interpolating."""
+
     anchor_body_name: str = MISSING
     body_names: list[str] = MISSING
 
@@ -382,4 +1091,11 @@ class MotionCommandCfg(CommandTermCfg):
     body_visualizer_cfg: VisualizationMarkersCfg = FRAME_MARKER_CFG.replace(prim_path="/Visuals/Command/pose")
     body_visualizer_cfg.markers["frame"].scale = (0.1, 0.1, 0.1)
 
+    metrics_interval: int = 1
+    """Number of control steps between two computations of the tracking error metrics of all envs. The metrics of an env
+    are also computed at the first step of each of its episodes. Whatever the interval, the value logged when an env
+    resets is the last one computed in its episode, the tracking error after a control step and never the state reached
+    by the physics step that ended the episode; with an interval above 1 it is up to ``metrics_interval - 1`` steps
+    older. The sampling metrics are only computed when they are logged."""
+
     evaluation: bool = False
\ No newline at end of file
@@ -17,12 +17,12 @@ from whole_body_tracking.tasks.tracking.mdp.rewards import _get_body_indexes
 
 def bad_anchor_pos(env: ManagerBasedRLEnv, command_name: str, threshold: float) -> torch.Tensor:
     command: MotionCommand = env.command_manager.get_term(command_name)
-    return torch.norm(command.anchor_pos_w - command.robot_anchor_pos_w, dim=1) > threshold
+    return command.tracking_error["anchor_pos_norm"] > threshold
 
 
 def bad_anchor_pos_z_only(env: ManagerBasedRLEnv, command_name: str, threshold: float) -> torch.Tensor:
     command: MotionCommand = env.command_manager.get_term(command_name)
-    return torch.abs(command.anchor_pos_w[:, -1] - command.robot_anchor_pos_w[:, -1]) > threshold
+    return torch.abs(command.tracking_error["anchor_pos"][:, -1]) > threshold
 
 
 def bad_anchor_ori(
@@ -44,8 +44,8 @@ def bad_motion_body_pos(
     command: MotionCommand = env.command_manager.get_term(command_name)
 
     body_indexes = _get_body_indexes(command, body_names)
-    error = torch.norm(command.body_pos_relative_w[:, body_indexes] - command.robot_body_pos_w[:, body_indexes], dim=-1)
-    return torch.any(error > threshold, dim=-1)
+    error = command.tracking_error["body_pos_sq"][:, body_indexes]
+    return torch.any(error > threshold**2, dim=-1)
 
 
 def bad_motion_body_pos_z_only(
@@ -54,5 +54,5 @@ def bad_motion_body_pos_z_only(
     command: MotionCommand = env.command_manager.get_term(command_name)
 
     body_indexes = _get_body_indexes(command, body_names)
-    error = torch.abs(command.body_pos_relative_w[:, body_indexes, -1] - command.robot_body_pos_w[:, body_indexes, -1])
+    error = torch.abs(command.tracking_error["body_pos"][:, body_indexes, -1])
     return torch.any(error > threshold, dim=-1)
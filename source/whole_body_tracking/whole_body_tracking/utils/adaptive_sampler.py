@@ -0,0 +1,146 @@
+"""Incremental sampler of the adaptive motion bins.
+
+The motion command samples the start of a reset episode from bins of the reference motions, favoring the bins in
+which episodes failed recently. The sampling distribution is the exponential moving average (EMA) of the failures of
+every bin, plus a uniform share, smoothed with a non-causal kernel (each bin also collects the failures of the bins
+after it in its clip). Recomputing it for all bins at every reset costs O(B) for B bins, which dominates for long clips and large
+motion sets.
+
+:class:`AdaptiveSampler` keeps the distribution incrementally instead:
+
+* The EMA decay is folded into a global scale, so a step without failures costs O(1) and a step with failures only
+  touches the failed bins.
+* The kernel smoothing is linear, so only the bins that a change reaches (the kernel size before it) are updated.
+* The cumulative sum of the smoothed failures does not depend on the EMA scale, so it is only rebuilt, with one
+  ``cumsum``, before the first draw after a step with failures. Draws are a ``searchsorted`` in O(log B).
+
+A Fenwick tree would update the cumulative sum in O(log B) instead of O(B), but at the bin counts of the tracking
+task (up to ~1e6) its ~log B launches per update cost more than one ``cumsum``. All operations are batched tensor
+operations without host synchronization.
+"""
+
+from __future__ import annotations
+
+import torch
+from collections.abc import Sequence
+
+_MIN_SCALE = 1e-30
+"""The EMA scale below which the stored failures are renormalized, to keep them finite."""
+
+
+class AdaptiveSampler:
+    """Samples bins from the kernel-smoothed EMA of their failures.
+
+    The sampling probabilities match the dense computation, where every clip is smoothed on its own
+
+    .. code-block:: python
+
+        p = ema_failures + uniform_ratio / bin_count
+        clips = split(p, clip_bin_counts)
+        p = cat([conv1d(pad(clip, (0, kernel_size - 1), mode="replicate"), kernel) for clip in clips])
+        p = p / p.sum()
+
+    where the EMA is updated once per step with ``ema = alpha * failures + (1 - alpha) * ema``.
+
+    Args:
+        bin_count: Number of bins.
+        kernel: Smoothing kernel, normalized to sum to one. The weight ``kernel[i]`` spreads the failures of a bin to
+            the bin ``i`` places before it.
+        uniform_ratio: Share of the probability mass that is spread uniformly over the bins.
+        alpha: EMA factor of the failures of the current step.
+        device: Device of the sampler tensors.
+        clip_bin_offsets: The first bin of every clip, in increasing order. The failures of a bin are not spread to
+            the bins of the clips before it. Defaults to None, in which case all bins belong to one clip.
+    """
+
+    def __init__(
+        self,
+        bin_count: int,
+        kernel: Sequence[float] | torch.Tensor,
+        uniform_ratio: float,
+        alpha: float,
+        device: str = "cpu",
+        clip_bin_offsets: Sequence[int] | torch.Tensor | None = None,
+    ):
+        self.bin_count = bin_count
+        self.uniform_ratio = uniform_ratio
+        self.alpha = alpha
+        self.device = device
+
+        kernel = torch.as_tensor(kernel, dtype=torch.float64, device=device)
+        self.kernel = kernel / kernel.sum()
+        # the last bin of a clip is replicated past its end, so it reaches the bins before it with the tail sums of the
+        # kernel
+        self._kernel_tail = self.kernel.flip(0).cumsum(0).flip(0)
+        self._kernel_offsets = torch.arange(len(self.kernel), device=device)
+        if clip_bin_offsets is None:
+            clip_bin_offsets = [0]
+        self._clip_starts = torch.as_tensor(clip_bin_offsets, dtype=torch.long, device=device)
+        self._clip_ends = torch.cat([self._clip_starts[1:], self._clip_starts.new_tensor([bin_count])]) - 1
+
+        # the EMA of the failures is scale * failed, and scale * smoothed is its kernel smoothing
+        self._scale = 1.0
+        self._failed = torch.zeros(bin_count, dtype=torch.float64, device=device)
+        self._smoothed = torch.zeros(bin_count, dtype=torch.float64, device=device)
+        self._cumulative: torch.Tensor | None = None
+        self._pending: torch.Tensor | None = None
+
+    @property
+    def failed_count(self) -> torch.Tensor:
+        """The EMA of the failures of every bin. Shape is (bin_count,)."""
+        return (self._failed * self._scale).float()
+
+    def record_failures(self, bins: torch.Tensor):
+        """Sets the failures of the current step, which are folded into the EMA by :meth:`step`.
+
+        Args:
+            bins: The bin of every failed episode. A bin may appear several times.
+        """
+        self._pending = bins.long()
+
+    def step(self):
+        """Folds the failures of the current step into the EMA and decays the older failures."""
+        self._scale *= 1.0 - self.alpha
+        if self._scale < _MIN_SCALE:
+            self._renormalize()
+        if self._pending is not None:
+            bins, self._pending = self._pending, None
+            delta = self.alpha / self._scale
+            self._failed.index_add_(0, bins, torch.full_like(bins, delta, dtype=torch.float64))
+            clips = torch.searchsorted(self._clip_starts, bins, right=True) - 1
+            starts = self._clip_starts[clips]
+            targets = bins[:, None] - self._kernel_offsets[None, :]
+            weights = torch.where((bins == self._clip_ends[clips])[:, None], self._kernel_tail, self.kernel)
+            values = torch.where(targets >= starts[:, None], weights * delta, 0.0)
+            self._smoothed.index_add_(0, torch.maximum(targets, starts[:, None]).flatten(), values.flatten())
+            self._cumulative = None
+
+    def sample(self, num_samples: int) -> torch.Tensor:
+        """Draws bins with replacement.
+
+        Args:
+            num_samples: Number of bins to draw.
+
+        Returns:
+            The drawn bins. Shape is (num_samples,).
+        """
+        if self._cumulative is None:
+            self._cumulative = torch.cumsum(self._smoothed, dim=0)
+        failed_mass = self._cumulative[-1] * self._scale
+        draws = torch.rand(num_samples, dtype=torch.float64, device=self.device) * (failed_mass + self.uniform_ratio)
+        # the uniform share comes first in the cumulative distribution, the smoothed failures after it
+        uniform_bins = (draws / max(self.uniform_ratio, _MIN_SCALE) * self.bin_count).long()
+        failed_bins = torch.searchsorted(self._cumulative, (draws - self.uniform_ratio) / self._scale, right=True)
+        bins = torch.where(draws < self.uniform_ratio, uniform_bins, failed_bins)
+        return bins.clamp(max=self.bin_count - 1)
+
+    def probabilities(self) -> torch.Tensor:
+        """The normalized sampling probability of every bin, computed densely. Shape is (bin_count,)."""
+        probabilities = self._smoothed * self._scale + self.uniform_ratio / self.bin_count
+        return (probabilities / probabilities.sum()).float()
+
+    def _renormalize(self):
+        self._failed *= self._scale
+        self._smoothed *= self._scale
+        self._cumulative = None
+        self._scale = 1.0
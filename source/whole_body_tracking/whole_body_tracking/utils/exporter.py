@@ -33,16 +33,22 @@ class _OnnxMotionPolicyExporter(_OnnxPolicyExporter):
         super().__init__(actor_critic, normalizer, verbose)
         cmd: MotionCommand = env.command_manager.get_term("motion")
 
-        self.joint_pos = cmd.motion.joint_pos.to("cpu")
-        self.joint_vel = cmd.motion.joint_vel.to("cpu")
-        self.body_pos_w = cmd.motion.body_pos_w.to("cpu")
-        self.body_quat_w = cmd.motion.body_quat_w.to("cpu")
-        self.body_lin_vel_w = cmd.motion.body_lin_vel_w.to("cpu")
-        self.body_ang_vel_w = cmd.motion.body_ang_vel_w.to("cpu")
+        # export the clip followed by the first environment
+        clip = cmd.motion.clip_slice(int(cmd.clip_ids[0]))
+        self.joint_pos = cmd.motion.joint_pos[clip].to("cpu")
+        self.joint_vel = cmd.motion.joint_vel[clip].to("cpu")
+        self.body_pos_w = cmd.motion.body_pos_w[clip].to("cpu")
+        self.body_quat_w = cmd.motion.body_quat_w[clip].to("cpu")
+        self.body_lin_vel_w = cmd.motion.body_lin_vel_w[clip].to("cpu")
+        self.body_ang_vel_w = cmd.motion.body_ang_vel_w[clip].to("cpu")
         self.time_step_total = self.joint_pos.shape[0]
+        # the padding of the clip is virtual, time steps in it map to the first and last frame as in the command
+        self.pad_start = int(cmd.motion.clip_pad_start[int(cmd.clip_ids[0])])
 
     def forward(self, x, time_step):
-        time_step_clamped = torch.clamp(time_step.long().squeeze(-1), max=self.time_step_total - 1)
+        time_step_clamped = torch.clamp(
+            time_step.long().squeeze(-1) - self.pad_start, min=0, max=self.time_step_total - 1
+        )
         return (
             self.actor(self.normalizer(x)),
             self.joint_pos[time_step_clamped],
@@ -0,0 +1,238 @@
+"""Simulator-free forward kinematics of floating-base robots described by a URDF.
+
+:class:`KinematicTree` parses the kinematic tree of a robot description once and then computes the world poses and
+velocities of all bodies for a batch of frames, e.g. all frames of a motion clip, in one pass per tree depth, without
+replaying the motion in Isaac Sim to read back the body states. ``scripts/benchmarks/forward_kinematics.py`` checks
+them against a motion converted in Isaac Sim.
+
+The bodies and joints follow the order of the articulations in Isaac Lab: breadth first from the root, with the
+children of a body sorted by name, and one joint per body that is not attached by a fixed joint. As in Isaac Lab, the
+body positions and orientations are the ones of the link frames and the linear velocities are the ones of the centers
+of mass.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import torch
+import xml.etree.ElementTree as ET
+
+from whole_body_tracking.assets import ASSET_DIR
+from whole_body_tracking.utils.quaternion import quat_apply_broadcast, quat_mul_broadcast
+
+G1_URDF_PATH = os.path.join(ASSET_DIR, "g1_racket", "g1_racket.urdf")
+"""Path of the description of the G1 trained on (with the racket on the right hand), derived from the physics layer of
+``robots/g1_racket.usd`` with ``scripts/usd_to_urdf.py``, so its bodies and joints match the articulation of
+``robots/g1.py``. The ``main.urdf`` of the downloaded ``unitree_description`` has other bodies;
+:func:`~whole_body_tracking.utils.motion_conversion.convert_motion` rejects a description whose bodies differ from the
+articulation."""
+
+_REVOLUTE_TYPES = ("revolute", "continuous")
+_SUPPORTED_TYPES = ("fixed", "prismatic") + _REVOLUTE_TYPES
+
+
+def _parse_floats(text: str | None, default: tuple[float, ...]) -> list[float]:
+    return [float(value) for value in text.split()] if text else list(default)
+
+
+def _quat_from_rpy(roll: float, pitch: float, yaw: float) -> list[float]:
+    """Quaternion in (w, x, y, z) of the URDF fixed-axis rotation, which is about x first, then y, then z."""
+    cr, sr = math.cos(roll / 2), math.sin(roll / 2)
+    cp, sp = math.cos(pitch / 2), math.sin(pitch / 2)
+    cy, sy = math.cos(yaw / 2), math.sin(yaw / 2)
+    return [
+        cr * cp * cy + sr * sp * sy,
+        sr * cp * cy - cr * sp * sy,
+        cr * sp * cy + sr * cp * sy,
+        cr * cp * sy - sr * sp * cy,
+    ]
+
+
+class KinematicTree:
+    """Forward kinematics of a floating-base robot parsed from a URDF.
+
+    Args:
+        urdf_path: Path to the URDF file. Defaults to the G1 description.
+        device: Device of the kinematic tensors.
+        dtype: Floating point type of the kinematic tensors.
+
+    Raises:
+        ValueError: If the description has a joint type other than fixed, revolute, continuous or prismatic, or more
+            than one root body.
+    """
+
+    def __init__(self, urdf_path: str = G1_URDF_PATH, device: str = "cpu", dtype: torch.dtype = torch.float32):
+        self.device = device
+        root = ET.parse(urdf_path).getroot()
+
+        com_pos = {}
+        for link in root.findall("link"):
+            origin = link.find("inertial/origin")
+            com_pos[link.get("name")] = _parse_floats(None if origin is None else origin.get("xyz"), (0.0, 0.0, 0.0))
+
+        children: dict[str, list[ET.Element]] = {}
+        child_names = set()
+        for joint in root.findall("joint"):
+            if joint.get("type") not in _SUPPORTED_TYPES:
+                raise ValueError(f"Unsupported type '{joint.get('type')}' of the joint '{joint.get('name')}'.")
+            children.setdefault(joint.find("parent").get("link"), []).append(joint)
+            child_names.add(joint.find("child").get("link"))
+        roots = [name for name in com_pos if name not in child_names]
+        if len(roots) != 1:
+            raise ValueError(f"Expected one root body in '{urdf_path}', found {roots}.")
+
+        # breadth first, with the children of a body sorted by name
+        self.body_names: list[str] = [roots[0]]
+        """Names of the bodies, the first one is the floating root."""
+        self.joint_names: list[str] = []
+        """Names of the joints that are not fixed, in the order of the joint positions."""
+        parents, depths, joint_columns, revolute, prismatic = [-1], [0], [-1], [0.0], [0.0]
+        origin_pos, origin_quat, axes = [[0.0] * 3], [[1.0, 0.0, 0.0, 0.0]], [[0.0] * 3]
+        for parent_index, parent_name in enumerate(self.body_names):
+            for joint in sorted(children.get(parent_name, []), key=lambda joint: joint.find("child").get("link")):
+                joint_type = joint.get("type")
+                origin = joint.find("origin")
+                axis = joint.find("axis")
+                axis = _parse_floats(None if axis is None else axis.get("xyz"), (1.0, 0.0, 0.0))
+                self.body_names.append(joint.find("child").get("link"))
+                parents.append(parent_index)
+                depths.append(depths[parent_index] + 1)
+                # fixed joints read the zero column appended after the joint positions
+                joint_columns.append(-1 if joint_type == "fixed" else len(self.joint_names))
+                if joint_type != "fixed":
+                    self.joint_names.append(joint.get("name"))
+                revolute.append(float(joint_type in _REVOLUTE_TYPES))
+                prismatic.append(float(joint_type == "prismatic"))
+                if origin is None:
+                    origin = ET.Element("origin")
+                origin_pos.append(_parse_floats(origin.get("xyz"), (0.0, 0.0, 0.0)))
+                origin_quat.append(_quat_from_rpy(*_parse_floats(origin.get("rpy"), (0.0, 0.0, 0.0))))
+                axes.append([value / math.hypot(*axis) for value in axis])
+
+        self.num_bodies = len(self.body_names)
+        self.num_joints = len(self.joint_names)
+        self._parents = torch.tensor(parents, dtype=torch.long, device=device)
+        self._joint_columns = torch.tensor(
+            [self.num_joints if column < 0 else column for column in joint_columns], dtype=torch.long, device=device
+        )
+        self._revolute = torch.tensor(revolute, dtype=dtype, device=device)
+        self._prismatic = torch.tensor(prismatic, dtype=dtype, device=device)
+        self._origin_pos = torch.tensor(origin_pos, dtype=dtype, device=device)
+        self._origin_quat = torch.tensor(origin_quat, dtype=dtype, device=device)
+        self._axes = torch.tensor(axes, dtype=dtype, device=device)
+        self._com_pos = torch.tensor([com_pos[name] for name in self.body_names], dtype=dtype, device=device)
+        # the bodies of one depth only depend on the bodies of the depths before, so they are computed together
+        depths = torch.tensor(depths, device=device)
+        self._levels = [torch.where(depths == depth)[0] for depth in range(1, int(depths.max()) + 1)]
+
+    def _per_body(self, joint_values: torch.Tensor) -> torch.Tensor:
+        """Reorders the values of the joints to one value per body, zero for the root and the fixed joints."""
+        padded = torch.cat([joint_values, joint_values.new_zeros(joint_values.shape[0], 1)], dim=-1)
+        return padded[:, self._joint_columns]
+
+    def forward_kinematics(
+        self, root_pos_w: torch.Tensor, root_quat_w: torch.Tensor, joint_pos: torch.Tensor
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Computes the world poses of the body link frames.
+
+        Args:
+            root_pos_w: The root positions. Shape is (T, 3).
+            root_quat_w: The root orientations in (w, x, y, z). Shape is (T, 4).
+            joint_pos: The joint positions, ordered as :attr:`joint_names`. Shape is (T, J).
+
+        Returns:
+            The body positions, shape (T, B, 3), and orientations in (w, x, y, z), shape (T, B, 4), ordered as
+            :attr:`body_names`.
+        """
+        num_frames = root_pos_w.shape[0]
+        q = self._per_body(joint_pos)
+        half_angle = (0.5 * q * self._revolute).unsqueeze(-1)
+        joint_quat = torch.cat([torch.cos(half_angle), torch.sin(half_angle) * self._axes], dim=-1)
+        local_quat = quat_mul_broadcast(self._origin_quat, joint_quat)
+        local_pos = self._origin_pos + quat_apply_broadcast(
+            self._origin_quat[None], self._axes * (q * self._prismatic).unsqueeze(-1)
+        )
+
+        body_pos_w = root_pos_w.new_empty(num_frames, self.num_bodies, 3)
+        body_quat_w = root_quat_w.new_empty(num_frames, self.num_bodies, 4)
+        body_pos_w[:, 0] = root_pos_w
+        body_quat_w[:, 0] = root_quat_w
+        for bodies in self._levels:
+            parents = self._parents[bodies]
+            parent_quat_w = body_quat_w[:, parents]
+            body_quat_w[:, bodies] = quat_mul_broadcast(parent_quat_w, local_quat[:, bodies])
+            body_pos_w[:, bodies] = body_pos_w[:, parents] + quat_apply_broadcast(parent_quat_w, local_pos[:, bodies])
+        return body_pos_w, body_quat_w
+
+    def body_velocities(
+        self,
+        body_pos_w: torch.Tensor,
+        body_quat_w: torch.Tensor,
+        root_lin_vel_w: torch.Tensor,
+        root_ang_vel_w: torch.Tensor,
+        joint_vel: torch.Tensor,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Propagates the root and joint velocities through the tree.
+
+        Args:
+            body_pos_w: The body positions of :meth:`forward_kinematics`. Shape is (T, B, 3).
+            body_quat_w: The body orientations of :meth:`forward_kinematics`. Shape is (T, B, 4).
+            root_lin_vel_w: The linear velocities of the root center of mass, as in the root state of Isaac Lab.
+                Shape is (T, 3).
+            root_ang_vel_w: The angular velocities of the root. Shape is (T, 3).
+            joint_vel: The joint velocities, ordered as :attr:`joint_names`. Shape is (T, J).
+
+        Returns:
+            The linear velocities of the body centers of mass and the angular velocities of the bodies, both of shape
+            (T, B, 3).
+        """
+        qd = self._per_body(joint_vel).unsqueeze(-1)
+        axes_w = quat_apply_broadcast(body_quat_w, self._axes[None])
+        com_offset_w = quat_apply_broadcast(body_quat_w, self._com_pos[None])
+        joint_ang_vel_w = axes_w * qd * self._revolute.unsqueeze(-1)
+        joint_lin_vel_w = axes_w * qd * self._prismatic.unsqueeze(-1)
+
+        body_ang_vel_w = torch.empty_like(body_pos_w)
+        link_lin_vel_w = torch.empty_like(body_pos_w)
+        body_ang_vel_w[:, 0] = root_ang_vel_w
+        link_lin_vel_w[:, 0] = root_lin_vel_w - torch.linalg.cross(root_ang_vel_w, com_offset_w[:, 0], dim=-1)
+        for bodies in self._levels:
+            parents = self._parents[bodies]
+            parent_ang_vel_w = body_ang_vel_w[:, parents]
+            body_ang_vel_w[:, bodies] = parent_ang_vel_w + joint_ang_vel_w[:, bodies]
+            lever = body_pos_w[:, bodies] - body_pos_w[:, parents]
+            link_lin_vel_w[:, bodies] = (
+                link_lin_vel_w[:, parents]
+                + torch.linalg.cross(parent_ang_vel_w, lever, dim=-1)
+                + joint_lin_vel_w[:, bodies]
+            )
+        body_lin_vel_w = link_lin_vel_w + torch.linalg.cross(body_ang_vel_w, com_offset_w, dim=-1)
+        return body_lin_vel_w, body_ang_vel_w
+
+    def compute(
+        self,
+        root_pos_w: torch.Tensor,
+        root_quat_w: torch.Tensor,
+        root_lin_vel_w: torch.Tensor,
+        root_ang_vel_w: torch.Tensor,
+        joint_pos: torch.Tensor,
+        joint_vel: torch.Tensor,
+    ) -> dict[str, torch.Tensor]:
+        """Computes the body states of a motion, with the keys of the motion files.
+
+        See :meth:`forward_kinematics` and :meth:`body_velocities` for the arguments.
+
+        Returns:
+            The ``body_pos_w``, ``body_quat_w``, ``body_lin_vel_w`` and ``body_ang_vel_w`` of all bodies.
+        """
+        body_pos_w, body_quat_w = self.forward_kinematics(root_pos_w, root_quat_w, joint_pos)
+        body_lin_vel_w, body_ang_vel_w = self.body_velocities(
+            body_pos_w, body_quat_w, root_lin_vel_w, root_ang_vel_w, joint_vel
+        )
+        return {
+            "body_pos_w": body_pos_w,
+            "body_quat_w": body_quat_w,
+            "body_lin_vel_w": body_lin_vel_w,
+            "body_ang_vel_w": body_ang_vel_w,
+        }
@@ -0,0 +1,215 @@
+"""Compressed archives of motion files, to store and transfer large motion datasets.
+
+Motion files store every field uncompressed in float32, which is what the motion command loads fastest but makes
+datasets expensive to keep and to sync between machines. An archive stores the same motion in a zip file of ``.npy``
+members, one per field, encoded for compression:
+
+* positions (``joint_pos``, ``body_pos_w``) are quantized to a fixed resolution and delta-encoded over time, in the
+  narrowest integer type that holds the deltas;
+* quaternions (``body_quat_w``) are flipped to the hemisphere of the previous frame, so that consecutive frames are
+  close, then quantized and delta-encoded as the positions;
+* velocities are stored in float16;
+
+and every member is compressed with the codec of its field, see :data:`FIELD_CODECS`. The other entries of the motion
+file (fps, names, padding) are stored as they are.
+
+Archives are decoded back to motion files (see :func:`decode_archive`) before training, which then reads the decoded
+files or their cache as usual. :func:`round_trip_error` reports the largest error of every field after a round trip.
+"""
+
+from __future__ import annotations
+
+import json
+import numpy as np
+import os
+import zipfile
+
+from whole_body_tracking.utils.motion_conversion import save_motion
+
+ARCHIVE_VERSION = 1
+
+ARCHIVE_SUFFIX = ".motion.zip"
+"""File name suffix of the archives."""
+
+HEADER_NAME = "archive.json"
+"""Zip member with the format version and the encoding of every field."""
+
+FIELD_CODECS = {
+    "joint_pos": ("delta", zipfile.ZIP_LZMA),
+    "joint_vel": ("float16", zipfile.ZIP_DEFLATED),
+    "body_pos_w": ("delta", zipfile.ZIP_LZMA),
+    "body_quat_w": ("quat_delta", zipfile.ZIP_LZMA),
+    "body_lin_vel_w": ("float16", zipfile.ZIP_DEFLATED),
+    "body_ang_vel_w": ("float16", zipfile.ZIP_DEFLATED),
+}
+"""Encoding and zip compression of every field with one row per frame."""
+
+DEFAULT_RESOLUTIONS = {"joint_pos": 1.0e-5, "body_pos_w": 1.0e-5, "body_quat_w": 2.0**-15}
+"""Quantization step of the delta-encoded fields, in radians, meters and quaternion units."""
+
+
+def canonicalize_quaternions(quat: np.ndarray) -> np.ndarray:
+    """Flips the sign of quaternions so that every frame is in the hemisphere of the previous one.
+
+    ``q`` and ``-q`` are the same rotation, so the flip does not change the motion, but it removes the jumps between
+    consecutive frames that delta encoding would otherwise have to store. The first frame has a non-negative w.
+
+    Args:
+        quat: Quaternions in (w, x, y, z). Shape is (T, ..., 4).
+
+    Returns:
+        The canonicalized quaternions.
+    """
+    signs = np.ones(quat.shape[:-1] + (1,), dtype=quat.dtype)
+    signs[0] = np.where(quat[:1, ..., :1] < 0.0, -1.0, 1.0)
+    signs[1:] = np.where(np.sum(quat[1:] * quat[:-1], axis=-1, keepdims=True) < 0.0, -1.0, 1.0)
+    # a frame is flipped if its neighbors disagree an odd number of times since the first frame
+    return quat * np.cumprod(signs, axis=0)
+
+
+def _narrowest_int(values: np.ndarray) -> np.ndarray:
+    """Returns integer values in the narrowest signed integer type that holds them."""
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if values.size == 0 or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(dtype)
+    return values.astype(np.int64)
+
+
+def encode_field(value: np.ndarray, codec: str, resolution: float | None = None) -> dict[str, np.ndarray]:
+    """Encodes a field with one row per frame.
+
+    Args:
+        value: The field. Shape is (T, ...).
+        codec: ``"delta"``, ``"quat_delta"`` or ``"float16"``.
+        resolution: Quantization step of the delta codecs.
+
+    Returns:
+        The arrays stored for the field, by member name suffix.
+    """
+    if codec == "float16":
+        return {"": value.astype(np.float16)}
+    if codec == "quat_delta":
+        value = canonicalize_quaternions(value)
+    quantized = np.round(value.astype(np.float64) / resolution).astype(np.int64)
+    return {"": _narrowest_int(np.diff(quantized, axis=0)), "_first": quantized[:1]}
+
+
+def decode_field(arrays: dict[str, np.ndarray], codec: str, resolution: float | None = None) -> np.ndarray:
+    """Decodes a field encoded by :func:`encode_field` to float32.
+
+    Quaternions are normalized after the quantization.
+    """
+    if codec == "float16":
+        return arrays[""].astype(np.float32)
+    quantized = np.concatenate([arrays["_first"], arrays[""].astype(np.int64)], axis=0)
+    value = (np.cumsum(quantized, axis=0) * resolution).astype(np.float32)
+    if codec == "quat_delta":
+        value /= np.linalg.norm(value, axis=-1, keepdims=True)
+    return value
+
+
+def _write_member(archive: zipfile.ZipFile, name: str, value: np.ndarray, compression: int):
+    info = zipfile.ZipInfo(f"{name}.npy")
+    info.compress_type = compression
+    with archive.open(info, mode="w", force_zip64=True) as f:
+        np.lib.format.write_array(f, np.asanyarray(value), allow_pickle=False)
+
+
+def write_archive(path: str, motion: dict[str, np.ndarray], resolutions: dict[str, float] | None = None):
+    """Writes a motion as an archive.
+
+    The archive is written next to ``path`` and renamed once complete.
+
+    Args:
+        path: Path of the archive.
+        motion: The fields of the motion file.
+        resolutions: Quantization step of the delta-encoded fields. Defaults to :data:`DEFAULT_RESOLUTIONS`.
+    """
+    resolutions = {**DEFAULT_RESOLUTIONS, **(resolutions or {})}
+    header = {"version": ARCHIVE_VERSION, "fields": {}}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with zipfile.ZipFile(tmp_path, mode="w", allowZip64=True) as archive:
+        for key, value in motion.items():
+            if key not in FIELD_CODECS:
+                _write_member(archive, key, value, zipfile.ZIP_DEFLATED)
+                continue
+            codec, compression = FIELD_CODECS[key]
+            resolution = resolutions.get(key) if codec != "float16" else None
+            for suffix, encoded in encode_field(np.asarray(value), codec, resolution).items():
+                _write_member(archive, key + suffix, encoded, compression)
+            header["fields"][key] = {"codec": codec, "resolution": resolution}
+        archive.writestr(HEADER_NAME, json.dumps(header))
+    os.replace(tmp_path, path)
+
+
+def read_archive(path: str) -> dict[str, np.ndarray]:
+    """Reads and decodes an archive.
+
+    Args:
+        path: Path of the archive.
+
+    Returns:
+        The fields of the motion file, the frame fields in float32.
+
+    Raises:
+        ValueError: If the archive has an unsupported version.
+    """
+    with zipfile.ZipFile(path) as archive:
+        header = json.loads(archive.read(HEADER_NAME))
+        if header["version"] != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported motion archive version {header['version']}: {path}")
+        members = {}
+        for name in archive.namelist():
+            if name.endswith(".npy"):
+                with archive.open(name) as f:
+                    members[name[: -len(".npy")]] = np.lib.format.read_array(f, allow_pickle=False)
+    motion = {}
+    for key, value in members.items():
+        field = key.removesuffix("_first")
+        if field not in header["fields"]:
+            motion[key] = value
+        elif key == field:
+            encoding = header["fields"][field]
+            arrays = {"": value, "_first": members.get(f"{field}_first")}
+            motion[field] = decode_field(arrays, encoding["codec"], encoding["resolution"])
+    return motion
+
+
+def encode_motion_file(motion_file: str, path: str, resolutions: dict[str, float] | None = None):
+    """Writes the archive of a motion file."""
+    with np.load(motion_file) as data:
+        write_archive(path, {key: data[key] for key in data.files}, resolutions)
+
+
+def decode_archive(path: str, motion_file: str):
+    """Writes the motion file of an archive, which the motion command loads."""
+    save_motion(motion_file, read_archive(path))
+
+
+def round_trip_error(motion: dict[str, np.ndarray], decoded: dict[str, np.ndarray]) -> dict[str, float]:
+    """Returns the largest error of every frame field after a round trip through an archive.
+
+    Args:
+        motion: The fields of the motion file.
+        decoded: The fields read back from its archive.
+
+    Returns:
+        The largest absolute error of every field, and the largest rotation angle between the original and decoded
+        quaternions (in radians) for ``body_quat_w``, since the archive may flip their signs.
+    """
+    errors = {}
+    for field in FIELD_CODECS:
+        if field not in motion:
+            continue
+        original, value = np.asarray(motion[field], dtype=np.float64), decoded[field].astype(np.float64)
+        if field == "body_quat_w":
+            original /= np.linalg.norm(original, axis=-1, keepdims=True)
+            value *= np.where(np.sum(original * value, axis=-1, keepdims=True) < 0.0, -1.0, 1.0)
+            # the chord between unit quaternions gives the angle without the cancellation of arccos near 1
+            chord = np.linalg.norm(original - value, axis=-1)
+            errors[field] = float(np.max(4.0 * np.arcsin(np.clip(chord / 2.0, 0.0, 1.0)), initial=0.0))
+        else:
+            errors[field] = float(np.max(np.abs(original - value), initial=0.0))
+    return errors
@@ -0,0 +1,212 @@
+"""Persistent cache of preprocessed reference motion tensors.
+
+Loading a motion ``.npz`` decompresses every array, converts it to float and slices the tracked bodies. The cache
+stores the result as a ready-to-load torch shard, keyed by the content hash of the motion file, the tracked body
+indexes and the dtype, so that every later launch with the same motion and robot setup skips that work.
+
+Shards are written atomically, so several processes may share the cache. The cache is bounded in size: every hit
+refreshes the modification time of its shard, and the least recently used shards are removed when a new shard
+pushes the cache over its size limit. The content hash of a motion file is memoized by path, size and modification
+time, so unchanged files are not re-hashed on every launch.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import numpy as np
+import os
+import tempfile
+import torch
+from collections.abc import Sequence
+
+CACHE_VERSION = 2
+
+DEFAULT_MAX_BYTES = 20 * 2**30
+"""Default size limit of the cache (20 GiB)."""
+
+JOINT_FIELDS = ("joint_pos", "joint_vel")
+BODY_FIELDS = ("body_pos_w", "body_quat_w", "body_lin_vel_w", "body_ang_vel_w")
+PADDING_FIELDS = ("pad_start", "pad_end")
+
+SHARD_SUFFIX = ".pt"
+
+
+def default_cache_dir() -> str:
+    """Returns the cache directory set by ``WBT_MOTION_CACHE_DIR``, or ``~/.cache/whole_body_tracking/motions``."""
+    default = os.path.join(os.path.expanduser("~"), ".cache", "whole_body_tracking", "motions")
+    return os.environ.get("WBT_MOTION_CACHE_DIR", default)
+
+
+def _atomic_write(path: str, write_fn):
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write_fn(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def file_digest(path: str, cache_dir: str | None = None) -> str:
+    """Returns the SHA-256 digest of the content of a file.
+
+    Args:
+        path: Path to the file.
+        cache_dir: Cache directory in which the digest is memoized. Defaults to no memoization.
+
+    Returns:
+        The hex digest.
+    """
+    stat = os.stat(path)
+    stamp = [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+    memo_path = None
+    if cache_dir is not None:
+        memo_name = hashlib.sha256(stamp[0].encode()).hexdigest() + ".json"
+        memo_path = os.path.join(cache_dir, "digests", memo_name)
+        try:
+            with open(memo_path) as f:
+                memo = json.load(f)
+            if memo["stamp"] == stamp:
+                return memo["digest"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(2**20), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    if memo_path is not None:
+        os.makedirs(os.path.dirname(memo_path), exist_ok=True)
+        content = json.dumps({"stamp": stamp, "digest": digest}).encode()
+        _atomic_write(memo_path, lambda f: f.write(content))
+    return digest
+
+
+def cache_key(digest: str, body_indexes: Sequence[int] | None, dtype: torch.dtype) -> str:
+    """Returns the cache key of a motion file digest, tracked body indexes and dtype."""
+    body_indexes = None if body_indexes is None else [int(i) for i in body_indexes]
+    spec = {"version": CACHE_VERSION, "digest": digest, "body_indexes": body_indexes, "dtype": str(dtype)}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def _convert(motion_file: str, body_indexes: Sequence[int] | None, dtype: torch.dtype) -> dict:
+    data = np.load(motion_file)
+    shard = {"fps": data["fps"].tolist()}
+    for name in JOINT_FIELDS:
+        shard[name] = torch.tensor(data[name], dtype=dtype)
+    index = slice(None) if body_indexes is None else torch.as_tensor(body_indexes, dtype=torch.long)
+    for name in BODY_FIELDS:
+        shard[name] = torch.tensor(data[name], dtype=dtype)[:, index].contiguous()
+    if "body_names" in data:
+        shard["body_names"] = data["body_names"].tolist()
+    if "joint_names" in data:
+        shard["joint_names"] = data["joint_names"].tolist()
+    for name in PADDING_FIELDS:
+        if name in data:
+            shard[name] = int(np.ravel(data[name])[0])
+    return shard
+
+
+def load_cached_motion(
+    motion_file: str,
+    body_indexes: Sequence[int] | None = None,
+    dtype: torch.dtype = torch.float32,
+    cache_dir: str | None = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> dict:
+    """Loads a motion through the cache, converting and storing it on a miss.
+
+    Args:
+        motion_file: Path to the motion ``.npz`` file.
+        body_indexes: Indexes of the bodies to keep. Defaults to all bodies.
+        dtype: The dtype of the motion tensors.
+        cache_dir: The cache directory. Defaults to :func:`default_cache_dir`.
+        max_bytes: Size limit of the cache, enforced after a new shard is written.
+
+    Returns:
+        A dictionary with the same keys and shapes as the ``.npz`` file, holding cpu tensors of the requested bodies.
+        The ``fps`` entry is a numpy array.
+    """
+    cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+    os.makedirs(cache_dir, exist_ok=True)
+    key = cache_key(file_digest(motion_file, cache_dir), body_indexes, dtype)
+    path = os.path.join(cache_dir, key + SHARD_SUFFIX)
+
+    shard = None
+    if os.path.isfile(path):
+        try:
+            shard = torch.load(path, map_location="cpu")
+            # refresh the shard for the least recently used eviction
+            os.utime(path)
+        except (OSError, RuntimeError, EOFError):
+            shard = None
+    if shard is None:
+        shard = _convert(motion_file, body_indexes, dtype)
+        _atomic_write(path, lambda f: torch.save(shard, f))
+        prune(cache_dir, max_bytes)
+
+    shard["fps"] = np.asarray(shard["fps"])
+    return shard
+
+
+def list_shards(cache_dir: str | None = None) -> list[dict]:
+    """Lists the shards of a cache, least recently used first.
+
+    Returns:
+        One dictionary per shard with its ``path``, its ``size`` in bytes and its last use time ``last_used`` in
+        seconds since the epoch.
+    """
+    cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+    if not os.path.isdir(cache_dir):
+        return []
+    shards = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(SHARD_SUFFIX):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        shards.append({"path": path, "size": stat.st_size, "last_used": stat.st_mtime})
+    return sorted(shards, key=lambda shard: shard["last_used"])
+
+
+def prune(cache_dir: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES) -> list[str]:
+    """Removes the least recently used shards until the cache fits in ``max_bytes``.
+
+    Returns:
+        The paths of the removed shards.
+    """
+    shards = list_shards(cache_dir)
+    total = sum(shard["size"] for shard in shards)
+    removed = []
+    for shard in shards:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(shard["path"])
+        except FileNotFoundError:
+            pass
+        total -= shard["size"]
+        removed.append(shard["path"])
+    return removed
+
+
+def clear(cache_dir: str | None = None) -> int:
+    """Removes all shards and memoized digests of a cache.
+
+    Returns:
+        The number of removed shards.
+    """
+    cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+    removed = prune(cache_dir, max_bytes=-1)
+    digests_dir = os.path.join(cache_dir, "digests")
+    if os.path.isdir(digests_dir):
+        for name in os.listdir(digests_dir):
+            os.remove(os.path.join(digests_dir, name))
+    return len(removed)
@@ -0,0 +1,279 @@
+"""SQLite catalog of motion files with precomputed per-clip statistics.
+
+Selecting clips by duration, speed or robot schema otherwise means loading every ``.npz`` file. The catalog stores,
+for every motion file, its content hash and statistics computed once when the file is scanned: number of frames, fps,
+duration, padding, horizontal travel and peak speed of the root body, peak joint velocity, and the body and joint
+names (as a schema shared by the clips with the same names). Queries then filter and sort clips in SQL.
+
+The frames and the duration cover the frames stored in the file. The files written before the padding was recorded
+store their padding frames as frames, with no ``pad_start`` and ``pad_end``, so their padding is included. The played
+length of a clip, the stored frames and the padding frames the motion loader adds, is ``played_frames``.
+
+:meth:`MotionCatalog.update` hashes and scans files on a process pool and is incremental like the preprocessing
+manifest (see :mod:`whole_body_tracking.utils.motion_manifest`): a file whose size and modification time did not change
+is skipped, and a file whose stamp changed but not its content hash only has its stamp updated. A file that cannot be
+read is reported and skipped, the other files are still cataloged.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import numpy as np
+import os
+import sqlite3
+import warnings
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+
+from whole_body_tracking.utils.motion_cache import file_digest
+from whole_body_tracking.utils.motion_manifest import source_stamp
+
+CATALOG_VERSION = 2
+
+CATALOG_NAME = "catalog.sqlite"
+"""Default file name of the catalog in the motion directory."""
+
+STAT_COLUMNS = {
+    "frames": "INTEGER",
+    "fps": "REAL",
+    "duration": "REAL",
+    "pad_start": "INTEGER",
+    "pad_end": "INTEGER",
+    "played_frames": "INTEGER",
+    "root_travel": "REAL",
+    "peak_root_speed": "REAL",
+    "peak_joint_vel": "REAL",
+    "num_bodies": "INTEGER",
+    "num_joints": "INTEGER",
+    "schema": "TEXT",
+}
+"""The statistics of every clip and their SQL types."""
+
+CLIP_COLUMNS = ("path", "name", "size", "mtime_ns", "digest", *STAT_COLUMNS)
+
+
+def clip_stats(motion_file: str) -> tuple[dict, dict]:
+    """Computes the statistics of a motion file.
+
+    The root is the first body of the motion file.
+
+    Args:
+        motion_file: Path to the motion ``.npz`` file.
+
+    Returns:
+        The statistics, keyed by :data:`STAT_COLUMNS`, and the schema, with its ``digest``, ``body_names`` and
+        ``joint_names``.
+    """
+    with np.load(motion_file) as data:
+        fps = float(np.ravel(data["fps"])[0])
+        joint_vel = data["joint_vel"]
+        body_pos_w = data["body_pos_w"]
+        root_lin_vel_w = data["body_lin_vel_w"][:, 0]
+        body_names = data["body_names"].tolist() if "body_names" in data else []
+        joint_names = data["joint_names"].tolist() if "joint_names" in data else []
+        padding = [int(np.ravel(data[key])[0]) if key in data else 0 for key in ("pad_start", "pad_end")]
+    schema = {"body_names": body_names, "joint_names": joint_names}
+    schema["digest"] = hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()[:16]
+    frames = joint_vel.shape[0]
+    stats = {
+        "frames": frames,
+        "fps": fps,
+        "duration": frames / fps,
+        "pad_start": padding[0],
+        "pad_end": padding[1],
+        "played_frames": frames + padding[0] + padding[1],
+        "root_travel": float(np.linalg.norm(np.diff(body_pos_w[:, 0, :2], axis=0), axis=-1).sum()),
+        "peak_root_speed": float(np.linalg.norm(root_lin_vel_w, axis=-1).max(initial=0.0)),
+        "peak_joint_vel": float(np.abs(joint_vel).max(initial=0.0)),
+        "num_bodies": body_pos_w.shape[1],
+        "num_joints": joint_vel.shape[1],
+        "schema": schema["digest"],
+    }
+    return stats, schema
+
+
+def _scan(motion_file: str, known_digest: str | None) -> dict:
+    """Hashes a motion file and computes its statistics unless its content is known, in a worker process.
+
+    Returns:
+        The ``path``, ``stamp`` and ``digest`` of the file, and its ``stats`` and ``schema`` if its digest is not
+        ``known_digest``, or the ``path`` and the ``error`` if the file cannot be read.
+    """
+    try:
+        scan = {"path": motion_file, "stamp": source_stamp(motion_file), "digest": file_digest(motion_file)}
+        if scan["digest"] != known_digest:
+            scan["stats"], scan["schema"] = clip_stats(motion_file)
+        return scan
+    except Exception as error:
+        return {"path": motion_file, "error": f"{type(error).__name__}: {error}"}
+
+
+class MotionCatalog:
+    """A catalog of motion files in a SQLite database.
+
+    Args:
+        db_path: Path of the database, created if it does not exist.
+
+    Raises:
+        ValueError: If the database is a catalog of another version.
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        stats = ", ".join(f"{column} {sql_type}" for column, sql_type in STAT_COLUMNS.items())
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS clips (path TEXT PRIMARY KEY, name TEXT, size INTEGER, mtime_ns INTEGER,"
+                f" digest TEXT, {stats})"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS schemas (digest TEXT PRIMARY KEY, body_names TEXT, joint_names TEXT)"
+            )
+            for column in ("name", "duration", "peak_joint_vel", "peak_root_speed"):
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS clips_{column} ON clips ({column})")
+            self.connection.execute("INSERT OR IGNORE INTO meta VALUES ('version', ?)", (str(CATALOG_VERSION),))
+        version = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        if int(version) != CATALOG_VERSION:
+            raise ValueError(f"Unsupported motion catalog version {version}, delete it to rebuild it: {db_path}")
+
+    def close(self):
+        """Closes the database."""
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM clips").fetchone()[0]
+
+    def update(self, motion_files: Sequence[str], num_workers: int | None = None, prune: bool = False) -> dict:
+        """Adds new and changed motion files to the catalog.
+
+        Args:
+            motion_files: Paths to the motion ``.npz`` files.
+            num_workers: Number of worker processes that scan the files. Defaults to the number of CPU cores.
+            prune: Whether to remove the clips whose file is not in ``motion_files``.
+
+        Returns:
+            The number of ``scanned``, ``touched`` (stamp updated, same content), ``unchanged``, ``failed`` (not
+            readable, with a warning) and ``removed`` clips.
+        """
+        paths = [os.path.abspath(motion_file) for motion_file in motion_files]
+        known = {row["path"]: row for row in self.connection.execute("SELECT path, size, mtime_ns, digest FROM clips")}
+        counts = {"scanned": 0, "touched": 0, "unchanged": 0, "failed": 0, "removed": 0}
+        pending = []
+        for path in paths:
+            row = known.get(path)
+            if row is not None and [row["size"], row["mtime_ns"]] == source_stamp(path):
+                counts["unchanged"] += 1
+            else:
+                pending.append(path)
+
+        if pending:
+            num_workers = max(1, min(num_workers or os.cpu_count() or 1, len(pending)))
+            known_digests = [known[path]["digest"] if path in known else None for path in pending]
+            with ProcessPoolExecutor(num_workers) as pool, self.connection:
+                for scan in pool.map(_scan, pending, known_digests, chunksize=16):
+                    path = scan["path"]
+                    if "error" in scan:
+                        warnings.warn(f"Skipping the motion file {path}: {scan['error']}")
+                        counts["failed"] += 1
+                        continue
+                    stamp = scan["stamp"]
+                    if "stats" not in scan:
+                        self.connection.execute(
+                            "UPDATE clips SET size = ?, mtime_ns = ? WHERE path = ?", (*stamp, path)
+                        )
+                        counts["touched"] += 1
+                        continue
+                    schema = scan["schema"]
+                    self.connection.execute(
+                        "INSERT OR IGNORE INTO schemas VALUES (?, ?, ?)",
+                        (schema["digest"], json.dumps(schema["body_names"]), json.dumps(schema["joint_names"])),
+                    )
+                    name = os.path.splitext(os.path.basename(path))[0]
+                    clip = {
+                        "path": path,
+                        "name": name,
+                        "size": stamp[0],
+                        "mtime_ns": stamp[1],
+                        "digest": scan["digest"],
+                    }
+                    clip.update(scan["stats"])
+                    self.connection.execute(
+                        f"INSERT OR REPLACE INTO clips ({', '.join(CLIP_COLUMNS)})"
+                        f" VALUES ({', '.join('?' * len(CLIP_COLUMNS))})",
+                        [clip[column] for column in CLIP_COLUMNS],
+                    )
+                    counts["scanned"] += 1
+
+        if prune:
+            removed = set(known) - set(paths)
+            with self.connection:
+                self.connection.executemany("DELETE FROM clips WHERE path = ?", [(path,) for path in removed])
+            counts["removed"] = len(removed)
+        return counts
+
+    def query(
+        self,
+        min_duration: float | None = None,
+        max_duration: float | None = None,
+        max_joint_vel: float | None = None,
+        max_root_speed: float | None = None,
+        fps: float | None = None,
+        schema: str | None = None,
+        name_like: str | None = None,
+        order_by: str = "name",
+        descending: bool = False,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """Returns the clips that match filters.
+
+        Args:
+            min_duration: Shortest duration of the stored frames in seconds.
+            max_duration: Longest duration of the stored frames in seconds.
+            max_joint_vel: Largest peak joint velocity.
+            max_root_speed: Largest peak speed of the root body.
+            fps: The fps of the clips.
+            schema: Digest of the body and joint names of the clips.
+            name_like: SQL ``LIKE`` pattern of the clip names, e.g. ``"walk%"``.
+            order_by: The column to sort by, one of the statistics, ``name`` or ``path``.
+            descending: Whether to sort in descending order.
+            limit: Largest number of clips to return. Defaults to all.
+
+        Returns:
+            The matching clips, with their path, name, content digest and statistics.
+
+        Raises:
+            ValueError: If ``order_by`` is not a column.
+        """
+        if order_by not in CLIP_COLUMNS:
+            raise ValueError(f"Unknown column '{order_by}', expected one of {list(CLIP_COLUMNS)}.")
+        filters = {
+            "duration >= ?": min_duration,
+            "duration <= ?": max_duration,
+            "peak_joint_vel <= ?": max_joint_vel,
+            "peak_root_speed <= ?": max_root_speed,
+            "fps = ?": fps,
+            "schema = ?": schema,
+            "name LIKE ?": name_like,
+        }
+        filters = {condition: value for condition, value in filters.items() if value is not None}
+        sql = f"SELECT {', '.join(CLIP_COLUMNS)} FROM clips"
+        if filters:
+            sql += " WHERE " + " AND ".join(filters)
+        sql += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}, path"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self.connection.execute(sql, list(filters.values()))]
+
+    def schema(self, digest: str) -> dict:
+        """Returns the body and joint names of a schema digest."""
+        row = self.connection.execute("SELECT * FROM schemas WHERE digest = ?", (digest,)).fetchone()
+        return {
+            "digest": digest,
+            "body_names": json.loads(row["body_names"]),
+            "joint_names": json.loads(row["joint_names"]),
+        }
@@ -0,0 +1,343 @@
+"""Simulator-free conversion of retargeted motions to the motion files of the tracking task.
+
+A retargeted motion gives the root pose and the joint positions of the robot at the fps of the retargeting. The
+conversion resamples it to the control fps, differentiates it for the root and joint velocities, and computes the
+body states with :class:`~whole_body_tracking.utils.kinematics.KinematicTree` instead of replaying the motion in Isaac
+Sim. The result has the schema of the files written by ``scripts/csv_to_npz.py``, which :class:`MotionLoader` reads.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import os
+import torch
+import zipfile
+from collections.abc import Sequence
+
+from whole_body_tracking.utils.kinematics import KinematicTree
+from whole_body_tracking.utils.quaternion import quat_mul_broadcast, quat_slerp
+
+CSV_JOINT_NAMES = [
+    "left_hip_pitch_joint",
+    "left_hip_roll_joint",
+    "left_hip_yaw_joint",
+    "left_knee_joint",
+    "left_ankle_pitch_joint",
+    "left_ankle_roll_joint",
+    "right_hip_pitch_joint",
+    "right_hip_roll_joint",
+    "right_hip_yaw_joint",
+    "right_knee_joint",
+    "right_ankle_pitch_joint",
+    "right_ankle_roll_joint",
+    "waist_yaw_joint",
+    "waist_roll_joint",
+    "waist_pitch_joint",
+    "left_shoulder_pitch_joint",
+    "left_shoulder_roll_joint",
+    "left_shoulder_yaw_joint",
+    "left_elbow_joint",
+    "left_wrist_roll_joint",
+    "left_wrist_pitch_joint",
+    "left_wrist_yaw_joint",
+    "right_shoulder_pitch_joint",
+    "right_shoulder_roll_joint",
+    "right_shoulder_yaw_joint",
+    "right_elbow_joint",
+    "right_wrist_roll_joint",
+    "right_wrist_pitch_joint",
+    "right_wrist_yaw_joint",
+]
+"""Order of the G1 joint positions in the retargeted CSV files, after the root position and orientation."""
+
+ISAAC_LAB_BODY_NAMES = [
+    "pelvis",
+    "imu_in_pelvis",
+    "left_hip_pitch_link",
+    "pelvis_contour_link",
+    "right_hip_pitch_link",
+    "waist_yaw_link",
+    "left_hip_roll_link",
+    "right_hip_roll_link",
+    "waist_roll_link",
+    "left_hip_yaw_link",
+    "right_hip_yaw_link",
+    "torso_link",
+    "left_knee_link",
+    "right_knee_link",
+    "head_link",
+    "imu_in_torso",
+    "left_shoulder_pitch_link",
+    "logo_link",
+    "mid360_link",
+    "right_shoulder_pitch_link",
+    "left_ankle_pitch_link",
+    "right_ankle_pitch_link",
+    "left_shoulder_roll_link",
+    "right_shoulder_roll_link",
+    "left_ankle_roll_link",
+    "right_ankle_roll_link",
+    "left_shoulder_yaw_link",
+    "right_shoulder_yaw_link",
+    "LL_FOOT",
+    "LR_FOOT",
+    "left_elbow_link",
+    "right_elbow_link",
+    "left_wrist_roll_link",
+    "right_wrist_roll_link",
+    "left_wrist_pitch_link",
+    "right_wrist_pitch_link",
+    "left_wrist_yaw_link",
+    "right_wrist_yaw_link",
+    "left_rubber_hand",
+    "right_racket",
+]
+"""Order of the bodies of the G1 articulation trained on (``robots/g1.py``, with the racket on the right hand)."""
+
+ISAAC_LAB_JOINT_NAMES = [
+    "left_hip_pitch_joint",
+    "left_hip_roll_joint",
+    "left_hip_yaw_joint",
+    "left_knee_joint",
+    "left_ankle_pitch_joint",
+    "left_ankle_roll_joint",
+    "right_hip_pitch_joint",
+    "right_hip_roll_joint",
+    "right_hip_yaw_joint",
+    "right_knee_joint",
+    "right_ankle_pitch_joint",
+    "right_ankle_roll_joint",
+    "waist_yaw_joint",
+    "waist_roll_joint",
+    "waist_pitch_joint",
+    "left_shoulder_pitch_joint",
+    "left_shoulder_roll_joint",
+    "left_shoulder_yaw_joint",
+    "left_elbow_joint",
+    "left_wrist_roll_joint",
+    "left_wrist_pitch_joint",
+    "left_wrist_yaw_joint",
+    "right_shoulder_pitch_joint",
+    "right_shoulder_roll_joint",
+    "right_shoulder_yaw_joint",
+    "right_elbow_joint",
+    "right_wrist_roll_joint",
+    "right_wrist_pitch_joint",
+    "right_wrist_yaw_joint",
+]
+"""Joint names written to the motion files that predate ``joint_names``, see ``scripts/migrate_motion_npz.py``."""
+
+DEFAULT_PAD_FRAMES = 50
+"""Number of virtual copies of the first and last frame played before and after a motion."""
+
+
+def load_csv(path: str, frame_range: tuple[int, int] | None = None) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Loads a retargeted CSV motion, with one frame per row: root position, root orientation in (w, x, y, z) and joint
+    positions.
+
+    Args:
+        path: Path to the CSV file.
+        frame_range: First and last frame to load, both inclusive and starting from 1. Defaults to None (all frames).
+
+    Returns:
+        The root positions, shape (T, 3), the root orientations, shape (T, 4), and the joint positions, shape (T, J).
+    """
+    if frame_range is None:
+        motion = np.loadtxt(path, delimiter=",")
+    else:
+        motion = np.loadtxt(
+            path, delimiter=",", skiprows=frame_range[0] - 1, max_rows=frame_range[1] - frame_range[0] + 1
+        )
+    motion = torch.from_numpy(motion).to(torch.float32)
+    return motion[:, :3], motion[:, 3:7], motion[:, 7:]
+
+
+def resample(
+    root_pos: torch.Tensor, root_quat: torch.Tensor, joint_pos: torch.Tensor, input_fps: float, output_fps: float
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Resamples a motion to another fps, interpolating linearly and the orientations spherically.
+
+    Args:
+        root_pos: The root positions. Shape is (T, 3).
+        root_quat: The root orientations in (w, x, y, z). Shape is (T, 4).
+        joint_pos: The joint positions. Shape is (T, J).
+        input_fps: The fps of the motion.
+        output_fps: The fps of the resampled motion.
+
+    Returns:
+        The resampled root positions, root orientations and joint positions.
+    """
+    input_frames = root_pos.shape[0]
+    duration = (input_frames - 1) / input_fps
+    times = torch.arange(0, duration, 1.0 / output_fps, device=root_pos.device, dtype=torch.float32)
+    phase = times / duration
+    index_0 = (phase * (input_frames - 1)).floor().long()
+    index_1 = torch.clamp(index_0 + 1, max=input_frames - 1)
+    blend = (phase * (input_frames - 1) - index_0).unsqueeze(1)
+    return (
+        torch.lerp(root_pos[index_0], root_pos[index_1], blend),
+        quat_slerp(root_quat[index_0], root_quat[index_1], blend),
+        torch.lerp(joint_pos[index_0], joint_pos[index_1], blend),
+    )
+
+
+def _axis_angle_from_quat(quat: torch.Tensor, eps: float = 1.0e-6) -> torch.Tensor:
+    """Rotation vectors of quaternions in (w, x, y, z), as :func:`isaaclab.utils.math.axis_angle_from_quat`."""
+    quat = quat * (1.0 - 2.0 * (quat[..., 0:1] < 0.0))
+    half_angle = torch.atan2(torch.linalg.norm(quat[..., 1:], dim=-1), quat[..., 0])
+    angle = 2.0 * half_angle
+    sin_half_angle_over_angle = torch.where(angle.abs() > eps, torch.sin(half_angle) / angle, 0.5 - angle * angle / 48)
+    return quat[..., 1:] / sin_half_angle_over_angle.unsqueeze(-1)
+
+
+def finite_difference_velocities(
+    root_pos: torch.Tensor, root_quat: torch.Tensor, joint_pos: torch.Tensor, fps: float
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Differentiates a motion with central differences.
+
+    Args:
+        root_pos: The root positions. Shape is (T, 3).
+        root_quat: The root orientations in (w, x, y, z). Shape is (T, 4).
+        joint_pos: The joint positions. Shape is (T, J).
+        fps: The fps of the motion.
+
+    Returns:
+        The root linear velocities, root angular velocities and joint velocities.
+    """
+    dt = 1.0 / fps
+    root_lin_vel = torch.gradient(root_pos, spacing=dt, dim=0)[0]
+    joint_vel = torch.gradient(joint_pos, spacing=dt, dim=0)[0]
+    q_prev, q_next = root_quat[:-2], root_quat[2:]
+    q_rel = quat_mul_broadcast(q_next, q_prev * torch.tensor([1.0, -1.0, -1.0, -1.0], device=q_prev.device))
+    root_ang_vel = _axis_angle_from_quat(q_rel) / (2.0 * dt)
+    # the first and last frames repeat their neighbor
+    root_ang_vel = torch.cat([root_ang_vel[:1], root_ang_vel, root_ang_vel[-1:]], dim=0)
+    return root_lin_vel, root_ang_vel, joint_vel
+
+
+def padding_fields(pad_start: int, pad_end: int) -> dict[str, np.ndarray]:
+    """Returns the entries of a motion file that record its padding.
+
+    The padding is not stored as repeated frames: the motion command plays ``pad_start`` virtual copies of the first
+    frame before the stored frames and ``pad_end`` virtual copies of the last frame after them.
+
+    Args:
+        pad_start: Number of copies of the first frame.
+        pad_end: Number of copies of the last frame.
+
+    Returns:
+        The ``pad_start`` and ``pad_end`` entries.
+    """
+    return {"pad_start": np.array([pad_start]), "pad_end": np.array([pad_end])}
+
+
+def save_motion(path: str, motion: dict[str, np.ndarray]):
+    """Writes a motion file, as ``np.savez(path, **motion)``.
+
+    The fields are streamed into the file one at a time. The file is written next to ``path`` and renamed once
+    complete, so an interrupted write never leaves a complete-looking file.
+
+    Args:
+        path: Path of the npz file.
+        motion: The fields of the motion file.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with zipfile.ZipFile(tmp_path, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for key, value in motion.items():
+            with archive.open(f"{key}.npy", mode="w", force_zip64=True) as f:
+                np.lib.format.write_array(f, np.asanyarray(value), allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def npz_shape(archive: zipfile.ZipFile, key: str) -> tuple[int, ...]:
+    """Reads the shape of an array of an open ``.npz`` file from its header, without reading the array.
+
+    Args:
+        archive: The ``.npz`` file, opened as a zip file.
+        key: The name of the array.
+
+    Returns:
+        The shape of the array.
+    """
+    with archive.open(f"{key}.npy") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            return np.lib.format.read_array_header_1_0(f)[0]
+        return np.lib.format.read_array_header_2_0(f)[0]
+
+
+def check_robot_bodies(tree: KinematicTree, robot_body_names: Sequence[str] = ISAAC_LAB_BODY_NAMES):
+    """Checks that a kinematic tree has the bodies of the articulation that tracks its motions, in the same order.
+
+    Args:
+        tree: The kinematic tree of the robot description.
+        robot_body_names: The bodies of the articulation, in order. Defaults to the G1 trained on.
+
+    Raises:
+        ValueError: If the bodies differ.
+    """
+    if list(tree.body_names) != list(robot_body_names):
+        raise ValueError(
+            f"The bodies of the robot description differ from the articulation: {tree.body_names} instead of"
+            f" {list(robot_body_names)}. Use the description of the robot trained on."
+        )
+
+
+def convert_motion(
+    tree: KinematicTree,
+    root_pos: torch.Tensor,
+    root_quat: torch.Tensor,
+    joint_pos: torch.Tensor,
+    input_fps: float,
+    output_fps: float,
+    joint_names: Sequence[str] = CSV_JOINT_NAMES,
+    pad_frames: int = DEFAULT_PAD_FRAMES,
+    robot_body_names: Sequence[str] | None = ISAAC_LAB_BODY_NAMES,
+) -> dict[str, np.ndarray]:
+    """Converts a retargeted motion to the fields of a motion file.
+
+    Args:
+        tree: The kinematic tree of the robot.
+        root_pos: The root positions. Shape is (T, 3).
+        root_quat: The root orientations in (w, x, y, z). Shape is (T, 4).
+        joint_pos: The joint positions, ordered as ``joint_names``. Shape is (T, J).
+        input_fps: The fps of the motion.
+        output_fps: The fps of the motion file.
+        joint_names: Names of the joints of ``joint_pos``. Defaults to the order of the retargeted CSV files.
+        pad_frames: Number of virtual copies of the first and of the last frame, see :func:`padding_fields`.
+        robot_body_names: The bodies of the articulation that tracks the motion, in order. The motion command indexes
+            the bodies of the motion file by articulation index, so the kinematic tree must have the same bodies in
+            the same order. The joints follow the bodies, so they then match as well. Defaults to the G1 trained on.
+            None skips the check, see :func:`check_robot_bodies`.
+
+    Returns:
+        The fields of the motion file, with the joints and bodies ordered as in the kinematic tree.
+
+    Raises:
+        ValueError: If a joint of the kinematic tree is missing from ``joint_names``, or the bodies of the kinematic
+            tree differ from the ones of the articulation.
+    """
+    if robot_body_names is not None:
+        check_robot_bodies(tree, robot_body_names)
+    missing = [name for name in tree.joint_names if name not in joint_names]
+    if missing:
+        raise ValueError(f"The motion has no positions of the joints {missing}.")
+    device = tree.device
+    root_pos, root_quat, joint_pos = resample(
+        root_pos.to(device), root_quat.to(device), joint_pos.to(device), input_fps, output_fps
+    )
+    joint_pos = joint_pos[:, [list(joint_names).index(name) for name in tree.joint_names]]
+    root_lin_vel, root_ang_vel, joint_vel = finite_difference_velocities(root_pos, root_quat, joint_pos, output_fps)
+    body_states = tree.compute(root_pos, root_quat, root_lin_vel, root_ang_vel, joint_pos, joint_vel)
+
+    motion = {
+        "fps": np.array([output_fps]),
+        "joint_pos": joint_pos.cpu().numpy(),
+        "joint_vel": joint_vel.cpu().numpy(),
+        **{key: value.cpu().numpy() for key, value in body_states.items()},
+        "body_names": np.array(tree.body_names),
+        "joint_names": np.array(tree.joint_names),
+        **padding_fields(pad_frames, pad_frames),
+    }
+    return motion
@@ -0,0 +1,202 @@
+"""Sharded columnar layout of a dataset of motion clips.
+
+A dataset of per-clip ``.npz`` files costs one zip archive per clip to open, and every archive repeats the body and
+joint names as string arrays. A motion dataset is a directory instead, with
+
+* one ``.npy`` shard per field (``joint_pos``, ``body_pos_w``, ...), holding the frames of all clips concatenated
+  along the first dimension, in float32;
+* an ``index.json`` with the body and joint names, and the name, offset, number of frames, fps and padding of every
+  clip.
+
+Opening a dataset memory-maps every shard once, whatever the number of clips, and the frames of a clip are zero-copy
+views of the shards. :func:`write_dataset` converts per-clip ``.npz`` files to a dataset and :func:`export_clips`
+converts back. The motion command loads a dataset directory like a list of motion files, see
+:class:`~whole_body_tracking.tasks.tracking.mdp.commands.MotionLibrary`.
+"""
+
+from __future__ import annotations
+
+import json
+import numpy as np
+import os
+import shutil
+import tempfile
+import zipfile
+from collections.abc import Sequence
+
+from whole_body_tracking.utils.motion_conversion import npz_shape, save_motion
+
+DATASET_VERSION = 1
+
+INDEX_NAME = "index.json"
+
+FIELDS = ("joint_pos", "joint_vel", "body_pos_w", "body_quat_w", "body_lin_vel_w", "body_ang_vel_w")
+"""The fields with one row per frame, stored as one shard each."""
+
+
+def is_dataset(path: str) -> bool:
+    """Returns whether a path is a motion dataset directory."""
+    return os.path.isfile(os.path.join(path, INDEX_NAME))
+
+
+def _scalar(data, key: str, default: int = 0) -> int:
+    """Reads a scalar entry of a motion file, or the default when the file does not store it."""
+    return int(np.ravel(data[key])[0]) if key in data else default
+
+
+def write_dataset(motion_files: Sequence[str], dataset_dir: str, names: Sequence[str] | None = None) -> dict:
+    """Converts per-clip motion files to a motion dataset.
+
+    The shards are allocated once from the array headers of the files and filled clip by clip, so only one clip is
+    held in memory. The dataset is written next to ``dataset_dir`` and renamed once complete.
+
+    Args:
+        motion_files: Paths to the motion ``.npz`` files.
+        dataset_dir: The dataset directory, which must not exist.
+        names: Name of every clip. Defaults to the file names without extension.
+
+    Returns:
+        The index of the dataset.
+
+    Raises:
+        ValueError: If the clips have different body or joint layouts, or the names are not unique.
+    """
+    if names is None:
+        names = [os.path.splitext(os.path.basename(motion_file))[0] for motion_file in motion_files]
+    if len(set(names)) != len(names):
+        raise ValueError("The names of the clips of a dataset must be unique.")
+    if os.path.exists(dataset_dir):
+        raise ValueError(f"The dataset directory already exists: {dataset_dir}")
+
+    lengths = []
+    for motion_file in motion_files:
+        with zipfile.ZipFile(motion_file) as archive:
+            lengths.append(npz_shape(archive, "joint_pos")[0])
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(int).tolist()
+    with zipfile.ZipFile(motion_files[0]) as archive:
+        frame_shapes = {field: npz_shape(archive, field)[1:] for field in FIELDS}
+    with np.load(motion_files[0]) as first:
+        body_names = first["body_names"].tolist() if "body_names" in first else None
+        joint_names = first["joint_names"].tolist() if "joint_names" in first else None
+
+    parent = os.path.dirname(os.path.abspath(dataset_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(dataset_dir) + ".", dir=parent)
+    try:
+        shards = {
+            field: np.lib.format.open_memmap(
+                os.path.join(tmp_dir, f"{field}.npy"), mode="w+", dtype=np.float32, shape=(sum(lengths), *shape)
+            )
+            for field, shape in frame_shapes.items()
+        }
+        clips = []
+        for motion_file, name, offset, length in zip(motion_files, names, offsets, lengths):
+            with np.load(motion_file) as data:
+                for field, shard in shards.items():
+                    value = data[field]
+                    if value.shape[1:] != shard.shape[1:]:
+                        raise ValueError(f"{motion_file}: {field} has shape {value.shape[1:]} per frame.")
+                    shard[offset : offset + length] = value
+                for key, expected in (("body_names", body_names), ("joint_names", joint_names)):
+                    if key in data and data[key].tolist() != expected:
+                        raise ValueError(f"{motion_file}: {key} differ from the first clip.")
+                clips.append(
+                    {
+                        "name": name,
+                        "offset": offset,
+                        "length": length,
+                        "fps": float(np.ravel(data["fps"])[0]),
+                        "pad_start": _scalar(data, "pad_start"),
+                        "pad_end": _scalar(data, "pad_end"),
+                    }
+                )
+        for shard in shards.values():
+            shard.flush()
+        del shards
+
+        index = {
+            "version": DATASET_VERSION,
+            "num_frames": sum(lengths),
+            "body_names": body_names,
+            "joint_names": joint_names,
+            "clips": clips,
+        }
+        with open(os.path.join(tmp_dir, INDEX_NAME), "w") as f:
+            json.dump(index, f)
+        os.rename(tmp_dir, dataset_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return index
+
+
+class MotionDataset:
+    """A motion dataset opened with one memory map per field.
+
+    Args:
+        dataset_dir: The dataset directory.
+
+    Raises:
+        ValueError: If the directory is not a dataset of a supported version.
+    """
+
+    def __init__(self, dataset_dir: str):
+        if not is_dataset(dataset_dir):
+            raise ValueError(f"Not a motion dataset: {dataset_dir}")
+        with open(os.path.join(dataset_dir, INDEX_NAME)) as f:
+            self.index = json.load(f)
+        if self.index["version"] != DATASET_VERSION:
+            raise ValueError(f"Unsupported motion dataset version {self.index['version']}: {dataset_dir}")
+        self.dataset_dir = dataset_dir
+        self.clips: list[dict] = self.index["clips"]
+        """The name, offset, length (number of frames), fps, ``pad_start`` and ``pad_end`` of every clip."""
+        self.names = [clip["name"] for clip in self.clips]
+        self.body_names: list[str] | None = self.index["body_names"]
+        self.joint_names: list[str] | None = self.index["joint_names"]
+        self.shards = {field: np.load(os.path.join(dataset_dir, f"{field}.npy"), mmap_mode="r") for field in FIELDS}
+        """The read-only memory map of every field, with the frames of all clips."""
+        self._clip_ids = {name: clip_id for clip_id, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.clips)
+
+    def clip(self, clip: int | str) -> dict:
+        """Returns a clip with the keys of a motion file.
+
+        Args:
+            clip: The index or the name of the clip.
+
+        Returns:
+            The fields of the clip as zero-copy views of the shards, and its ``fps``, ``pad_start``, ``pad_end``,
+            ``body_names`` and ``joint_names``.
+        """
+        info = self.clips[self._clip_ids[clip] if isinstance(clip, str) else clip]
+        frames = slice(info["offset"], info["offset"] + info["length"])
+        data = {field: shard[frames] for field, shard in self.shards.items()}
+        data["fps"] = np.array([info["fps"]])
+        data["pad_start"] = np.array([info["pad_start"]])
+        data["pad_end"] = np.array([info["pad_end"]])
+        if self.body_names is not None:
+            data["body_names"] = np.array(self.body_names)
+        if self.joint_names is not None:
+            data["joint_names"] = np.array(self.joint_names)
+        return data
+
+
+def export_clips(dataset_dir: str, output_dir: str, names: Sequence[str] | None = None) -> list[str]:
+    """Converts the clips of a motion dataset back to per-clip motion files.
+
+    Args:
+        dataset_dir: The dataset directory.
+        output_dir: The directory of the motion ``.npz`` files.
+        names: Names of the clips to export. Defaults to all clips.
+
+    Returns:
+        The paths of the written files.
+    """
+    dataset = MotionDataset(dataset_dir)
+    paths = []
+    for name in dataset.names if names is None else names:
+        path = os.path.join(output_dir, f"{name}.npz")
+        save_motion(path, dataset.clip(name))
+        paths.append(path)
+    return paths
@@ -0,0 +1,117 @@
+"""Manifest of the motion files written by the preprocessing, for incremental re-runs.
+
+Every converted motion file is recorded with the content hash of its source and the conversion parameters (fps,
+frame range, padding, robot description). A re-run skips the outputs whose record matches, so adding a few clips to a
+large dataset only converts the new clips instead of wiping and rebuilding the output directory.
+
+Sources are only re-hashed when their size or modification time changed, so checking thousands of up-to-date clips
+costs one ``stat`` per clip. The manifest is an append-only JSON lines file next to the outputs, written one record per
+finished conversion, so an interrupted run keeps the records of the conversions it finished; the latest record of an
+output wins and :meth:`ConversionManifest.compact` drops the older ones.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+
+from whole_body_tracking.utils.motion_cache import file_digest
+
+MANIFEST_VERSION = 2
+
+MANIFEST_NAME = "manifest.jsonl"
+"""File name of the manifest in the output directory."""
+
+
+def source_stamp(path: str) -> list[int]:
+    """Returns the size and modification time of a file, which change when the file is rewritten."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class ConversionManifest:
+    """Records of the motion files of an output directory.
+
+    Args:
+        output_dir: The directory of the motion files and of the manifest.
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.records: dict[str, dict] = {}
+        """Latest record of every output, by output file name."""
+        if os.path.isfile(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # the last line of an interrupted run may be partial
+                        continue
+                    if record.get("version") == MANIFEST_VERSION:
+                        self.records[record["output"]] = record
+
+    def is_current(self, output: str, source: str, params: dict) -> bool:
+        """Returns whether an output was converted from the current content of its source with the same parameters.
+
+        Args:
+            output: File name of the output in the output directory.
+            source: Path of the source motion file.
+            params: The conversion parameters, JSON serializable.
+
+        Returns:
+            True if the output exists and its record matches the source and the parameters.
+        """
+        record = self.records.get(output)
+        if record is None or record["params"] != params or not os.path.isfile(os.path.join(self.output_dir, output)):
+            return False
+        stamp = source_stamp(source)
+        if record["source_stamp"] == stamp:
+            return True
+        # a touched or copied source with the same content is still current
+        digest = file_digest(source)
+        if digest != record["source_digest"]:
+            return False
+        self.record(output, source, digest, params, stamp=stamp)
+        return True
+
+    def record(self, output: str, source: str, source_digest: str, params: dict, stamp: list[int] | None = None):
+        """Appends the record of a converted output.
+
+        Args:
+            output: File name of the output in the output directory.
+            source: Path of the source motion file.
+            source_digest: The content hash of the source when it was converted, see
+                :func:`~whole_body_tracking.utils.motion_cache.file_digest`.
+            params: The conversion parameters, JSON serializable.
+            stamp: The :func:`source_stamp` of the source when it was hashed. Defaults to its current stamp.
+        """
+        record = {
+            "version": MANIFEST_VERSION,
+            "output": output,
+            "source": os.path.abspath(source),
+            "source_digest": source_digest,
+            "source_stamp": source_stamp(source) if stamp is None else stamp,
+            "params": params,
+        }
+        self.records[output] = record
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record, sort_keys=True) + "\n")
+
+    def compact(self):
+        """Rewrites the manifest with the latest record of every output that still exists."""
+        records = [
+            record
+            for output, record in sorted(self.records.items())
+            if os.path.isfile(os.path.join(self.output_dir, output))
+        ]
+        os.makedirs(self.output_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=MANIFEST_NAME + ".", suffix=".tmp", dir=self.output_dir)
+        with os.fdopen(fd, "w") as f:
+            for record in records:
+                f.write(json.dumps(record, sort_keys=True) + "\n")
+        os.replace(tmp_path, self.path)
+        self.records = {record["output"]: record for record in records}
@@ -0,0 +1,131 @@
+"""Uncompressed, memory-mappable sidecar layout for motion ``.npz`` files.
+
+A motion ``.npz`` is a zip archive, so reading any array decompresses and copies all of it. The sidecar stores every
+field as a plain ``.npy`` file that can be opened with ``mmap_mode``, and the per-body fields are stored body-major
+(``(num_bodies, num_frames, dim)``), so that reading the tracked bodies only touches the pages of those bodies.
+Names and other metadata go to a small ``meta.json`` instead of string arrays.
+
+The sidecar of ``motions/clip.npz`` is the directory ``motions/clip.mmap/``. It is created on first use and rebuilt
+when the size or modification time of the source file changes. Creation is atomic, so several processes may open
+the same motion concurrently.
+"""
+
+from __future__ import annotations
+
+import json
+import numpy as np
+import os
+import shutil
+import tempfile
+from collections.abc import Sequence
+
+SIDECAR_VERSION = 2
+
+JOINT_FIELDS = ("joint_pos", "joint_vel")
+BODY_FIELDS = ("body_pos_w", "body_quat_w", "body_lin_vel_w", "body_ang_vel_w")
+PADDING_FIELDS = ("pad_start", "pad_end")
+
+
+def sidecar_path(motion_file: str) -> str:
+    """Returns the sidecar directory of a motion file."""
+    return os.path.splitext(motion_file)[0] + ".mmap"
+
+
+def _source_stamp(motion_file: str) -> dict:
+    stat = os.stat(motion_file)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_meta(path: str) -> dict | None:
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_sidecar(motion_file: str) -> str:
+    """Writes the memory-mappable sidecar of a motion file.
+
+    Args:
+        motion_file: Path to the motion ``.npz`` file.
+
+    Returns:
+        The sidecar directory.
+    """
+    path = sidecar_path(motion_file)
+    stamp = _source_stamp(motion_file)
+    tmp_path = tempfile.mkdtemp(prefix=os.path.basename(path) + ".", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        data = np.load(motion_file)
+        meta = {
+            "version": SIDECAR_VERSION,
+            "source": stamp,
+            "fps": data["fps"].tolist(),
+            "num_frames": int(data["joint_pos"].shape[0]),
+            "body_names": data["body_names"].tolist() if "body_names" in data else None,
+            "joint_names": data["joint_names"].tolist() if "joint_names" in data else None,
+            **{name: int(np.ravel(data[name])[0]) for name in PADDING_FIELDS if name in data},
+        }
+        for name in JOINT_FIELDS:
+            np.save(os.path.join(tmp_path, name + ".npy"), data[name].astype(np.float32))
+        for name in BODY_FIELDS:
+            body_major = np.ascontiguousarray(data[name].astype(np.float32).transpose(1, 0, 2))
+            np.save(os.path.join(tmp_path, name + ".npy"), body_major)
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        # replace a stale sidecar, another process may have published an up-to-date one in the meantime
+        if os.path.isdir(path):
+            meta_on_disk = _read_meta(path)
+            if meta_on_disk is not None and meta_on_disk.get("source") == stamp:
+                return path
+            shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return path
+
+
+def open_sidecar(motion_file: str) -> str:
+    """Returns the up-to-date sidecar directory of a motion file, building it if necessary."""
+    path = sidecar_path(motion_file)
+    meta = _read_meta(path)
+    if meta is None or meta.get("version") != SIDECAR_VERSION or meta.get("source") != _source_stamp(motion_file):
+        path = build_sidecar(motion_file)
+    return path
+
+
+def load_motion_mmap(motion_file: str, body_indexes: Sequence[int] | None = None) -> dict:
+    """Loads a motion through its memory-mapped sidecar.
+
+    Args:
+        motion_file: Path to the motion ``.npz`` file.
+        body_indexes: Indexes of the bodies to read. Defaults to all bodies.
+
+    Returns:
+        A dictionary with the same keys and (time-major) shapes as the ``.npz`` file. The joint fields are read-only
+        memory maps, the body fields are contiguous copies of the requested bodies only.
+    """
+    path = open_sidecar(motion_file)
+    meta = _read_meta(path)
+    data = {"fps": np.asarray(meta["fps"])}
+    for name in JOINT_FIELDS:
+        data[name] = np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+    for name in BODY_FIELDS:
+        body_major = np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+        if body_indexes is not None:
+            body_major = body_major[np.asarray(body_indexes, dtype=np.int64)]
+        data[name] = np.ascontiguousarray(body_major.transpose(1, 0, 2))
+    if meta["body_names"] is not None:
+        data["body_names"] = meta["body_names"]
+    if meta["joint_names"] is not None:
+        data["joint_names"] = meta["joint_names"]
+    for name in PADDING_FIELDS:
+        if name in meta:
+            data[name] = meta[name]
+    return data
@@ -0,0 +1,142 @@
+"""Compact storage of reference motion tensors with on-the-fly dequantization.
+
+The reference tensors are only ever read through row gathers at the current time steps, so they can be stored in a
+compact form and converted back to float32 for the gathered rows only. Three encodings are used:
+
+* ``"float16"``: plain half precision.
+* ``"int16"``: signed 16-bit integers with a per-clip offset and scale, for positions.
+* ``"unit_int16"``: signed 16-bit integers scaled by 32767 and re-normalized on read, for unit quaternions.
+"""
+
+from __future__ import annotations
+
+import torch
+
+QUANTIZATION_MODES = ("float16", "int16")
+"""Supported motion quantization modes."""
+
+FIELD_ENCODINGS = {
+    "float16": {
+        "joint_pos": "float16",
+        "joint_vel": "float16",
+        "body_pos_w": "float16",
+        "body_quat_w": "float16",
+        "body_lin_vel_w": "float16",
+        "body_ang_vel_w": "float16",
+    },
+    "int16": {
+        "joint_pos": "int16",
+        "joint_vel": "float16",
+        "body_pos_w": "int16",
+        "body_quat_w": "unit_int16",
+        "body_lin_vel_w": "float16",
+        "body_ang_vel_w": "float16",
+    },
+}
+"""Encoding of every motion field for each quantization mode."""
+
+_INT16_MAX = 32767.0
+
+
+class QuantizedTensor:
+    """A float tensor stored in a compact encoding and dequantized when indexed.
+
+    Indexing follows tensor indexing, with the first index selecting rows (frames). The result is always a float32
+    tensor, and only the selected elements are dequantized.
+
+    Args:
+        data: The encoded tensor.
+        encoding: The encoding of the data, one of ``"float16"``, ``"int16"`` and ``"unit_int16"``.
+        row_groups: Group (clip) index of every row. Only used by the ``"int16"`` encoding.
+        scale: Per-group scale of shape ``(num_groups, *data.shape[1:])``. Only used by the ``"int16"`` encoding.
+        offset: Per-group offset of shape ``(num_groups, *data.shape[1:])``. Only used by the ``"int16"`` encoding.
+    """
+
+    def __init__(
+        self,
+        data: torch.Tensor,
+        encoding: str,
+        row_groups: torch.Tensor | None = None,
+        scale: torch.Tensor | None = None,
+        offset: torch.Tensor | None = None,
+    ):
+        self.data = data
+        self.encoding = encoding
+        self.row_groups = row_groups
+        self.scale = scale
+        self.offset = offset
+
+    @classmethod
+    def from_tensor(cls, tensor: torch.Tensor, encoding: str, row_groups: torch.Tensor) -> QuantizedTensor:
+        """Encodes a float tensor.
+
+        Args:
+            tensor: The float tensor to encode, with rows (frames) along the first dimension.
+            encoding: The encoding, one of ``"float16"``, ``"int16"`` and ``"unit_int16"``.
+            row_groups: Group (clip) index of every row, the ``"int16"`` offset and scale are computed per group.
+
+        Returns:
+            The encoded tensor.
+        """
+        if encoding == "float16":
+            return cls(tensor.half(), encoding)
+        if encoding == "unit_int16":
+            return cls(torch.round(tensor.clamp(-1.0, 1.0) * _INT16_MAX).short(), encoding)
+        if encoding == "int16":
+            num_groups = int(row_groups.max()) + 1
+            index = row_groups.long().view(-1, *([1] * (tensor.dim() - 1))).expand_as(tensor)
+            shape = (num_groups, *tensor.shape[1:])
+            lower = tensor.new_full(shape, float("inf")).scatter_reduce(0, index, tensor, reduce="amin")
+            upper = tensor.new_full(shape, float("-inf")).scatter_reduce(0, index, tensor, reduce="amax")
+            offset = (upper + lower) / 2.0
+            scale = ((upper - lower) / (2.0 * _INT16_MAX)).clamp(min=1e-12)
+            data = torch.round((tensor - offset[row_groups]) / scale[row_groups]).clamp(-_INT16_MAX, _INT16_MAX)
+            return cls(data.short(), encoding, row_groups, scale, offset)
+        raise ValueError(f"Unknown motion encoding: {encoding}")
+
+    def __getitem__(self, key) -> torch.Tensor:
+        values = self.data[key].float()
+        if self.encoding == "unit_int16":
+            return torch.nn.functional.normalize(values, dim=-1)
+        if self.encoding == "int16":
+            rows, rest = (key[0], key[1:]) if isinstance(key, tuple) else (key, ())
+            groups = self.row_groups[rows]
+            index = (slice(None),) * groups.dim() + rest
+            return values * self.scale[groups][index] + self.offset[groups][index]
+        return values
+
+    def dequantize(self) -> torch.Tensor:
+        """Returns the whole tensor in float32."""
+        return self[:]
+
+    @property
+    def shape(self) -> torch.Size:
+        return self.data.shape
+
+    @property
+    def device(self) -> torch.device:
+        return self.data.device
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes used by the encoded data and its offset and scale (the row groups are shared)."""
+        nbytes = self.data.numel() * self.data.element_size()
+        if self.scale is not None:
+            nbytes += 2 * self.scale.numel() * self.scale.element_size()
+        return nbytes
+
+
+def quantize_motion(motion, mode: str):
+    """Replaces the reference tensors of a motion in place by quantized storage.
+
+    Args:
+        motion: A :class:`MotionLoader` or :class:`MotionLibrary`.
+        mode: The quantization mode, one of :data:`QUANTIZATION_MODES`.
+    """
+    if mode not in FIELD_ENCODINGS:
+        raise ValueError(f"Unknown motion quantization mode: {mode}. Supported modes: {QUANTIZATION_MODES}")
+    row_groups = torch.repeat_interleave(
+        torch.arange(motion.num_clips, dtype=torch.int32, device=motion.clip_frames.device), motion.clip_frames
+    )
+    for name, encoding in FIELD_ENCODINGS[mode].items():
+        setattr(motion, name, QuantizedTensor.from_tensor(getattr(motion, name), encoding, row_groups))
@@ -0,0 +1,130 @@
+"""Readers of the retargeted motions consumed by the motion preprocessing.
+
+A retargeted motion gives the root pose and the joint positions of the robot for every frame. The retargeting tools
+store it in different formats, which used to be converted to CSV files first (``scripts/pkl_to_csv.py`` and
+``scripts/parallel_npz_to_csv.py``) and parsed again by the preprocessing. The readers load every format directly into
+tensors, so the CSV round trip through text is optional:
+
+* ``.csv``: one frame per row, root position, root orientation in (w, x, y, z) and joint positions.
+* ``.pkl``: GMR pickles with ``fps``, ``root_pos``, ``root_rot`` in (x, y, z, w) and ``dof_pos``.
+* ``.npz``: holosoma retargeting results with ``qpos`` laid out as the CSV rows, and optionally ``fps``.
+
+Other formats are supported by adding a reader to :data:`MOTION_READERS`.
+"""
+
+from __future__ import annotations
+
+import glob
+import numpy as np
+import os
+import pickle
+import torch
+import zipfile
+from collections.abc import Callable
+
+from whole_body_tracking.utils.motion_conversion import load_csv
+
+DEFAULT_INPUT_FPS = 30
+"""The fps of motions whose file does not store it, and that is not given explicitly."""
+
+MotionTensors = tuple[torch.Tensor, torch.Tensor, torch.Tensor, float | None]
+
+
+def _frames(array: np.ndarray, frame_range: tuple[int, int] | None) -> torch.Tensor:
+    if frame_range is not None:
+        array = array[frame_range[0] - 1 : frame_range[1]]
+    return torch.from_numpy(np.ascontiguousarray(array, dtype=np.float32))
+
+
+def read_csv(path: str, frame_range: tuple[int, int] | None = None) -> MotionTensors:
+    """Reads a retargeted CSV motion, see :func:`~whole_body_tracking.utils.motion_conversion.load_csv`. The CSV
+    files do not store their fps."""
+    return (*load_csv(path, frame_range), None)
+
+
+def read_gmr_pkl(path: str, frame_range: tuple[int, int] | None = None) -> MotionTensors:
+    """Reads a GMR pickle, converting the root orientations from (x, y, z, w) to (w, x, y, z)."""
+    with open(path, "rb") as f:
+        motion = pickle.load(f)
+    root_quat = _frames(motion["root_rot"], frame_range)[:, [3, 0, 1, 2]]
+    fps = motion.get("fps")
+    return (
+        _frames(motion["root_pos"], frame_range),
+        root_quat,
+        _frames(motion["dof_pos"], frame_range),
+        None if fps is None else float(fps),
+    )
+
+
+def read_qpos_npz(path: str, frame_range: tuple[int, int] | None = None) -> MotionTensors:
+    """Reads the ``qpos`` of a holosoma retargeting result, whose rows are laid out as the CSV rows."""
+    with np.load(path) as motion:
+        qpos = _frames(motion["qpos"], frame_range)
+        fps = float(np.asarray(motion["fps"]).reshape(-1)[0]) if "fps" in motion.files else None
+    return qpos[:, :3], qpos[:, 3:7], qpos[:, 7:], fps
+
+
+def is_qpos_npz(path: str) -> bool:
+    """Returns whether an npz file is a holosoma retargeting result, and not e.g. a preprocessed motion file."""
+    with zipfile.ZipFile(path) as archive:
+        return "qpos.npy" in archive.namelist()
+
+
+MOTION_READERS: dict[str, Callable[[str, tuple[int, int] | None], MotionTensors]] = {
+    ".csv": read_csv,
+    ".pkl": read_gmr_pkl,
+    ".npz": read_qpos_npz,
+}
+"""Reader of every supported file extension."""
+
+
+def read_motion(path: str, frame_range: tuple[int, int] | None = None) -> MotionTensors:
+    """Reads a retargeted motion with the reader of its file extension.
+
+    Args:
+        path: Path to the motion file.
+        frame_range: First and last frame to load, both inclusive and starting from 1. Defaults to None (all frames).
+
+    Returns:
+        The root positions, shape (T, 3), the root orientations in (w, x, y, z), shape (T, 4), the joint positions in
+        the order of the retargeted CSV files, shape (T, J), and the fps stored in the file, or None.
+
+    Raises:
+        ValueError: If there is no reader for the file extension.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in MOTION_READERS:
+        raise ValueError(f"Unsupported motion file '{path}', the supported extensions are {list(MOTION_READERS)}.")
+    return MOTION_READERS[extension](path, frame_range)
+
+
+def find_motion_files(input_path: str) -> list[str]:
+    """Returns the motion files of a motion file, a directory of motion files or a manifest (``.txt``) of them.
+
+    Args:
+        input_path: The motion file, the directory, whose files with a supported extension are returned, or the
+            manifest, with one path per line relative to the manifest. Empty lines and lines starting with ``#`` are
+            skipped. The ``.npz`` files of a directory without ``qpos``, such as the preprocessed motion files that
+            are often written next to the retargeted ones, are skipped.
+
+    Returns:
+        The paths of the motion files.
+
+    Raises:
+        ValueError: If there is no motion file.
+    """
+    if os.path.isdir(input_path):
+        files = sorted(
+            path for extension in MOTION_READERS for path in glob.glob(os.path.join(input_path, f"*{extension}"))
+        )
+        files = [path for path in files if not path.lower().endswith(".npz") or is_qpos_npz(path)]
+    elif input_path.endswith(".txt"):
+        with open(input_path) as f:
+            lines = [line.strip() for line in f]
+        base_dir = os.path.dirname(os.path.abspath(input_path))
+        files = [os.path.join(base_dir, line) for line in lines if line and not line.startswith("#")]
+    else:
+        files = [input_path]
+    if not files:
+        raise ValueError(f"No motion files found for: {input_path}")
+    return files
@@ -0,0 +1,164 @@
+"""Node-local shared-memory store of decoded reference motions.
+
+Several training processes on one node often load the same motion files. With the store, the first process decodes
+a motion and publishes the arrays of the tracked bodies in a named shared-memory segment, and every later process
+on the node attaches to the segment instead of decoding the file again. The attached arrays are zero-copy views of
+the segment, so the host memory of a motion is shared by all processes.
+
+A segment is a file in the node's shared-memory file system (``/dev/shm``), named after the path, size and
+modification time of the motion file and the tracked body indexes, so a modified file gets a new segment. Segments
+are written to a temporary file and renamed, so a process that died while publishing does not leave a partial
+segment behind, and publishing is serialized by a file lock, so every motion is decoded once per node. Processes map
+the segments copy-on-write: the pages are shared as long as nobody writes to them.
+
+Segments outlive the processes that use them, so that later runs on the node still find them. They are removed with
+:func:`clear` (``python scripts/motion_shm.py clear``) or when the node reboots.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import numpy as np
+import os
+import struct
+import tempfile
+from collections.abc import Sequence
+
+STORE_VERSION = 2
+
+SEGMENT_PREFIX = "wbt_motion_"
+
+JOINT_FIELDS = ("joint_pos", "joint_vel")
+BODY_FIELDS = ("body_pos_w", "body_quat_w", "body_lin_vel_w", "body_ang_vel_w")
+PADDING_FIELDS = ("pad_start", "pad_end")
+
+_MAGIC = b"WBTMOTN1"
+_PREAMBLE = struct.Struct("<8sQ")  # magic, header length
+_ALIGNMENT = 64
+
+
+def store_dir() -> str:
+    """Returns the directory of the segments, the shared-memory file system if the node has one."""
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def segment_name(motion_file: str, body_indexes: Sequence[int] | None = None) -> str:
+    """Returns the name of the shared-memory segment of a motion file and tracked body indexes."""
+    stat = os.stat(motion_file)
+    body_indexes = None if body_indexes is None else [int(i) for i in body_indexes]
+    spec = [STORE_VERSION, os.path.abspath(motion_file), stat.st_size, stat.st_mtime_ns, body_indexes]
+    return SEGMENT_PREFIX + hashlib.sha256(json.dumps(spec).encode()).hexdigest()[:24]
+
+
+def _lock_path(name: str) -> str:
+    return os.path.join(tempfile.gettempdir(), "." + name + ".lock")
+
+
+def _align(size: int) -> int:
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
+
+
+def _decode(motion_file: str, body_indexes: Sequence[int] | None) -> tuple[dict[str, np.ndarray], dict]:
+    data = np.load(motion_file)
+    arrays = {name: np.ascontiguousarray(data[name], dtype=np.float32) for name in JOINT_FIELDS}
+    index = slice(None) if body_indexes is None else np.asarray(body_indexes, dtype=np.int64)
+    for name in BODY_FIELDS:
+        arrays[name] = np.ascontiguousarray(data[name][:, index], dtype=np.float32)
+    meta = {"fps": data["fps"].tolist()}
+    for name in ("body_names", "joint_names"):
+        if name in data:
+            meta[name] = data[name].tolist()
+    for name in PADDING_FIELDS:
+        if name in data:
+            meta[name] = int(np.ravel(data[name])[0])
+    return arrays, meta
+
+
+def _publish(path: str, arrays: dict[str, np.ndarray], meta: dict):
+    fields, offset = {}, 0
+    for key, array in arrays.items():
+        fields[key] = {"offset": offset, "shape": list(array.shape), "dtype": array.dtype.str}
+        offset += _align(array.nbytes)
+    header = json.dumps({"fields": fields, **meta}).encode()
+    data_start = _align(_PREAMBLE.size + len(header))
+
+    fd, tmp_path = tempfile.mkstemp(prefix="." + os.path.basename(path), dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_PREAMBLE.pack(_MAGIC, len(header)) + header)
+            for key, array in arrays.items():
+                f.seek(data_start + fields[key]["offset"])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _attach(path: str) -> dict:
+    with open(path, "rb") as f:
+        magic, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        assert magic == _MAGIC, f"Invalid motion segment: {path}"
+        header = json.loads(f.read(header_length))
+    # copy-on-write, so the arrays are writable for torch while the pages stay shared
+    buffer = np.memmap(path, dtype=np.uint8, mode="c")
+    data_start = _align(_PREAMBLE.size + header_length)
+    data = {"fps": np.asarray(header.pop("fps"))}
+    for key, field in header.pop("fields").items():
+        dtype = np.dtype(field["dtype"])
+        start = data_start + field["offset"]
+        count = int(np.prod(field["shape"]))
+        data[key] = buffer[start : start + count * dtype.itemsize].view(dtype).reshape(field["shape"])
+    data.update(header)
+    return data
+
+
+def load_motion_shared(motion_file: str, body_indexes: Sequence[int] | None = None) -> tuple[dict, bool]:
+    """Loads a motion from the node-local shared-memory store, publishing it first if needed.
+
+    Args:
+        motion_file: Path to the motion ``.npz`` file.
+        body_indexes: Indexes of the bodies to keep. Defaults to all bodies.
+
+    Returns:
+        A dictionary with the same keys and shapes as the ``.npz`` file, whose arrays are copy-on-write views of the
+        shared segment, and whether the motion was already published (by this or another process).
+    """
+    name = segment_name(motion_file, body_indexes)
+    path = os.path.join(store_dir(), name)
+    attached = os.path.isfile(path)
+    if not attached:
+        with open(_lock_path(name), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # another process may have published the motion while this one waited for the lock
+            attached = os.path.isfile(path)
+            if not attached:
+                _publish(path, *_decode(motion_file, body_indexes))
+    return _attach(path), attached
+
+
+def list_segments() -> list[dict]:
+    """Lists the motion segments of the node, with their ``name`` and ``size`` in bytes."""
+    root = store_dir()
+    segments = []
+    for name in sorted(os.listdir(root)):
+        if name.startswith(SEGMENT_PREFIX):
+            segments.append({"name": name, "size": os.path.getsize(os.path.join(root, name))})
+    return segments
+
+
+def clear() -> int:
+    """Removes all motion segments of the node. Processes attached to them keep their mapping.
+
+    Returns:
+        The number of removed segments.
+    """
+    segments = list_segments()
+    for segment in segments:
+        for path in (os.path.join(store_dir(), segment["name"]), _lock_path(segment["name"])):
+            if os.path.exists(path):
+                os.remove(path)
+    return len(segments)
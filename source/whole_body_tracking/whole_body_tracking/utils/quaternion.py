@@ -0,0 +1,94 @@
+"""Batched quaternion helpers that are not provided by :mod:`isaaclab.utils.math`."""
+
+from __future__ import annotations
+
+import torch
+
+
+def quat_slerp(q0: torch.Tensor, q1: torch.Tensor, t: torch.Tensor) -> torch.Tensor:
+    """Spherical linear interpolation between batches of quaternions.
+
+    Unlike :func:`isaaclab.utils.math.quat_slerp`, which interpolates a single pair, every pair of the batch is
+    interpolated with its own blend factor. The shortest arc is taken.
+
+    Args:
+        q0: The start quaternions in (w, x, y, z). Shape is (..., 4).
+        q1: The end quaternions in (w, x, y, z). Shape is (..., 4).
+        t: The blend factors in [0, 1], broadcastable to (..., 1).
+
+    Returns:
+        The interpolated unit quaternions in (w, x, y, z). Shape is (..., 4).
+    """
+    dot = (q0 * q1).sum(dim=-1, keepdim=True)
+    # take the shortest arc, the sign is applied to the (..., 1) weight instead of the (..., 4) quaternion
+    sign = torch.sign(dot) + (dot == 0.0)
+    # a tiny lower bound on the angle keeps the weights finite, sin((1 - t) x) / sin(x) -> 1 - t for small x
+    theta = torch.acos((dot * sign).clamp(max=1.0)).clamp(min=1e-6)
+    inv_sin_theta = 1.0 / torch.sin(theta)
+    w0 = torch.sin((1.0 - t) * theta) * inv_sin_theta
+    w1 = torch.sin(t * theta) * inv_sin_theta * sign
+    return w0 * q0 + w1 * q1
+
+
+def quat_mul_broadcast(q1: torch.Tensor, q2: torch.Tensor) -> torch.Tensor:
+    """Multiplies two quaternion tensors whose shapes broadcast against each other.
+
+    Unlike :func:`isaaclab.utils.math.quat_mul`, which needs equal shapes, a per-env quaternion of shape (N, 1, 4) can
+    be multiplied with per-body quaternions of shape (N, B, 4) without repeating it first.
+
+    Args:
+        q1: The first quaternions in (w, x, y, z). Shape is (..., 4).
+        q2: The second quaternions in (w, x, y, z). Shape is (..., 4).
+
+    Returns:
+        The product q1 * q2 in (w, x, y, z), with the broadcast shape of the inputs.
+    """
+    w1, x1, y1, z1 = q1.unbind(dim=-1)
+    w2, x2, y2, z2 = q2.unbind(dim=-1)
+    w = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
+    x = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
+    y = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
+    z = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
+    return torch.stack([w, x, y, z], dim=-1)
+
+
+def quat_apply_broadcast(quat: torch.Tensor, vec: torch.Tensor) -> torch.Tensor:
+    """Rotates vectors by quaternions whose shapes broadcast against each other.
+
+    Args:
+        quat: The quaternions in (w, x, y, z). Shape is (..., 4).
+        vec: The vectors in (x, y, z). Shape is (..., 3).
+
+    Returns:
+        The rotated vectors, with the broadcast shape of the inputs.
+    """
+    xyz = quat[..., 1:]
+    t = torch.linalg.cross(xyz, vec, dim=-1) * 2
+    return vec + quat[..., 0:1] * t + torch.linalg.cross(xyz, t, dim=-1)
+
+
+def rotation_6d_from_quat(quat: torch.Tensor) -> torch.Tensor:
+    """Computes the first two columns of the rotation matrices of quaternions, without the full matrices.
+
+    The result matches ``matrix_from_quat(quat)[..., :2].reshape(*quat.shape[:-1], 6)``, i.e. the entries are ordered
+    row by row: (R00, R01, R10, R11, R20, R21).
+
+    Args:
+        quat: The quaternions in (w, x, y, z). Shape is (..., 4).
+
+    Returns:
+        The 6D rotation features. Shape is (..., 6).
+    """
+    w, x, y, z = quat.unbind(dim=-1)
+    two_s = 2.0 / (quat * quat).sum(dim=-1)
+    return torch.stack(
+        [
+            1 - two_s * (y * y + z * z),
+            two_s * (x * y - z * w),
+            two_s * (x * y + z * w),
+            1 - two_s * (x * x + z * z),
+            two_s * (x * z - y * w),
+            two_s * (y * z + x * w),
+        ],
+        dim=-1,
+    )
@@ -0,0 +1,42 @@
+"""Opt-in :func:`torch.compile` of the tensor stages of the tracking MDP, with a fallback to eager execution."""
+
+from __future__ import annotations
+
+import functools
+import torch
+import warnings
+from collections.abc import Callable
+
+
+def compile_or_eager(fn: Callable, enabled: bool = True, **kwargs) -> Callable:
+    """Compiles a function for static shapes, falling back to the eager function if compilation fails.
+
+    The first call compiles the function. If compiling or running the compiled function raises, for example because
+    of an operation the compiler does not support, a warning is issued and this and all later calls run ``fn``
+    eagerly. The function must therefore be safe to run again after a failed call.
+
+    Args:
+        fn: The function to compile.
+        enabled: Whether to compile. Defaults to True, if False ``fn`` is returned.
+        **kwargs: Additional arguments of :func:`torch.compile`, e.g. ``mode``.
+
+    Returns:
+        The compiled function with the fallback, or ``fn``.
+    """
+    if not enabled:
+        return fn
+    compiled = torch.compile(fn, dynamic=False, **kwargs)
+    fallback = False
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        nonlocal fallback
+        if not fallback:
+            try:
+                return compiled(*args, **kwargs)
+            except Exception as error:
+                warnings.warn(f"Running {fn.__name__} eagerly, torch.compile failed: {error}")
+                fallback = True
+        return fn(*args, **kwargs)
+
+    return wrapper